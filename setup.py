@@ -50,6 +50,7 @@ setuptools.setup(
         "openpyxl~=3.0.9",
         "pandas~=1.4.2",
         "pyomo~=6.4.1",
+        "scipy>=1.9.0",
     ],
     platforms="any",
     long_description=long_description,
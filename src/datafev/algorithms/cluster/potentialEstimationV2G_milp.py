@@ -21,6 +21,13 @@
 
 from pyomo.core import *
 import pyomo.kernel as pmo
+import numpy as np
+from datafev.algorithms.matrix_form import (
+    MatrixModel,
+    HighsSolver,
+    add_ev_constraints,
+    get_ev_schedules,
+)
 
 
 def calculate_V2G_potential(
@@ -44,8 +51,9 @@ def calculate_V2G_potential(
     
     Parameters
     ----------
-    solver : pyomo SolverFactory object
-        Optimization solver.
+    solver : pyomo SolverFactory object or HighsSolver
+        Optimization solver. The model is assembled in matrix form if a
+        datafev.algorithms.matrix_form.HighsSolver is given.
     opt_step : int
         Size of one time step in the optimization (seconds).
     opt_horizon : list of integers
@@ -89,6 +97,22 @@ def calculate_V2G_potential(
         
     """
 
+    if isinstance(solver, HighsSolver):
+        return _calculate_V2G_potential_matrix(
+            solver,
+            opt_step,
+            opt_horizon,
+            bcap,
+            inisoc,
+            minsoc,
+            maxsoc,
+            ch_eff,
+            ds_eff,
+            pmax_pos,
+            pmax_neg,
+            deptime,
+        )
+
     ###########################################################################
     ####################Constructing the optimization model####################
     model = ConcreteModel()
@@ -216,11 +240,65 @@ def calculate_V2G_potential(
     return p_schedule, s_schedule, c_schedule
 
 
+
+def _calculate_V2G_potential_matrix(
+    solver,
+    opt_step,
+    opt_horizon,
+    bcap,
+    inisoc,
+    minsoc,
+    maxsoc,
+    ch_eff,
+    ds_eff,
+    pmax_pos,
+    pmax_neg,
+    deptime,
+):
+    # Matrix form of the model of 'calculate_V2G_potential'
+    evs = list(bcap.keys())
+    steps = opt_horizon[:-1]
+
+    model = MatrixModel(sense="minimize")
+    ev = add_ev_constraints(
+        model,
+        opt_step,
+        opt_horizon,
+        bcap,
+        inisoc,
+        minsoc,
+        maxsoc,
+        pmax_pos,
+        pmax_neg,
+        deptime,
+    )
+
+    eff_ch = np.array([ch_eff[v] for v in evs], dtype=float)[:, None]
+    eff_ds = np.array([ds_eff[v] for v in evs], dtype=float)[:, None]
+
+    p_cc = model.add_variables(len(steps), lb=-np.inf)
+
+    # Mapping EV powers to CC power
+    rows = model.add_constraints(len(steps), lb=0.0, ub=0.0)
+    model.add_terms(rows, 1.0, p_cc)
+    model.add_terms(rows[None, :], -1 / eff_ch, ev["p_ev_pos"])
+    model.add_terms(rows[None, :], eff_ds, ev["p_ev_neg"])
+
+    model.add_objective(1.0, p_cc)
+
+    x = solver.solve(model)
+
+    p_schedule, s_schedule = get_ev_schedules(x, ev, evs, opt_horizon)
+    c_schedule = dict(zip(steps, x[p_cc].tolist()))
+
+    return p_schedule, s_schedule, c_schedule
+
+
 if __name__ == "__main__":
 
     import pandas as pd
     import numpy as np
-    from pyomo.environ import SolverFactory
+    from datafev.algorithms.solver import create_solver
 
     ###########################################################################
     # Input parameters
@@ -232,7 +310,7 @@ if __name__ == "__main__":
     PC = PPL * N * PCU
     nb_of_ts = 12
 
-    solver = SolverFactory("cplex")
+    solver = create_solver()
     opt_step = 300
     opt_horizon = list(range(nb_of_ts + 1))
 
@@ -0,0 +1,284 @@
+# The datafev framework
+
+# Copyright (C) 2022,
+# Institute for Automation of Complex Power Systems (ACS),
+# E.ON Energy Research Center (E.ON ERC),
+# RWTH Aachen University
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+# documentation files (the "Software"), to deal in the Software without restriction, including without limitation the
+# rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit
+# persons to whom the Software is furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of the
+# Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE
+# WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+# COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+# OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+
+import numpy as np
+
+
+def _extreme_trajectories(
+    direction,
+    opt_step,
+    opt_horizon,
+    bcap,
+    inisoc,
+    minsoc,
+    maxsoc,
+    ch_eff,
+    ds_eff,
+    pmax_pos,
+    pmax_neg,
+    deptime,
+):
+    # Charges (direction=1) or discharges (direction=-1) all EVs as fast as
+    # the power and SOC limits of the MILP estimators allow. The SOC limits
+    # apply to the time steps before the end of the horizon; the SOC at the
+    # end of the horizon is only non-negative.
+    evs = list(bcap.keys())
+
+    # The MILP estimators are infeasible if an initial SOC violates the limits
+    outside = [v for v in evs if not minsoc[v] <= inisoc[v] <= maxsoc[v]]
+    if len(outside) > 0:
+        raise ValueError(
+            "Initial SOCs outside the allowed SOC ranges: " + ", ".join(map(str, outside))
+        )
+
+    steps = opt_horizon[:-1]
+    nb_of_steps = len(steps)
+
+    E = np.array([bcap[v] for v in evs], dtype=float)
+    P_pos = np.array([pmax_pos[v] for v in evs], dtype=float)
+    P_neg = np.array([pmax_neg[v] for v in evs], dtype=float)
+    dep = np.array([deptime[v] for v in evs], dtype=float)
+    s_min = np.array([minsoc[v] for v in evs], dtype=float)
+    s_max = np.array([maxsoc[v] for v in evs], dtype=float)
+    eff_ch = np.array([ch_eff[v] for v in evs], dtype=float)
+    eff_ds = np.array([ds_eff[v] for v in evs], dtype=float)
+
+    p = np.zeros((len(evs), nb_of_steps))
+    s = np.zeros((len(evs), nb_of_steps + 1))
+    s[:, 0] = [inisoc[v] for v in evs]
+
+    for n, t in enumerate(steps):
+        last = n + 1 == nb_of_steps
+        if direction > 0:
+            ceiling = np.inf if last else s_max
+            p_n = np.minimum(P_pos, np.maximum((ceiling - s[:, n]) * E / opt_step, 0.0))
+        else:
+            floor = 0.0 if last else s_min
+            p_n = -np.minimum(P_neg, np.maximum((s[:, n] - floor) * E / opt_step, 0.0))
+        p[:, n] = np.where(t < dep, p_n, 0.0)
+        s[:, n + 1] = s[:, n] + p[:, n] * opt_step / E
+
+    # Net consumption of the cluster
+    c = np.maximum(p, 0.0) / eff_ch[:, None] + np.minimum(p, 0.0) * eff_ds[:, None]
+    c = c.sum(axis=0)
+
+    p_schedule = {}
+    s_schedule = {}
+    for n, v in enumerate(evs):
+        p_schedule[v] = dict(zip(steps, p[n].tolist()))
+        s_schedule[v] = dict(zip(opt_horizon, s[n].tolist()))
+    c_schedule = dict(zip(steps, c.tolist()))
+
+    return p_schedule, s_schedule, c_schedule
+
+
+def is_G2V_exact(ch_eff, ds_eff, pmax_neg):
+    """
+    This function checks whether calculate_G2V_potential gives the G2V
+    potential of the MILP of potentialEstimationG2V_milp. The MILP may cycle
+    energy (discharge and recharge) to book the conversion losses as
+    consumption if an EV can discharge and ch_eff*ds_eff<1.
+
+    Parameters
+    ----------
+    ch_eff : dict of float
+        Charging efficiency of chargers.
+    ds_eff : dict of float
+        Discharging efficiency of chargers.
+    pmax_neg : dict of float
+        Maximum discharge power that EV battery can supply (kW).
+
+    Returns
+    -------
+    bool
+        True if the greedy trajectories are optimal for the MILP.
+
+    """
+
+    return all(pmax_neg[v] <= 0 or ch_eff[v] * ds_eff[v] >= 1 for v in pmax_neg)
+
+
+def calculate_G2V_potential(
+    opt_step,
+    opt_horizon,
+    bcap,
+    inisoc,
+    tarsoc,
+    minsoc,
+    maxsoc,
+    ch_eff,
+    ds_eff,
+    pmax_pos,
+    pmax_neg,
+    deptime,
+):
+    """
+    This function calculates the G2V potential of a cluster for a particular
+    time window without optimization. The MILP of potentialEstimationG2V_milp
+    has no constraints coupling the EVs; its objective (the sum of cluster
+    power) is maximized by charging each EV as fast as possible. The result is
+    exact if the MILP has no incentive to cycle energy (see is_G2V_exact);
+    otherwise, it underestimates the potential. Initial SOCs outside the SOC
+    ranges (infeasible in the MILP) raise a ValueError.
+
+    Parameters
+    ----------
+    opt_step : int
+        Size of one time step in the optimization (seconds).
+    opt_horizon : list of integers
+        Time step identifiers in the optimization horizon.
+    bcap : dict of float
+        Battery capactiy of EVs (kWs).
+    inisoc : dict of float
+        Initial SOCs of EV batteries (0<inisoc[key]<1).
+    tarsoc : dict of float
+        Target SOCs of EVs (0<inisoc[key]<1). Not used (as in the MILP).
+    minsoc : dict of float
+        Minimum allowed SOCs.
+    maxsoc : dict of float
+        Maximum allowed SOCs.
+    ch_eff : dict of float
+        Charging efficiency of chargers.
+    ds_eff : dict of float
+        Discharging efficiency of chargers.
+    pmax_pos : dict of float
+        Maximum charge power that EV battery can withdraw (kW).
+    pmax_neg : dict of float
+        Maximum discharge power that EV battery can supply (kW).
+    deptime : dict of int
+        Number of time steps until departures of EVs.
+
+    Returns
+    -------
+    p_schedule : dict
+        Power schedule.
+        It contains a dictionary for each EV. Each item in the EV dictionary
+        indicates the power to be supplied to the EV(kW) during a particular
+        time step.
+    s_schedule : dict
+        SOC schedule.
+        It contains a dictionary for each EV. Each item in the EV dictionary
+        indicates the SOC to be achieved by the EV by a particular time step.
+    c_schedule: dict
+        Cluster's net schedule.
+        Each item in the dictionary indicates the net power to consumed by the
+        cluster.
+
+    """
+
+    return _extreme_trajectories(
+        1,
+        opt_step,
+        opt_horizon,
+        bcap,
+        inisoc,
+        minsoc,
+        maxsoc,
+        ch_eff,
+        ds_eff,
+        pmax_pos,
+        pmax_neg,
+        deptime,
+    )
+
+
+def calculate_V2G_potential(
+    opt_step,
+    opt_horizon,
+    bcap,
+    inisoc,
+    tarsoc,
+    minsoc,
+    maxsoc,
+    ch_eff,
+    ds_eff,
+    pmax_pos,
+    pmax_neg,
+    deptime,
+):
+    """
+    This function calculates the V2G potential of a cluster for a particular
+    time window without optimization. The MILP of potentialEstimationV2G_milp
+    has no constraints coupling the EVs; its objective (the sum of cluster
+    power) is minimized by discharging each EV as fast as possible down to its
+    minimum SOC. The result is exact for efficiencies not larger than 1.
+    Initial SOCs outside the SOC ranges (infeasible in the MILP) raise a
+    ValueError.
+
+    Parameters
+    ----------
+    opt_step : int
+        Size of one time step in the optimization (seconds).
+    opt_horizon : list of integers
+        Time step identifiers in the optimization horizon.
+    bcap : dict of float
+        Battery capactiy of EVs (kWs).
+    inisoc : dict of float
+        Initial SOCs of EV batteries (0<inisoc[key]<1).
+    tarsoc : dict of float
+        Target SOCs of EVs (0<inisoc[key]<1). Not used (as in the MILP).
+    minsoc : dict of float
+        Minimum allowed SOCs.
+    maxsoc : dict of float
+        Maximum allowed SOCs.
+    ch_eff : dict of float
+        Charging efficiency of chargers.
+    ds_eff : dict of float
+        Discharging efficiency of chargers.
+    pmax_pos : dict of float
+        Maximum charge power that EV battery can withdraw (kW).
+    pmax_neg : dict of float
+        Maximum discharge power that EV battery can supply (kW).
+    deptime : dict of int
+        Number of time steps until departures of EVs.
+
+    Returns
+    -------
+    p_schedule : dict
+        Power schedule.
+        It contains a dictionary for each EV. Each item in the EV dictionary
+        indicates the power to be supplied to the EV(kW) during a particular
+        time step.
+    s_schedule : dict
+        SOC schedule.
+        It contains a dictionary for each EV. Each item in the EV dictionary
+        indicates the SOC to be achieved by the EV by a particular time step.
+    c_schedule: dict
+        Cluster's net schedule.
+        Each item in the dictionary indicates the net power to consumed by the
+        cluster. Negative values indicate V2G injection.
+
+    """
+
+    return _extreme_trajectories(
+        -1,
+        opt_step,
+        opt_horizon,
+        bcap,
+        inisoc,
+        minsoc,
+        maxsoc,
+        ch_eff,
+        ds_eff,
+        pmax_pos,
+        pmax_neg,
+        deptime,
+    )
@@ -20,6 +20,7 @@
 
 
 import pandas as pd
+import numpy as np
 
 
 def idp(schedule, upper_bound, lower_bound, tou_tariff, f_discount, f_markup):
@@ -61,27 +62,73 @@ def idp(schedule, upper_bound, lower_bound, tou_tariff, f_discount, f_markup):
             
     """
 
-    sc = pd.Series(schedule)
-    ub = pd.Series(upper_bound)
-    lb = pd.Series(lower_bound)
-    kappa = pd.Series(tou_tariff)
-    kappa_L = kappa.min()
-    kappa_U = kappa.max()
+    steps = list(tou_tariff.keys())
 
-    overloadedsteps = sc[sc >= ub].index
-    underloadedsteps = sc[sc < lb].index
-
-    ome = kappa.copy()
-    ome[underloadedsteps] = kappa_L - f_discount * (
-        lb[underloadedsteps] - sc[underloadedsteps]
+    ome = idp_array(
+        np.array([schedule[t] for t in steps], dtype=float),
+        np.array([upper_bound[t] for t in steps], dtype=float),
+        np.array([lower_bound[t] for t in steps], dtype=float),
+        np.array([tou_tariff[t] for t in steps], dtype=float),
+        f_discount,
+        f_markup,
     )
-    ome[overloadedsteps] = kappa_U + f_markup * (sc - ub)[overloadedsteps]
 
-    omega = ome.to_dict()
+    omega = dict(zip(steps, ome.tolist()))
 
     return omega
 
 
+def idp_array(schedule, upper_bound, lower_bound, tou_tariff, f_discount, f_markup):
+    """
+    This function is the array implementation of the individual dynamic
+    pricing algorithm (see idp). It calculates the dynamic price signals of
+    multiple clusters in one call.
+
+    Parameters
+    ----------
+    schedule : numpy.ndarray
+        Aggregate schedules of the clusters (kW). Rows refer to the clusters
+        and columns to the time steps (a 1-D array for a single cluster).
+    upper_bound : numpy.ndarray
+        Upper bounds of the desired consumption ranges (kW), same shape as
+        schedule.
+    lower_bound : numpy.ndarray
+        Lower bounds of the desired consumption ranges (kW), same shape as
+        schedule.
+    tou_tariff : numpy.ndarray
+        Standard TOU tariffs of the cluster operators (Eur/kWh). A 1-D array
+        is applied to all clusters.
+    f_discount : float or numpy.ndarray
+        Discount factor to compensate each kW of deficit consumption (Eur/kW).
+        An array gives one factor per cluster.
+    f_markup : float or numpy.ndarray
+        Markup factor to compensate each kW of excessive consumption (Eur/kW).
+        An array gives one factor per cluster.
+
+    Returns
+    -------
+    omega : numpy.ndarray
+        Dynamic price signals (Eur/kWh), same shape as schedule.
+
+    """
+
+    sc = np.asarray(schedule, dtype=float)
+    ub = np.asarray(upper_bound, dtype=float)
+    lb = np.asarray(lower_bound, dtype=float)
+    kappa = np.broadcast_to(np.asarray(tou_tariff, dtype=float), sc.shape)
+    kappa_L = kappa.min(axis=-1, keepdims=True)
+    kappa_U = kappa.max(axis=-1, keepdims=True)
+
+    # Factors per cluster are applied along the rows
+    f_discount = np.asarray(f_discount, dtype=float)[..., None]
+    f_markup = np.asarray(f_markup, dtype=float)[..., None]
+
+    ome = np.where(sc < lb, kappa_L - f_discount * (lb - sc), kappa)
+    ome = np.where(sc >= ub, kappa_U + f_markup * (sc - ub), ome)
+
+    return ome
+
+
 if __name__ == "__main__":
 
     import numpy as np
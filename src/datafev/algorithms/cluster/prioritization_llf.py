@@ -19,7 +19,9 @@
 # OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
 
 
+import numpy as np
 import pandas as pd
+from datafev.data_handling.power_soc import PowerSOCCurve
 
 
 def leastlaxityfirst(
@@ -40,9 +42,10 @@ def leastlaxityfirst(
         Battery capactiy of EVs (kWs).
     efficiency : dict of float
         Power conversion efficiencies of chargers.
-    p_socdep : dict of dict
-        SOC dependency of power capability of EV batteries. Dictionary values
-        are dictionaries for a single EV in the cluster. In the EV dictionaries
+    p_socdep : dict of PowerSOCCurve or dict
+        SOC dependency of power capability of EV batteries (None for EVs
+        without SOC dependency). Dictionary values are either compiled curves 
+        or dictionaries for a single EV in the cluster. In the EV dictionaries
         a key indicates a particular SOC range. An SOC range is defined by 
         lower (SOC_LB) and upper bound of the SOC range(SOC_UB). The power that 
         the EV battery can accept (kW) in a particular SOC range is indicated
@@ -64,144 +67,155 @@ def leastlaxityfirst(
 
     """
 
-    # This will contain the laxity of EVs
-    laxity = {}
-
-    # Laxity is defined with the formula LAX=1-T_MIN/T_LEAD
-    # T_MIN  : Minimum time required to achieve target SOC (T_MIN>=0)
-    # T_LEAD : Time until estimated departure (T_LEAD>0)
-
-    for ev_id in inisoc.keys():
-
-        # Lead time until estimated departure
-        T_LEAD = leadtime[ev_id]
-
-        if inisoc[ev_id] >= tarsoc[ev_id]:
-
-            # Minimum time required to acheive taget SOC is 0 if target SOC is already achieved
-            T_MIN = 0
-
-        else:
-
-            # Target SOC has not been achieved yet: T_MIN will have a postive value
-
-            if p_socdep[ev_id] == None:
-
-                # The EV battery does not have a specific charger power-SOC dependency limiting the power transfer
-                # T_MIN is determined by p_chmax (max power that charger-EV pair can handle for whole SOC range
-                T_MIN = (tarsoc[ev_id] - inisoc[ev_id]) * bcap[ev_id] / p_chmax[ev_id]
-
-            else:
-
-                # The EV battery has a specific charger power-SOC dependency limiting the power transfer
-                table = pd.DataFrame(p_socdep[ev_id]).T
-
-                # Current SOC range of the EV
-                I = (
-                    table[
-                        (table["SOC_LB"] <= inisoc[ev_id])
-                        & (inisoc[ev_id] < table["SOC_UB"])
-                    ]
-                ).index[0]
-
-                # Target SOC range of the EV
-                F = (
-                    table[
-                        (table["SOC_LB"] <= tarsoc[ev_id])
-                        & (tarsoc[ev_id] < table["SOC_UB"])
-                    ]
-                ).index[0]
-
-                if I == F:
+    ev_ids = list(inisoc.keys())
+
+    curves = []
+    for ev_id in ev_ids:
+        curve = p_socdep.get(ev_id)
+        if isinstance(curve, dict):
+            curve = PowerSOCCurve(pd.DataFrame(curve).T)
+        curves.append(curve)
+
+    def array(param):
+        return np.array([param[ev_id] for ev_id in ev_ids], dtype=float)
+
+    p_to_ev = leastlaxityfirst_array(
+        array(inisoc),
+        array(tarsoc),
+        array(bcap),
+        array(efficiency),
+        curves,
+        array(p_chmax),
+        array(p_re),
+        array(leadtime),
+        upperlimit,
+    )
 
-                    # The current SOC is in the same range as the target SOC
-                    # The EV can be charged with a constant power until target SOC is reached
-                    p_max_in_range = table.loc[I, "P_UB"]
+    p_charge = dict(zip(ev_ids, p_to_ev.tolist()))
 
-                    # Maximum feasible power input to EV can be smaller though (taking into account the charger rating)
-                    p_max_feassible = min(p_max_in_range, p_chmax[ev_id])
+    return p_charge
 
-                    # T_MIN is determined by considering only p_max_feasible
-                    T_MIN = (
-                        (tarsoc[ev_id] - inisoc[ev_id]) * bcap[ev_id] / p_max_feassible
-                    )
 
-                else:
+def leastlaxityfirst_array(
+    inisoc,
+    tarsoc,
+    bcap,
+    efficiency,
+    p_socdep,
+    p_chmax,
+    p_re,
+    leadtime,
+    upperlimit,
+    cluster=None,
+):
+    """
+    This function is the array implementation of the least-laxity-first
+    control (see leastlaxityfirst). The EVs of multiple clusters are
+    controlled in one call: the minimum charge times are calculated from the
+    cumulative time-to-SOC tables of the power-SOC curves, the EVs are ranked
+    by their laxity within their clusters and the power limits of the
+    clusters are allocated with cumulative sums.
 
-                    # T_MIN is determined by taking into account the variations in charge power capability with SOC change
-                    # T_MIN will be summation of the minimum time spent in each SOC range
-                    time_in_range = (
-                        {}
-                    )  # Will contain the minimum time spent within a particular SOC range
+    Parameters
+    ----------
+    inisoc : numpy.ndarray
+        Initial SOCs of EV batteries (0<inisoc<1).
+    tarsoc : numpy.ndarray
+        Target SOCs of EVs (0<tarsoc<1).
+    bcap : numpy.ndarray
+        Battery capactiy of EVs (kWs).
+    efficiency : numpy.ndarray
+        Power conversion efficiencies of chargers.
+    p_socdep : list of PowerSOCCurve
+        SOC dependency of power capability of EV batteries (None for EVs
+        without SOC dependency).
+    p_chmax : numpy.ndarray
+        Maximum charge power capabilities of EVs (kW).
+    p_re : numpy.ndarray
+        Power requested by EVs (kW).
+    leadtime : numpy.ndarray
+        How long EVs are expected to stay connected (seconds).
+    upperlimit : float or numpy.ndarray
+        Upper limits of cluster power consumption (kW), one per cluster.
+    cluster : numpy.ndarray, optional
+        Positions of the EVs' clusters in upperlimit. The default is None (all
+        EVs are in the same cluster).
 
-                    # Loop through all SOC ranges to calculate the minimum time spent in each SOC range
-                    for r in range(I, F + 1):
+    Returns
+    -------
+    p_charge : numpy.ndarray
+        Charge power (kW) to each EV.
 
-                        # Parameters for the specific SOC range
-                        soc_ub_in_range = table.loc[r, "SOC_UB"]
-                        soc_lb_in_range = table.loc[r, "SOC_LB"]
-                        p_max_in_range = table.loc[r, "P_UB"]
+    """
 
-                        # Maximum feasible power input to EV in this SOC range (taking into account the charger rating)
-                        p_max_feassible = min(p_max_in_range, p_chmax[ev_id])
+    inisoc = np.asarray(inisoc, dtype=float)
+    tarsoc = np.asarray(tarsoc, dtype=float)
+    bcap = np.asarray(bcap, dtype=float)
+    efficiency = np.asarray(efficiency, dtype=float)
+    p_chmax = np.asarray(p_chmax, dtype=float)
+    p_re = np.asarray(p_re, dtype=float)
+    leadtime = np.asarray(leadtime, dtype=float)
+    upperlimit = np.atleast_1d(np.asarray(upperlimit, dtype=float))
+    nb_of_evs = len(inisoc)
+    if cluster is None:
+        cluster = np.zeros(nb_of_evs, dtype=int)
+    cluster = np.asarray(cluster, dtype=int)
+
+    if nb_of_evs == 0:
+        return np.zeros(0)
 
-                        # Calculation of minimum time spent in specific SOC range through charging
-                        if r == I:
-                            # From initial SOC to upper bound of this particular range
-                            time_in_range[r] = (
-                                (soc_ub_in_range - inisoc[ev_id])
-                                * bcap[ev_id]
-                                / p_max_feassible
-                            )
-                        elif r < F:
-                            # From lower to upper bound of this particular range
-                            time_in_range[r] = (
-                                (soc_ub_in_range - soc_lb_in_range)
-                                * bcap[ev_id]
-                                / p_max_feassible
-                            )
-                        else:  # r==F
-                            # From lower bound of this particular range to target SOC
-                            time_in_range[r] = (
-                                (tarsoc[ev_id] - soc_lb_in_range)
-                                * bcap[ev_id]
-                                / p_max_feassible
-                            )
+    # Laxity is defined with the formula LAX=1-T_MIN/T_LEAD
+    # T_MIN  : Minimum time required to achieve target SOC (T_MIN>=0)
+    # T_LEAD : Time until estimated departure (T_LEAD>0)
+    T_MIN = np.zeros(nb_of_evs)
+    charging = inisoc < tarsoc
 
-                    T_MIN = sum(time_in_range[r] for r in range(I, F + 1))
+    # EVs without power-SOC dependency are limited by p_chmax for whole SOC range
+    constant = charging & np.array([curve is None for curve in p_socdep])
+    T_MIN[constant] = (
+        (tarsoc[constant] - inisoc[constant]) * bcap[constant] / p_chmax[constant]
+    )
 
-        # Laxity of this EV's charging demand
-        LAX = 1 - T_MIN / T_LEAD
-
-        # Store in the laxity dictionary
-        laxity[ev_id] = LAX
+    # EVs sharing a curve and a charger rating share a time-to-SOC table
+    groups = {}
+    for n in np.flatnonzero(charging & ~constant):
+        key = (id(p_socdep[n]), p_chmax[n])
+        groups.setdefault(key, (p_socdep[n], []))[1].append(n)
+    for curve, members in groups.values():
+        members = np.array(members)
+        T_MIN[members] = curve.min_charge_time(
+            inisoc[members], tarsoc[members], bcap[members], p_chmax[members[0]]
+        )
+
+    laxity = 1 - T_MIN / leadtime
+
+    # EVs are arranged in a table with a row per cluster; empty cells are
+    # ranked last with zero requests
+    nb_of_clusters = len(upperlimit)
+    counts = np.bincount(cluster, minlength=nb_of_clusters)
+    members = np.argsort(cluster, kind="stable")
+    column = np.arange(nb_of_evs) - np.repeat(np.cumsum(counts) - counts, counts)
+    row = cluster[members]
+
+    table_laxity = np.full((nb_of_clusters, counts.max()), np.inf)
+    table_laxity[row, column] = laxity[members]
+    table_request = np.zeros((nb_of_clusters, counts.max()))
+    table_request[row, column] = (p_re / efficiency)[members]
 
     # Sorting EVs according to their laxity (least laxity first)
-    vehicles_sorted = (pd.Series(laxity).sort_values(ascending=True)).index
-
-    p_charge = {}  # Will contain the charge power consumed by the EVs
-    free_margin = upperlimit  # Cluster level constraint
-
-    for ev in vehicles_sorted:
-
-        # The power that charger wants to withdraw from grid to meet EV's request
-        p_max_to_cu = p_re[ev] / efficiency[ev]
+    rank = np.argsort(table_laxity, axis=1)
+    request = np.take_along_axis(table_request, rank, axis=1)
 
-        if p_max_to_cu <= free_margin:
-
-            # The grid has enough margin to suppy the requested amount
-            p_to_ev = p_max_to_cu * efficiency[ev]
-
-        else:
-
-            # The grid does not have enough margin to supply the requested amount
-            p_to_ev = free_margin * efficiency[ev]
-
-        # This EV will get p_to_ev amount of power in this control horizon
-        p_charge[ev] = p_to_ev
+    # Each EV gets its request as long as the cluster has margin
+    demand = np.cumsum(request, axis=1)
+    free_margin = np.hstack(
+        (upperlimit[:, None], np.maximum(upperlimit[:, None] - demand[:, :-1], 0.0))
+    )
+    allocation = np.empty_like(request)
+    np.put_along_axis(allocation, rank, np.minimum(request, free_margin), axis=1)
 
-        # Available margin is closed after dedicating certain capacity to the EVs
-        free_margin -= p_to_ev / efficiency[ev]
+    p_charge = np.empty(nb_of_evs)
+    p_charge[members] = allocation[row, column] * efficiency[members]
 
     return p_charge
 
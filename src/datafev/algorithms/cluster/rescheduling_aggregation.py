@@ -0,0 +1,430 @@
+# The datafev framework
+
+# Copyright (C) 2022,
+# Institute for Automation of Complex Power Systems (ACS),
+# E.ON Energy Research Center (E.ON ERC),
+# RWTH Aachen University
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+# documentation files (the "Software"), to deal in the Software without restriction, including without limitation the
+# rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit
+# persons to whom the Software is furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of the
+# Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE
+# WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+# COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+# OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+
+
+import math
+import numpy as np
+from datafev.algorithms.cluster import rescheduling_milp
+
+_TOL = 1e-9
+
+
+def _groups(
+    opt_step,
+    steps,
+    bcap,
+    inisoc,
+    tarsoc,
+    ch_eff,
+    ds_eff,
+    pmax_pos,
+    pmax_neg,
+    deptime,
+    energy_bins,
+):
+    # Groups the EVs by their departures within the horizon, the efficiencies
+    # of their chargers, their V2G capability and the part of their charging
+    # capability that is required to reach their target SOCs (energy envelope)
+    groups = {}
+    for v in bcap.keys():
+        dep = min(max(math.ceil(deptime[v]), 0), len(steps))
+        capability = pmax_pos[v] * opt_step * dep
+        if capability > 0:
+            ratio = (tarsoc[v] - inisoc[v]) * bcap[v] / capability
+        else:
+            ratio = 0.0
+        level = int(np.floor(ratio * energy_bins))
+        level = min(max(level, -energy_bins), energy_bins)
+        key = (dep, ch_eff[v], ds_eff[v], pmax_neg[v] > 0, level)
+        groups.setdefault(key, []).append(v)
+    return list(groups.values())
+
+
+def _priority_fill(amount, caps, order):
+    # Allocates the amount to the EVs in the given order up to their capacities
+    c = caps[order]
+    alloc = np.zeros(len(caps))
+    alloc[order] = np.clip(amount - (np.cumsum(c) - c), 0.0, c)
+    return alloc
+
+
+def _disaggregate(
+    opt_step,
+    steps,
+    charge,
+    discharge,
+    E,
+    s_ini,
+    s_tar,
+    s_min,
+    p_pos,
+    p_neg,
+    eff_ch,
+    eff_ds,
+    dep,
+):
+    # Power and SOC trajectories of the EVs. At each time step, the charging
+    # consumption of the virtual batteries is allocated to the EVs that have
+    # not reached their target SOCs in the order of their laxities (least
+    # laxity first). The discharging of the virtual batteries is allocated to
+    # the other EVs in the reverse order (within their minimum SOCs); the
+    # discharging that cannot be allocated reduces the charging.
+    p = np.zeros((len(E), len(steps)))
+    s = np.zeros((len(E), len(steps) + 1))
+    s[:, 0] = s_ini
+    for n in range(len(steps)):
+        available = n < dep
+        need = np.maximum(s_tar - s[:, n], 0.0) * E / opt_step
+        laxity = (dep - n) - need / np.maximum(p_pos, _TOL)
+        p_ch = np.where(available, np.minimum(p_pos, need), 0.0)
+        p_ds = np.minimum(p_neg, np.maximum(s[:, n] - s_min, 0.0) * E / opt_step)
+        p_ds = np.where(available, p_ds, 0.0)
+
+        ch = _priority_fill(charge[n], p_ch / eff_ch, np.argsort(laxity, kind="stable"))
+        ds = _priority_fill(
+            discharge[n],
+            np.where(ch > 0, 0.0, p_ds * eff_ds),
+            np.argsort(-laxity, kind="stable"),
+        )
+        ch -= _priority_fill(
+            discharge[n] - ds.sum(), ch, np.argsort(-laxity, kind="stable")
+        )
+
+        p[:, n] = ch * eff_ch - ds / eff_ds
+        s[:, n + 1] = s[:, n] + p[:, n] * opt_step / E
+    return p, s
+
+
+def objective(
+    opt_horizon,
+    upperlimit,
+    lowerlimit,
+    bcap,
+    tarsoc,
+    ch_eff,
+    ds_eff,
+    rho_y,
+    rho_eps,
+    p_schedule,
+    s_schedule,
+):
+    """
+    This function evaluates the objective of the rescheduling problem of
+    datafev.algorithms.cluster.rescheduling_milp for given schedules.
+
+    Parameters
+    ----------
+    opt_horizon : list of integers
+        Time step identifiers in the optimization horizon.
+    upperlimit : dict of float
+        Soft upper limit of cluster power consumption (kW).
+    lowerlimit : dict of float
+        Soft lower limit of cluster power consumption (kW).
+    bcap : dict of float
+        Battery capactiy of EVs (kWs).
+    tarsoc : dict of float
+        Target SOCs of EVs (0<inisoc[key]<1).
+    ch_eff : dict of float
+        Charging efficiency of chargers.
+    ds_eff : dict of float
+        Discharging efficiency of chargers.
+    rho_y : float
+        Penalty factor for deviation of reference schedules (unitless).
+    rho_eps : float
+        Penalty factor for violation of upper-lower soft limits (unitless).
+    p_schedule : dict
+        Power schedules of the EVs.
+    s_schedule : dict
+        SOC schedules of the EVs.
+
+    Returns
+    -------
+    float
+        Objective value.
+
+    """
+
+    steps = opt_horizon[:-1]
+    last = max(opt_horizon)
+    consumption = dict.fromkeys(steps, 0.0)
+    deviation = 0.0
+    for v in bcap.keys():
+        for t in steps:
+            p = p_schedule[v][t]
+            consumption[t] += max(p, 0.0) / ch_eff[v] + min(p, 0.0) * ds_eff[v]
+        deviation += abs(tarsoc[v] - s_schedule[v][last]) * bcap[v] / 3600
+    violation = max(
+        [0.0]
+        + [consumption[t] - upperlimit[t] for t in steps]
+        + [lowerlimit[t] - consumption[t] for t in steps]
+    )
+    return rho_y * deviation + rho_eps * violation
+
+
+def reschedule(
+    solver,
+    opt_step,
+    opt_horizon,
+    upperlimit,
+    lowerlimit,
+    tolerance,
+    bcap,
+    inisoc,
+    tarsoc,
+    minsoc,
+    maxsoc,
+    ch_eff,
+    ds_eff,
+    pmax_pos,
+    pmax_neg,
+    deptime,
+    rho_y,
+    rho_eps,
+    energy_bins=4,
+    statistics=None,
+    time_limit=None,
+):
+    """
+    This function reschedules the charging operations of a cluster by solving
+    the rescheduling problem of datafev.algorithms.cluster.rescheduling_milp
+    on virtual batteries instead of individual EVs:
+        - The EVs are grouped by their departures within the horizon, the
+          efficiencies of their chargers, their V2G capability and the part
+          of their charging capability required to reach their target SOCs
+          (energy_bins levels between 0 and 1, negative levels for the EVs
+          above their targets).
+        - Each group is represented by a virtual battery with the sum of the
+          capacities, energies and power limits of its members. The number of
+          virtual batteries (and therefore the size of the problem) is bounded
+          by the number of time steps and levels, independent of the number
+          of EVs.
+        - The charging and discharging of the virtual batteries at each time
+          step is disaggregated by priority: the charging consumption is
+          allocated to the EVs below their target SOCs in the order of their
+          laxities (least laxity first), the discharging to the other EVs in
+          the reverse order. The discharging that cannot be allocated reduces
+          the charging, so the consumption of the cluster does not exceed the
+          consumption of the aggregated solution.
+
+    The aggregated problem is a relaxation of the problem of the individual
+    EVs: its objective is a lower bound of the optimal objective of the full
+    model (if solved to optimality) unless lossy chargers are required to
+    meet the lower limit. The objective of the disaggregated schedules is an
+    upper bound. Their difference bounds the approximation gap.
+
+    Parameters
+    ----------
+    solver : pyomo SolverFactory object or HighsSolver
+        Optimization solver.
+    opt_step : int
+        Size of one time step in the optimization (seconds).
+    opt_horizon : list of integers
+        Time step identifiers in the optimization horizon.
+    upperlimit : dict of float
+        Soft upper limit of cluster power consumption (kW).
+    lowerlimit : dict of float
+        Soft lower limit of cluster power consumption (kW).
+    tolerance : float
+        Maximum allowed violation of upper-lower limits (kW).
+    bcap : dict of float
+        Battery capactiy of EVs (kWs).
+    inisoc : dict of float
+        Initial SOCs of EV batteries (0<inisoc[key]<1).
+    tarsoc : dict of float
+        Target SOCs of EVs (0<inisoc[key]<1).
+    minsoc : dict of float
+        Minimum allowed SOCs.
+    maxsoc : dict of float
+        Maximum allowed SOCs.
+    ch_eff : dict of float
+        Charging efficiency of chargers.
+    ds_eff : dict of float
+        Discharging efficiency of chargers.
+    pmax_pos : dict of float
+        Maximum charge power that EV battery can withdraw (kW).
+    pmax_neg : dict of float
+        Maximum discharge power that EV battery can supply (kW).
+    deptime : dict of int
+        Number of time steps until departures of EVs.
+    rho_y : float
+        Penalty factor for deviation of reference schedules (unitless).
+    rho_eps : float
+        Penalty factor for violation of upper-lower soft limits (unitless).
+    energy_bins : int, optional
+        Number of levels of the required part of the charging capability.
+        The default is 4.
+    statistics : dict, optional
+        Dictionary to enter the statistics of the solution process of the
+        aggregated problem (see datafev.algorithms.warmstart.solve_model) and
+        of the approximation:
+            - Virtual Batteries --> Number of virtual batteries,
+            - Aggregate Objective --> Objective of the aggregated problem,
+            - Objective --> Objective of the disaggregated schedules,
+            - Approximation Gap --> Difference of the objectives.
+        The default is None.
+    time_limit : float, optional
+        Time limit of the solver (seconds). If it is reached, the best
+        solution found so far is disaggregated. The default is None (no limit).
+
+    Returns
+    -------
+    p_schedule : dict
+        Power schedule.
+        It contains a dictionary for each EV. Each item in the EV dictionary
+        indicates the power to be supplied to the EV(kW) during a particular
+        time step.
+    s_schedule : dict
+        SOC schedule.
+        It contains a dictionary for each EV. Each item in the EV dictionary
+        indicates the SOC to be achieved by the EV by a particular time step.
+
+    """
+
+    steps = opt_horizon[:-1]
+    groups = _groups(
+        opt_step,
+        steps,
+        bcap,
+        inisoc,
+        tarsoc,
+        ch_eff,
+        ds_eff,
+        pmax_pos,
+        pmax_neg,
+        deptime,
+        energy_bins,
+    )
+
+    # Parameters of the virtual batteries
+    bcap_g = {}
+    inisoc_g = {}
+    tarsoc_g = {}
+    minsoc_g = {}
+    maxsoc_g = {}
+    ch_eff_g = {}
+    ds_eff_g = {}
+    pmax_pos_g = {}
+    pmax_neg_g = {}
+    deptime_g = {}
+    for g, members in enumerate(groups):
+        bcap_g[g] = sum(bcap[v] for v in members)
+        inisoc_g[g] = sum(inisoc[v] * bcap[v] for v in members) / bcap_g[g]
+        tarsoc_g[g] = sum(tarsoc[v] * bcap[v] for v in members) / bcap_g[g]
+        minsoc_g[g] = sum(minsoc[v] * bcap[v] for v in members) / bcap_g[g]
+        maxsoc_g[g] = sum(maxsoc[v] * bcap[v] for v in members) / bcap_g[g]
+        ch_eff_g[g] = ch_eff[members[0]]
+        ds_eff_g[g] = ds_eff[members[0]]
+        pmax_pos_g[g] = sum(pmax_pos[v] for v in members)
+        pmax_neg_g[g] = sum(pmax_neg[v] for v in members)
+        deptime_g[g] = min(max(math.ceil(deptime[members[0]]), 0), len(steps))
+
+    p_group, s_group = rescheduling_milp.reschedule(
+        solver,
+        opt_step,
+        opt_horizon,
+        upperlimit,
+        lowerlimit,
+        tolerance,
+        bcap_g,
+        inisoc_g,
+        tarsoc_g,
+        minsoc_g,
+        maxsoc_g,
+        ch_eff_g,
+        ds_eff_g,
+        pmax_pos_g,
+        pmax_neg_g,
+        deptime_g,
+        rho_y,
+        rho_eps,
+        statistics=statistics,
+        time_limit=time_limit,
+    )
+
+    if any(p.get(steps[0]) is None for p in p_group.values()):
+        # No solution of the aggregated problem
+        p_schedule = {v: dict.fromkeys(steps) for v in bcap.keys()}
+        s_schedule = {v: dict.fromkeys(opt_horizon) for v in bcap.keys()}
+        return p_schedule, s_schedule
+
+    # Charging and discharging consumption of the virtual batteries
+    charge = np.zeros(len(steps))
+    discharge = np.zeros(len(steps))
+    for g in p_group.keys():
+        p_g = np.array([p_group[g][t] for t in steps], dtype=float)
+        charge += np.maximum(p_g, 0.0) / ch_eff_g[g]
+        discharge -= np.minimum(p_g, 0.0) * ds_eff_g[g]
+
+    evs = list(bcap.keys())
+    p, s = _disaggregate(
+        opt_step,
+        steps,
+        charge,
+        discharge,
+        np.array([bcap[v] for v in evs], dtype=float),
+        np.array([inisoc[v] for v in evs], dtype=float),
+        np.array([tarsoc[v] for v in evs], dtype=float),
+        np.array([minsoc[v] for v in evs], dtype=float),
+        np.array([pmax_pos[v] for v in evs], dtype=float),
+        np.array([pmax_neg[v] for v in evs], dtype=float),
+        np.array([ch_eff[v] for v in evs], dtype=float),
+        np.array([ds_eff[v] for v in evs], dtype=float),
+        np.array([min(max(math.ceil(deptime[v]), 0), len(steps)) for v in evs]),
+    )
+    p_schedule = {}
+    s_schedule = {}
+    for n, v in enumerate(evs):
+        p_schedule[v] = dict(zip(steps, p[n].tolist()))
+        s_schedule[v] = dict(zip(opt_horizon, s[n].tolist()))
+
+    if statistics is not None:
+        statistics["Virtual Batteries"] = len(groups)
+        statistics["Aggregate Objective"] = objective(
+            opt_horizon,
+            upperlimit,
+            lowerlimit,
+            bcap_g,
+            tarsoc_g,
+            ch_eff_g,
+            ds_eff_g,
+            rho_y,
+            rho_eps,
+            p_group,
+            s_group,
+        )
+        statistics["Objective"] = objective(
+            opt_horizon,
+            upperlimit,
+            lowerlimit,
+            bcap,
+            tarsoc,
+            ch_eff,
+            ds_eff,
+            rho_y,
+            rho_eps,
+            p_schedule,
+            s_schedule,
+        )
+        statistics["Approximation Gap"] = (
+            statistics["Objective"] - statistics["Aggregate Objective"]
+        )
+
+    return p_schedule, s_schedule
@@ -20,7 +20,19 @@
 
 
 from pyomo.core import *
+import numpy as np
 import pyomo.kernel as pmo
+from datafev.algorithms.warmstart import (
+    start_trajectory,
+    set_ev_warmstart,
+    solve_model,
+)
+from datafev.algorithms.matrix_form import (
+    MatrixModel,
+    HighsSolver,
+    add_ev_constraints,
+    get_ev_schedules,
+)
 
 
 def reschedule(
@@ -42,6 +54,9 @@ def reschedule(
     deptime,
     rho_y,
     rho_eps,
+    warmstart=None,
+    statistics=None,
+    time_limit=None,
 ):
     """
     This function reschedules the charging operations of a cluster by considering:
@@ -53,8 +68,9 @@ def reschedule(
 
     Parameters
     ----------
-    solver : pyomo SolverFactory object
-        Optimization solver.
+    solver : pyomo SolverFactory object or HighsSolver
+        Optimization solver. The model is assembled in matrix form if a
+        datafev.algorithms.matrix_form.HighsSolver is given.
     opt_step : int
         Size of one time step in the optimization (seconds).
     opt_horizon : list of integers
@@ -89,6 +105,18 @@ def reschedule(
         Penalty factor for deviation of reference schedules (unitless).
     rho_eps : float
         Penalty factor for violation of upper-lower soft limits (unitless).
+    warmstart : dict, optional
+        Power schedules used as a start solution (e.g., the schedules of the
+        previous control step shifted by one step). The start solution is
+        made feasible for the EV constraints before it is passed to the
+        solver. It is ignored by HighsSolver ('Warm Start Ignored' in the
+        statistics). The default is None (no start solution).
+    statistics : dict, optional
+        Dictionary to enter the statistics of the solution process
+        (see datafev.algorithms.warmstart.solve_model). The default is None.
+    time_limit : float, optional
+        Time limit of the solver (seconds). If it is reached, the best
+        solution found so far is returned. The default is None (no limit).
 
     Returns
     -------
@@ -104,6 +132,33 @@ def reschedule(
         
     """
 
+    if isinstance(solver, HighsSolver):
+        if statistics is not None:
+            # The matrix models are solved without start solutions
+            statistics["Warm Start Ignored"] = warmstart is not None
+        return _reschedule_matrix(
+            solver,
+            opt_step,
+            opt_horizon,
+            upperlimit,
+            lowerlimit,
+            tolerance,
+            bcap,
+            inisoc,
+            tarsoc,
+            minsoc,
+            maxsoc,
+            ch_eff,
+            ds_eff,
+            pmax_pos,
+            pmax_neg,
+            deptime,
+            rho_y,
+            rho_eps,
+            statistics,
+            time_limit,
+        )
+
     ###########################################################################
     ####################Constructing the optimization model####################
     model = ConcreteModel()
@@ -269,7 +324,32 @@ def reschedule(
 
     ###########################################################################
     ######################Solving the optimization model ######################
-    result = solver.solve(model)
+    if warmstart is not None:
+        p_start = set_ev_warmstart(
+            model,
+            warmstart,
+            opt_step,
+            opt_horizon,
+            bcap,
+            inisoc,
+            tarsoc,
+            minsoc,
+            maxsoc,
+            pmax_pos,
+            pmax_neg,
+            deptime,
+        )
+        eps_start = 0.0
+        for t in model.T:
+            p_cc = sum(
+                max(p_start[v][t], 0) / ch_eff[v] + min(p_start[v][t], 0) * ds_eff[v]
+                for v in model.V
+            )
+            model.p_cc[t].set_value(p_cc)
+            eps_start = max(eps_start, p_cc - upperlimit[t], lowerlimit[t] - p_cc)
+        model.eps.set_value(eps_start)
+
+    result = solve_model(solver, model, warmstart is not None, statistics, time_limit)
     ###########################################################################
 
     ###########################################################################
@@ -288,11 +368,594 @@ def reschedule(
     return p_schedule, s_schedule
 
 
+def _reschedule_matrix(
+    solver,
+    opt_step,
+    opt_horizon,
+    upperlimit,
+    lowerlimit,
+    tolerance,
+    bcap,
+    inisoc,
+    tarsoc,
+    minsoc,
+    maxsoc,
+    ch_eff,
+    ds_eff,
+    pmax_pos,
+    pmax_neg,
+    deptime,
+    rho_y,
+    rho_eps,
+    statistics=None,
+    time_limit=None,
+):
+    # Matrix form of the model of 'reschedule' (solved by HighsSolver)
+    evs = list(bcap.keys())
+    steps = opt_horizon[:-1]
+
+    ###########################################################################
+    ####################Constructing the optimization model####################
+    model = MatrixModel()
+    ev = add_ev_constraints(
+        model,
+        opt_step,
+        opt_horizon,
+        bcap,
+        inisoc,
+        minsoc,
+        maxsoc,
+        pmax_pos,
+        pmax_neg,
+        deptime,
+    )
+
+    E = np.array([bcap[v] for v in evs], dtype=float)
+    eff_ch = np.array([ch_eff[v] for v in evs], dtype=float)[:, None]
+    eff_ds = np.array([ds_eff[v] for v in evs], dtype=float)[:, None]
+    s_tar = np.array([tarsoc[v] for v in evs], dtype=float)
+    upper = np.array([upperlimit[t] for t in steps], dtype=float)
+    lower = np.array([lowerlimit[t] for t in steps], dtype=float)
+
+    p_cc = model.add_variables(len(steps), lb=-np.inf)
+    eps = model.add_variables(1, ub=tolerance)
+    y = model.add_variables(len(evs))
+
+    # Mapping EV powers to CC power
+    rows = model.add_constraints(len(steps), lb=0.0, ub=0.0)
+    model.add_terms(rows, 1.0, p_cc)
+    model.add_terms(rows[None, :], -1 / eff_ch, ev["p_ev_pos"])
+    model.add_terms(rows[None, :], eff_ds, ev["p_ev_neg"])
+
+    # Upper-lower limits of aggregate power consumption
+    rows = model.add_constraints(len(steps), ub=upper)
+    model.add_terms(rows, 1.0, p_cc)
+    model.add_terms(rows, -1.0, eps)
+    rows = model.add_constraints(len(steps), lb=lower)
+    model.add_terms(rows, 1.0, p_cc)
+    model.add_terms(rows, 1.0, eps)
+
+    # Deviations from the target SOCs
+    rows = model.add_constraints(len(evs), lb=s_tar)
+    model.add_terms(rows, 1.0, ev["s"][:, -1])
+    model.add_terms(rows, 1.0, y)
+    rows = model.add_constraints(len(evs), ub=s_tar)
+    model.add_terms(rows, 1.0, ev["s"][:, -1])
+    model.add_terms(rows, -1.0, y)
+
+    model.add_objective(rho_y * E / 3600, y)
+    model.add_objective(rho_eps, eps)
+    ###########################################################################
+
+    x = solver.solve(model, statistics, time_limit)
+
+    return get_ev_schedules(x, ev, evs, opt_horizon)
+
+
+def presolve(
+    opt_step,
+    opt_horizon,
+    upperlimit,
+    lowerlimit,
+    bcap,
+    inisoc,
+    tarsoc,
+    minsoc,
+    maxsoc,
+    ch_eff,
+    ds_eff,
+    pmax_pos,
+    pmax_neg,
+    deptime,
+):
+    """
+    This function identifies the EVs whose schedules in the rescheduling
+    problem of 'reschedule' can be fixed without optimization:
+        - EVs that cannot charge anymore (departure before the current step)
+          or that cannot charge nor discharge are idle,
+        - EVs that are at or above their target SOCs and cannot discharge are
+          idle if the lower limit of the cluster cannot be reached by the
+          discharging of all EVs (charging them would only increase their
+          deviations),
+        - EVs that cannot reach their target SOCs even when charging at
+          maximum power until their departures (non-positive laxity) charge
+          at maximum power if the upper limit of the cluster cannot be reached
+          by the charging of all EVs at maximum power.
+
+    None of the fixes changes the optimal objective: the urgent EVs are kept
+    in the problem whenever the upper limit may bind.
+
+    The EVs whose initial SOCs violate their SOC limits are not fixed.
+
+    Parameters
+    ----------
+    opt_step : int
+        Size of one time step in the optimization (seconds).
+    opt_horizon : list of integers
+        Time step identifiers in the optimization horizon.
+    upperlimit : dict of float
+        Soft upper limit of cluster power consumption (kW).
+    lowerlimit : dict of float
+        Soft lower limit of cluster power consumption (kW).
+    bcap : dict of float
+        Battery capactiy of EVs (kWs).
+    inisoc : dict of float
+        Initial SOCs of EV batteries (0<inisoc[key]<1).
+    tarsoc : dict of float
+        Target SOCs of EVs (0<inisoc[key]<1).
+    minsoc : dict of float
+        Minimum allowed SOCs.
+    maxsoc : dict of float
+        Maximum allowed SOCs.
+    ch_eff : dict of float
+        Charging efficiency of chargers.
+    ds_eff : dict of float
+        Discharging efficiency of chargers.
+    pmax_pos : dict of float
+        Maximum charge power that EV battery can withdraw (kW).
+    pmax_neg : dict of float
+        Maximum discharge power that EV battery can supply (kW).
+    deptime : dict of int
+        Number of time steps until departures of EVs.
+
+    Returns
+    -------
+    p_schedule : dict
+        Power schedules of the fixed EVs.
+    s_schedule : dict
+        SOC schedules of the fixed EVs.
+    upperlimit : dict of float
+        Upper limit of the power consumption of the other EVs (kW).
+    lowerlimit : dict of float
+        Lower limit of the power consumption of the other EVs (kW).
+
+    """
+
+    steps = opt_horizon[:-1]
+    p_schedule = {}
+    s_schedule = {}
+    consumption = dict.fromkeys(steps, 0.0)
+
+    # Lowest consumption of the cluster (all EVs discharging at maximum power)
+    min_consumption = -sum(pmax_neg[v] * ds_eff[v] for v in bcap.keys())
+    lower_binds = any(min_consumption < lowerlimit[t] for t in steps)
+
+    # Highest consumption of the cluster (all EVs charging at maximum power)
+    upper_binds = any(
+        sum(pmax_pos[v] / ch_eff[v] for v in bcap.keys() if t < deptime[v])
+        > upperlimit[t]
+        for t in steps
+    )
+
+    for v in bcap.keys():
+        if not minsoc[v] <= inisoc[v] <= maxsoc[v]:
+            continue
+        idle = (
+            deptime[v] <= min(steps)
+            or (pmax_pos[v] == 0 and pmax_neg[v] == 0)
+            or (inisoc[v] >= tarsoc[v] and pmax_neg[v] == 0 and not lower_binds)
+        )
+        if idle:
+            p_schedule[v] = dict.fromkeys(steps, 0.0)
+            s_schedule[v] = dict.fromkeys(opt_horizon, inisoc[v])
+            continue
+
+        # Trajectory of charging at maximum power until departure
+        p = {t: pmax_pos[v] if t < deptime[v] else 0.0 for t in steps}
+        s = {opt_horizon[0]: inisoc[v]}
+        for t in steps:
+            s[t + 1] = s[t] + p[t] * opt_step / bcap[v]
+        if (
+            not upper_binds
+            and s[max(opt_horizon)] <= tarsoc[v]
+            and all(s[t] <= maxsoc[v] for t in steps)
+        ):
+            for t in steps:
+                consumption[t] += p[t] / ch_eff[v]
+            p_schedule[v] = p
+            s_schedule[v] = s
+
+    upperlimit = {t: upperlimit[t] - consumption[t] for t in steps}
+    lowerlimit = {t: lowerlimit[t] - consumption[t] for t in steps}
+
+    return p_schedule, s_schedule, upperlimit, lowerlimit
+
+
+class Rescheduler(object):
+    """
+    Persistent version of the rescheduling model of 'reschedule'. The model is
+    constructed once and kept between the control steps: the data that changes
+    from step to step (e.g., initial SOCs, power limits, departures) is entered
+    in mutable parameters and the EV-specific parts of the model are added or
+    removed upon arrival or departure of EVs. Persistent solver interfaces
+    (e.g., appsi_highs) therefore only receive the modifications of the model.
+
+    The departure of an EV is represented by an availability parameter that
+    fixes the charge/discharge power of the EV to zero after its estimated
+    departure. The model is therefore equivalent to the one of 'reschedule'.
+    """
+
+    def __init__(self, solver):
+        """
+        Reschedulers are initialized without a model. The model is constructed
+        in the first call of 'reschedule'.
+
+        Parameters
+        ----------
+        solver : pyomo SolverFactory object or HighsSolver
+            Optimization solver. Persistent solver interfaces of the appsi
+            family update their instance with the changes of the model.
+            Matrix models (HighsSolver) are not kept between the calls.
+
+        Returns
+        -------
+        None.
+
+        """
+
+        self.solver = solver
+        self.model = None
+        self.opt_step = None
+        self.opt_horizon = None
+
+        # EV blocks of the model (keys are the EV identifiers)
+        self.blocks = {}
+        self.nb_of_blocks = 0
+
+    def _construct(self, opt_step, opt_horizon):
+        # Constructs the cluster-level part of the model
+        model = ConcreteModel()
+
+        # Time parameters
+        model.deltaSec = opt_step
+        model.T = Set(initialize=opt_horizon[:-1], ordered=True)
+        model.Tp = Set(initialize=opt_horizon, ordered=True)
+
+        # Cluster parameters
+        model.P_CC_up = Param(model.T, initialize=0.0, mutable=True)
+        model.P_CC_low = Param(model.T, initialize=0.0, mutable=True)
+        model.P_CC_vio = Param(initialize=0.0, mutable=True)
+
+        # Penalty parameters
+        model.rho_y = Param(initialize=0.0, mutable=True)
+        model.rho_eps = Param(initialize=0.0, mutable=True)
+
+        # System variables
+        model.p_cc = Var(model.T, within=Reals)
+        model.eps = Var(within=NonNegativeReals)
+
+        # CONSTRAINTS
+        def cluster_limit_violation(model):
+            return model.eps <= model.P_CC_vio
+
+        model.viol_clust = Constraint(rule=cluster_limit_violation)
+
+        def cluster_upper_limit(model, t):
+            return model.p_cc[t] <= model.eps + model.P_CC_up[t]
+
+        model.ccpowcap_pos = Constraint(model.T, rule=cluster_upper_limit)
+
+        def cluster_lower_limit(model, t):
+            return -model.eps + model.P_CC_low[t] <= model.p_cc[t]
+
+        model.ccpowcap_neg = Constraint(model.T, rule=cluster_lower_limit)
+
+        self.model = model
+        self.opt_step = opt_step
+        self.opt_horizon = list(opt_horizon)
+        self.blocks = {}
+
+    def _add_ev(self, ev_id):
+        # Adds the variables and constraints of an EV to the model
+        model = self.model
+        last = max(self.opt_horizon)
+
+        b = Block()
+        self.nb_of_blocks += 1
+        model.add_component("ev_" + str(self.nb_of_blocks), b)
+
+        # EV parameters
+        b.E = Param(initialize=1.0, mutable=True)
+        b.eff_ch = Param(initialize=1.0, mutable=True)
+        b.eff_ds = Param(initialize=1.0, mutable=True)
+        b.P_EV_pos = Param(initialize=0.0, mutable=True)
+        b.P_EV_neg = Param(initialize=0.0, mutable=True)
+        b.s_ini = Param(initialize=0.0, mutable=True)
+        b.s_tar = Param(initialize=0.0, mutable=True)
+        b.s_min = Param(initialize=0.0, mutable=True)
+        b.s_max = Param(initialize=1.0, mutable=True)
+        b.a = Param(model.T, initialize=1.0, mutable=True)  # 0 after departure
+
+        # EV variables
+        b.p_ev = Var(model.T, within=Reals)
+        b.p_ev_pos = Var(model.T, within=NonNegativeReals)
+        b.p_ev_neg = Var(model.T, within=NonNegativeReals)
+        b.x_ev = Var(model.T, within=pmo.Binary)
+        b.s = Var(model.Tp, within=NonNegativeReals)
+        b.y = Var(within=NonNegativeReals)
+
+        # EV constraints
+        b.inisoc = Constraint(expr=b.s[0] == b.s_ini)
+        b.minsoc_con = Constraint(model.T, rule=lambda b, t: b.s_min <= b.s[t])
+        b.maxsoc_con = Constraint(model.T, rule=lambda b, t: b.s_max >= b.s[t])
+        b.socconst = Constraint(
+            model.T,
+            rule=lambda b, t: b.s[t + 1]
+            == b.s[t] + (b.p_ev_pos[t] - b.p_ev_neg[t]) / b.E * model.deltaSec,
+        )
+        b.chrpowconst = Constraint(
+            model.T, rule=lambda b, t: b.p_ev[t] == b.p_ev_pos[t] - b.p_ev_neg[t]
+        )
+        b.combconst1 = Constraint(
+            model.T, rule=lambda b, t: b.p_ev_pos[t] <= b.x_ev[t] * b.P_EV_pos * b.a[t]
+        )
+        b.combconst2 = Constraint(
+            model.T,
+            rule=lambda b, t: b.p_ev_neg[t] <= (1 - b.x_ev[t]) * b.P_EV_neg * b.a[t],
+        )
+        b.indev_pos = Constraint(expr=b.s_tar - b.s[last] <= b.y)
+        b.indev_neg = Constraint(expr=-b.y <= b.s_tar - b.s[last])
+
+        self.blocks[ev_id] = b
+
+    def _remove_ev(self, ev_id):
+        # Removes the variables and constraints of an EV from the model
+        self.model.del_component(self.blocks.pop(ev_id))
+
+    def _link(self):
+        # (Re)constructs the constraints and the objective that couple the EVs
+        model = self.model
+        for name in ["ccpowtotal", "obj"]:
+            if model.component(name) is not None:
+                model.del_component(name)
+
+        blocks = [self.blocks[v] for v in sorted(self.blocks.keys())]
+
+        def ccpower(model, t):
+            return model.p_cc[t] == sum(
+                b.p_ev_pos[t] / b.eff_ch - b.p_ev_neg[t] * b.eff_ds for b in blocks
+            )
+
+        model.ccpowtotal = Constraint(model.T, rule=ccpower)
+
+        model.obj = Objective(
+            expr=model.rho_y * sum(b.y * b.E / 3600 for b in blocks)
+            + model.rho_eps * model.eps,
+            sense=minimize,
+        )
+
+    def reschedule(
+        self,
+        opt_step,
+        opt_horizon,
+        upperlimit,
+        lowerlimit,
+        tolerance,
+        bcap,
+        inisoc,
+        tarsoc,
+        minsoc,
+        maxsoc,
+        ch_eff,
+        ds_eff,
+        pmax_pos,
+        pmax_neg,
+        deptime,
+        rho_y,
+        rho_eps,
+        warmstart=None,
+        statistics=None,
+        time_limit=None,
+    ):
+        """
+        This method updates the model with the current data and solves it.
+        The parameters and the returned schedules are the same as those of the
+        function 'reschedule'.
+
+        Parameters
+        ----------
+        opt_step : int
+            Size of one time step in the optimization (seconds).
+        opt_horizon : list of integers
+            Time step identifiers in the optimization horizon.
+        upperlimit : dict of float
+            Soft upper limit of cluster power consumption (kW).
+        lowerlimit : dict of float
+            Soft lower limit of cluster power consumption (kW).
+        tolerance : float
+            Maximum allowed violation of upper-lower limits (kW).
+        bcap : dict of float
+            Battery capactiy of EVs (kWs).
+        inisoc : dict of float
+            Initial SOCs of EV batteries (0<inisoc[key]<1).
+        tarsoc : dict of float
+            Target SOCs of EVs (0<inisoc[key]<1).
+        minsoc : dict of float
+            Minimum allowed SOCs.
+        maxsoc : dict of float
+            Maximum allowed SOCs.
+        ch_eff : dict of float
+            Charging efficiency of chargers.
+        ds_eff : dict of float
+            Discharging efficiency of chargers.
+        pmax_pos : dict of float
+            Maximum charge power that EV battery can withdraw (kW).
+        pmax_neg : dict of float
+            Maximum discharge power that EV battery can supply (kW).
+        deptime : dict of int
+            Number of time steps until departures of EVs.
+        rho_y : float
+            Penalty factor for deviation of reference schedules (unitless).
+        rho_eps : float
+            Penalty factor for violation of upper-lower soft limits (unitless).
+        warmstart : dict, optional
+            Power schedules used as a start solution. The default is None.
+        statistics : dict, optional
+            Dictionary to enter the statistics of the solution process.
+            The default is None.
+        time_limit : float, optional
+            Time limit of the solver (seconds). The default is None.
+
+        Returns
+        -------
+        p_schedule : dict
+            Power schedule.
+        s_schedule : dict
+            SOC schedule.
+
+        """
+
+        if isinstance(self.solver, HighsSolver):
+            # Matrix models are assembled from scratch at negligible cost
+            return reschedule(
+                self.solver,
+                opt_step,
+                opt_horizon,
+                upperlimit,
+                lowerlimit,
+                tolerance,
+                bcap,
+                inisoc,
+                tarsoc,
+                minsoc,
+                maxsoc,
+                ch_eff,
+                ds_eff,
+                pmax_pos,
+                pmax_neg,
+                deptime,
+                rho_y,
+                rho_eps,
+                warmstart,
+                statistics,
+                time_limit,
+            )
+
+        ###########################################################################
+        ####################Updating the optimization model########################
+        if (
+            self.model is None
+            or opt_step != self.opt_step
+            or list(opt_horizon) != self.opt_horizon
+        ):
+            self._construct(opt_step, opt_horizon)
+
+        model = self.model
+
+        # EVs departed since the last call are removed and arrived EVs are added
+        departed = [v for v in self.blocks if v not in bcap]
+        arrived = [v for v in bcap if v not in self.blocks]
+        for v in departed:
+            self._remove_ev(v)
+        for v in arrived:
+            self._add_ev(v)
+        if departed or arrived or model.component("obj") is None:
+            self._link()
+
+        # Cluster data
+        for t in model.T:
+            model.P_CC_up[t] = upperlimit[t]
+            model.P_CC_low[t] = lowerlimit[t]
+        model.P_CC_vio = tolerance
+        model.rho_y = rho_y
+        model.rho_eps = rho_eps
+
+        # EV data
+        for v, b in self.blocks.items():
+            b.E = bcap[v]
+            b.eff_ch = ch_eff[v]
+            b.eff_ds = ds_eff[v]
+            b.P_EV_pos = pmax_pos[v]
+            b.P_EV_neg = pmax_neg[v]
+            b.s_ini = inisoc[v]
+            b.s_tar = tarsoc[v]
+            b.s_min = minsoc[v]
+            b.s_max = maxsoc[v]
+            for t in model.T:
+                b.a[t] = 0.0 if t >= deptime[v] else 1.0
+        ###########################################################################
+
+        ###########################################################################
+        ######################Solving the optimization model ######################
+        if warmstart is not None:
+            p_cc = dict([(t, 0.0) for t in model.T])
+            for v, b in self.blocks.items():
+                p_start, s_start = start_trajectory(
+                    warmstart.get(v, {}),
+                    opt_step,
+                    opt_horizon,
+                    bcap[v],
+                    inisoc[v],
+                    minsoc[v],
+                    maxsoc[v],
+                    pmax_pos[v],
+                    pmax_neg[v],
+                    deptime[v],
+                )
+                for t, p in p_start.items():
+                    b.p_ev[t].set_value(p)
+                    b.p_ev_pos[t].set_value(max(p, 0.0))
+                    b.p_ev_neg[t].set_value(max(-p, 0.0))
+                    b.x_ev[t].set_value(1 if p > 0 else 0)
+                    p_cc[t] += max(p, 0) / ch_eff[v] + min(p, 0) * ds_eff[v]
+                for t, soc in s_start.items():
+                    b.s[t].set_value(soc)
+                b.y.set_value(abs(tarsoc[v] - s_start[max(opt_horizon)]))
+            eps_start = 0.0
+            for t in model.T:
+                model.p_cc[t].set_value(p_cc[t])
+                eps_start = max(
+                    eps_start, p_cc[t] - upperlimit[t], lowerlimit[t] - p_cc[t]
+                )
+            model.eps.set_value(eps_start)
+
+        result = solve_model(
+            self.solver, model, warmstart is not None, statistics, time_limit
+        )
+        ###########################################################################
+
+        ###########################################################################
+        ################################Saving the results#########################
+        p_schedule = {}
+        s_schedule = {}
+        for v in bcap.keys():
+            b = self.blocks[v]
+            p_schedule[v] = {}
+            s_schedule[v] = {}
+            for t in opt_horizon:
+                if t < max(opt_horizon):
+                    p_schedule[v][t] = b.p_ev[t]()
+                s_schedule[v][t] = b.s[t]()
+        ###########################################################################
+
+        return p_schedule, s_schedule
+
+
 if __name__ == "__main__":
 
     import pandas as pd
     import numpy as np
-    from pyomo.environ import SolverFactory
+    from datafev.algorithms.solver import create_solver
 
     ###########################################################################
     # Input parameters
@@ -304,7 +967,7 @@ if __name__ == "__main__":
     PC = PPL * N * PCU
     nb_of_ts = 12
 
-    solver = SolverFactory("gurobi")
+    solver = create_solver()
     opt_step = 300
     opt_horizon = list(range(nb_of_ts + 1))
     upperlimit = dict(
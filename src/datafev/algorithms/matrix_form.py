@@ -0,0 +1,488 @@
+# The datafev framework
+
+# Copyright (C) 2022,
+# Institute for Automation of Complex Power Systems (ACS),
+# E.ON Energy Research Center (E.ON ERC),
+# RWTH Aachen University
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+# documentation files (the "Software"), to deal in the Software without restriction, including without limitation the
+# rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit
+# persons to whom the Software is furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of the
+# Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE
+# WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+# COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+# OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+import time
+import numpy as np
+from scipy.optimize import milp, Bounds, LinearConstraint
+from scipy.sparse import coo_matrix
+
+# Termination conditions (as named by Pyomo) of the status codes of milp
+_termination_conditions = {
+    0: "optimal",
+    1: "maxTimeLimit",
+    2: "infeasible",
+    3: "unbounded",
+    4: "error",
+}
+
+
+class NoSolutionError(RuntimeError):
+    """
+    Raised if the solver does not provide a solution of an optimization
+    problem (the problem is infeasible or the time limit is reached before a
+    feasible solution is found).
+    """
+
+
+class MatrixModel(object):
+    """
+    Optimization model in matrix form:
+        min/max c'x  s.t.  row_lb <= A x <= row_ub,  lb <= x <= ub.
+
+    Variables and constraints are added in blocks (numpy arrays of variable
+    and row indices) so that the models of datafev are assembled with
+    vectorized operations instead of element-wise rule callbacks.
+    """
+
+    def __init__(self, sense="minimize"):
+        """
+        Matrix models are initialized empty.
+
+        Parameters
+        ----------
+        sense : str, optional
+            Objective sense ('minimize' or 'maximize').
+            The default is 'minimize'.
+
+        Returns
+        -------
+        None.
+
+        """
+
+        self.sense = sense
+        self.nb_of_vars = 0
+        self.nb_of_rows = 0
+
+        self._lb = []
+        self._ub = []
+        self._integrality = []
+        self._objective = []
+        self._row_lb = []
+        self._row_ub = []
+        self._entries = []
+
+    def add_variables(self, shape, lb=0.0, ub=np.inf, binary=False):
+        """
+        This method adds a block of variables to the model.
+
+        Parameters
+        ----------
+        shape : int or tuple
+            Shape of the variable block.
+        lb : float or np.ndarray, optional
+            Lower bounds (broadcast to the shape). The default is 0.0.
+        ub : float or np.ndarray, optional
+            Upper bounds (broadcast to the shape). The default is np.inf.
+        binary : bool, optional
+            If True, the variables are binary. The default is False.
+
+        Returns
+        -------
+        np.ndarray
+            Indices of the variables in the given shape.
+
+        """
+
+        size = int(np.prod(shape))
+        idx = np.arange(self.nb_of_vars, self.nb_of_vars + size).reshape(shape)
+        self.nb_of_vars += idx.size
+
+        if binary:
+            lb, ub = 0.0, 1.0
+        self._lb.append(np.broadcast_to(np.asarray(lb, float), idx.shape).ravel())
+        self._ub.append(np.broadcast_to(np.asarray(ub, float), idx.shape).ravel())
+        self._integrality.append(np.full(idx.size, 1 if binary else 0))
+
+        return idx
+
+    def add_constraints(self, shape, lb=-np.inf, ub=np.inf):
+        """
+        This method adds a block of constraints lb <= (sum of terms) <= ub.
+        The terms of the constraints are added by 'add_terms'.
+
+        Parameters
+        ----------
+        shape : int or tuple
+            Shape of the constraint block.
+        lb : float or np.ndarray, optional
+            Lower bounds of the constraints. The default is -np.inf.
+        ub : float or np.ndarray, optional
+            Upper bounds of the constraints. The default is np.inf.
+
+        Returns
+        -------
+        np.ndarray
+            Indices of the constraints (rows) in the given shape.
+
+        """
+
+        size = int(np.prod(shape))
+        rows = np.arange(self.nb_of_rows, self.nb_of_rows + size).reshape(shape)
+        self.nb_of_rows += rows.size
+
+        self._row_lb.append(np.broadcast_to(np.asarray(lb, float), rows.shape).ravel())
+        self._row_ub.append(np.broadcast_to(np.asarray(ub, float), rows.shape).ravel())
+
+        return rows
+
+    def add_terms(self, rows, coef, idx):
+        """
+        This method adds the terms coef*x[idx] to the constraints 'rows'.
+        The arguments are broadcast against each other; therefore, a term
+        can be summed over an axis by broadcasting the rows along that axis.
+
+        Parameters
+        ----------
+        rows : np.ndarray
+            Indices of the constraints.
+        coef : float or np.ndarray
+            Coefficients of the variables.
+        idx : np.ndarray
+            Indices of the variables.
+
+        Returns
+        -------
+        None.
+
+        """
+
+        rows, coef, idx = np.broadcast_arrays(rows, np.asarray(coef, float), idx)
+        self._entries.append((rows.ravel(), idx.ravel(), coef.ravel()))
+
+    def add_objective(self, coef, idx):
+        """
+        This method adds the terms coef*x[idx] to the objective function.
+
+        Parameters
+        ----------
+        coef : float or np.ndarray
+            Coefficients of the variables.
+        idx : np.ndarray
+            Indices of the variables.
+
+        Returns
+        -------
+        None.
+
+        """
+
+        coef, idx = np.broadcast_arrays(np.asarray(coef, float), idx)
+        self._objective.append((idx.ravel(), coef.ravel()))
+
+    def arrays(self):
+        """
+        This method returns the model in the array form accepted by
+        scipy.optimize.milp (minimization).
+
+        Returns
+        -------
+        c : np.ndarray
+            Objective coefficients (negated for maximization).
+        integrality : np.ndarray
+            Integrality of the variables.
+        bounds : scipy.optimize.Bounds
+            Variable bounds.
+        constraints : scipy.optimize.LinearConstraint or list
+            Constraints (empty list if there are no constraints).
+
+        """
+
+        c = np.zeros(self.nb_of_vars)
+        for idx, coef in self._objective:
+            np.add.at(c, idx, coef)
+        if self.sense == "maximize":
+            c = -c
+
+        integrality = np.concatenate(self._integrality)
+        bounds = Bounds(np.concatenate(self._lb), np.concatenate(self._ub))
+
+        if self.nb_of_rows == 0:
+            return c, integrality, bounds, []
+
+        if len(self._entries) > 0:
+            rows = np.concatenate([e[0] for e in self._entries])
+            cols = np.concatenate([e[1] for e in self._entries])
+            vals = np.concatenate([e[2] for e in self._entries])
+        else:
+            rows, cols, vals = np.array([], int), np.array([], int), np.array([])
+        A = coo_matrix(
+            (vals, (rows, cols)), shape=(self.nb_of_rows, self.nb_of_vars)
+        ).tocsr()
+        constraints = LinearConstraint(
+            A, np.concatenate(self._row_lb), np.concatenate(self._row_ub)
+        )
+
+        return c, integrality, bounds, constraints
+
+
+class HighsSolver(object):
+    """
+    In-process HiGHS solver for the matrix models (through
+    scipy.optimize.milp). Passing an instance of this class as the 'solver'
+    argument of the optimization algorithms of datafev makes them assemble
+    their models in matrix form instead of constructing Pyomo models.
+    Start solutions are not supported by scipy.optimize.milp; therefore,
+    the warmstart arguments of the algorithms are ignored.
+
+    The termination condition, relative optimality gap and wall time of each
+    solve are recorded in the attribute 'history'.
+    """
+
+    def __init__(self, time_limit=None, mip_rel_gap=None, presolve=True):
+        """
+        HiGHS solvers are defined by the options of the solution process.
+
+        Parameters
+        ----------
+        time_limit : float, optional
+            Maximum solution time (seconds). The default is None (no limit).
+        mip_rel_gap : float, optional
+            Relative optimality gap at which the branch-and-bound stops.
+            The default is None (HiGHS default).
+        presolve : bool, optional
+            Whether HiGHS presolves the problems. The default is True.
+
+        Returns
+        -------
+        None.
+
+        """
+
+        self.options = {"presolve": presolve}
+        if time_limit is not None:
+            self.options["time_limit"] = time_limit
+        if mip_rel_gap is not None:
+            self.options["mip_rel_gap"] = mip_rel_gap
+
+        self.result = None
+        self.history = []
+
+    def solve(self, model, statistics=None, time_limit=None):
+        """
+        This method solves a matrix model.
+
+        Parameters
+        ----------
+        model : MatrixModel
+            Optimization model.
+        statistics : dict, optional
+            Dictionary to enter the statistics of the solution process
+            (see datafev.algorithms.warmstart.solve_model) and the relative
+            optimality gap ('Gap'). The default is None.
+        time_limit : float, optional
+            Time limit of this solve (seconds). The smaller of this and the
+            time limit of the solver applies. The default is None.
+
+        Returns
+        -------
+        np.ndarray
+            Optimal values of the variables.
+
+        """
+
+        c, integrality, bounds, constraints = model.arrays()
+
+        options = dict(self.options)
+        if time_limit is not None:
+            options["time_limit"] = min(options.get("time_limit", np.inf), time_limit)
+
+        start = time.perf_counter()
+        result = milp(
+            c,
+            integrality=integrality,
+            bounds=bounds,
+            constraints=constraints,
+            options=options,
+        )
+        wall_time = time.perf_counter() - start
+        self.result = result
+
+        # Gap of the MILPs (LPs solved to optimality have no gap)
+        gap = result.get("mip_gap")
+        if gap is None and result.status == 0:
+            gap = 0.0
+        record = {
+            "Termination Condition": _termination_conditions.get(
+                result.status, "unknown"
+            ),
+            "Gap": gap,
+            "Wall Time": wall_time,
+        }
+        self.history.append(record)
+
+        if statistics is not None:
+            statistics.update(record)
+            statistics["Time To First Incumbent"] = None
+            statistics["Warm Start"] = False
+
+        if result.x is None:
+            raise NoSolutionError("HiGHS did not find a solution: " + result.message)
+
+        return result.x
+
+
+def add_ev_constraints(
+    model,
+    opt_step,
+    opt_horizon,
+    bcap,
+    inisoc,
+    minsoc,
+    maxsoc,
+    pmax_pos,
+    pmax_neg,
+    deptime,
+):
+    """
+    This function adds the EV variables and constraints shared by the cluster
+    models (rescheduling, G2V/V2G potential estimation) to a matrix model:
+    initial SOC, SOC limits, storage conservation, net power decoupling and
+    the charge/discharge combinatorics before the departures.
+
+    Parameters
+    ----------
+    model : MatrixModel
+        Optimization model.
+    opt_step : int
+        Size of one time step in the optimization (seconds).
+    opt_horizon : list of integers
+        Time step identifiers in the optimization horizon.
+    bcap : dict of float
+        Battery capactiy of EVs (kWs).
+    inisoc : dict of float
+        Initial SOCs of EV batteries.
+    minsoc : dict of float
+        Minimum allowed SOCs.
+    maxsoc : dict of float
+        Maximum allowed SOCs.
+    pmax_pos : dict of float
+        Maximum charge power that EV battery can withdraw (kW).
+    pmax_neg : dict of float
+        Maximum discharge power that EV battery can supply (kW).
+    deptime : dict of int
+        Number of time steps until departures of EVs.
+
+    Returns
+    -------
+    dict
+        Indices of the variables p_ev, p_ev_pos, p_ev_neg, x_ev (shape: EVs x
+        time steps) and s (shape: EVs x time steps+1). The EVs are ordered as
+        the keys of 'bcap'.
+
+    """
+
+    evs = list(bcap.keys())
+    steps = np.asarray(opt_horizon[:-1])
+    nb_of_evs = len(evs)
+    nb_of_steps = len(steps)
+
+    E = np.array([bcap[v] for v in evs], dtype=float)[:, None]
+    P_pos = np.array([pmax_pos[v] for v in evs], dtype=float)[:, None]
+    P_neg = np.array([pmax_neg[v] for v in evs], dtype=float)[:, None]
+    dep = np.array([deptime[v] for v in evs], dtype=float)[:, None]
+    s_min = np.array([minsoc[v] for v in evs], dtype=float)[:, None]
+    s_max = np.array([maxsoc[v] for v in evs], dtype=float)[:, None]
+    s_ini = np.array([inisoc[v] for v in evs], dtype=float)
+
+    # No charge/discharge after the departure
+    departed = steps[None, :] >= dep
+    shape = (nb_of_evs, nb_of_steps)
+
+    p_ev = model.add_variables(shape, lb=-np.inf)
+    p_ev_pos = model.add_variables(shape, ub=np.where(departed, 0.0, np.inf))
+    p_ev_neg = model.add_variables(shape, ub=np.where(departed, 0.0, np.inf))
+    x_ev = model.add_variables(shape, binary=True)
+
+    # SOC limits apply to the steps in T (not to the end of the horizon)
+    s_lb = np.zeros((nb_of_evs, nb_of_steps + 1))
+    s_ub = np.full((nb_of_evs, nb_of_steps + 1), np.inf)
+    s_lb[:, :-1] = np.maximum(s_min, 0.0)
+    s_ub[:, :-1] = s_max
+    s = model.add_variables((nb_of_evs, nb_of_steps + 1), lb=s_lb, ub=s_ub)
+
+    # Initial SOC
+    rows = model.add_constraints(nb_of_evs, lb=s_ini, ub=s_ini)
+    model.add_terms(rows, 1.0, s[:, 0])
+
+    # Storage conservation
+    rows = model.add_constraints(shape, lb=0.0, ub=0.0)
+    model.add_terms(rows, 1.0, s[:, 1:])
+    model.add_terms(rows, -1.0, s[:, :-1])
+    model.add_terms(rows, -opt_step / E, p_ev_pos)
+    model.add_terms(rows, opt_step / E, p_ev_neg)
+
+    # Net power decoupled into positive and negative parts
+    rows = model.add_constraints(shape, lb=0.0, ub=0.0)
+    model.add_terms(rows, 1.0, p_ev)
+    model.add_terms(rows, -1.0, p_ev_pos)
+    model.add_terms(rows, 1.0, p_ev_neg)
+
+    # EVs can charge only when x_ev==1 and discharge only when x_ev==0
+    rows = model.add_constraints(shape, ub=0.0)
+    model.add_terms(rows, 1.0, p_ev_pos)
+    model.add_terms(rows, -P_pos, x_ev)
+    rows = model.add_constraints(shape, ub=np.broadcast_to(P_neg, shape))
+    model.add_terms(rows, 1.0, p_ev_neg)
+    model.add_terms(rows, P_neg, x_ev)
+
+    return {
+        "p_ev": p_ev,
+        "p_ev_pos": p_ev_pos,
+        "p_ev_neg": p_ev_neg,
+        "x_ev": x_ev,
+        "s": s,
+    }
+
+
+def get_ev_schedules(x, ev_vars, evs, opt_horizon):
+    """
+    This function maps the solution of a matrix model to the power and SOC
+    schedules of the EVs.
+
+    Parameters
+    ----------
+    x : np.ndarray
+        Optimal values of the variables.
+    ev_vars : dict
+        Indices of the EV variables (returned by add_ev_constraints).
+    evs : list
+        EV identifiers.
+    opt_horizon : list of integers
+        Time step identifiers in the optimization horizon.
+
+    Returns
+    -------
+    p_schedule : dict
+        Power schedules of the EVs.
+    s_schedule : dict
+        SOC schedules of the EVs.
+
+    """
+
+    p = x[ev_vars["p_ev"]]
+    s = x[ev_vars["s"]]
+
+    p_schedule = {}
+    s_schedule = {}
+    for n, v in enumerate(evs):
+        p_schedule[v] = dict(zip(opt_horizon[:-1], p[n].tolist()))
+        s_schedule[v] = dict(zip(opt_horizon, s[n].tolist()))
+    return p_schedule, s_schedule
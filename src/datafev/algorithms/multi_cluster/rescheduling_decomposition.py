@@ -0,0 +1,430 @@
+# The datafev framework
+
+# Copyright (C) 2022,
+# Institute for Automation of Complex Power Systems (ACS),
+# E.ON Energy Research Center (E.ON ERC),
+# RWTH Aachen University
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+# documentation files (the "Software"), to deal in the Software without restriction, including without limitation the
+# rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit
+# persons to whom the Software is furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of the
+# Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE
+# WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+# COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+# OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+
+
+import time
+import numpy as np
+from datafev.algorithms.cluster import rescheduling_milp
+from datafev.algorithms.matrix_form import NoSolutionError
+
+
+def _cluster_consumption(p_schedule, ch_eff, ds_eff, steps):
+    # Net consumption of a cluster (kW) at the time steps
+    consumption = np.zeros(len(steps))
+    for v, p in p_schedule.items():
+        p_v = np.array([p[t] for t in steps], dtype=float)
+        consumption += np.maximum(p_v, 0.0) / ch_eff[v]
+        consumption += np.minimum(p_v, 0.0) * ds_eff[v]
+    return consumption
+
+
+def _share(consumption, limit):
+    # Shares of a system limit in proportion to the energy consumption of the
+    # clusters over the horizon (the consumption is given with the sign of
+    # the limit). Equal shares if there is no consumption.
+    energy = consumption.sum(axis=1)
+    total = energy.sum()
+    if total == 0:
+        weight = np.full(len(consumption), 1 / len(consumption))
+    else:
+        weight = energy / total
+    return weight[:, None] * limit[None, :]
+
+
+def _redistribute(consumption, allocation, limit, binding):
+    # Consensus update of the shares of a system limit: the clusters that do
+    # not use their whole shares keep their consumption and the rest of the
+    # limit is shared equally by the clusters consuming their whole shares.
+    nb_of_binding = binding.sum(axis=0)
+    margin = (limit - np.where(binding, 0.0, consumption).sum(axis=0)) / np.maximum(
+        nb_of_binding, 1
+    )
+    update = np.where(binding, margin[None, :], consumption)
+    return np.where(nb_of_binding > 0, update, allocation)
+
+
+def reschedule(
+    solver,
+    opt_step,
+    opt_horizon,
+    bcap,
+    inisoc,
+    tarsoc,
+    minsoc,
+    maxsoc,
+    ch_eff,
+    ds_eff,
+    pmax_pos,
+    pmax_neg,
+    deptime,
+    location,
+    system_upperlimit,
+    system_lowerlimit,
+    clusters,
+    cluster_upperlimits,
+    cluster_lowerlimits,
+    cluster_violationlimits,
+    rho_y,
+    rho_eps,
+    executor=None,
+    max_iterations=10,
+    transfer=0.2,
+    residual_tolerance=1e-3,
+    statistics=None,
+    time_limit=None,
+):
+    """
+    This function reschedules the charging operations of all clusters in a
+    multi-cluster system by decomposing the problem of
+    datafev.algorithms.multi_cluster.rescheduling_milp (without inter-cluster
+    unbalance limits) into the rescheduling problems of the individual
+    clusters (datafev.algorithms.cluster.rescheduling_milp). Only the
+    upper-lower limits of the system couple the clusters; they are
+    coordinated as follows:
+        - The clusters first solve their problems with their own limits. If
+          the system limits are respected, the solution is optimal.
+        - Otherwise, the system limits are shared by the clusters in
+          proportion to the energy consumed (injected) at the first iteration.
+          The clusters solve their problems with the shares as additional
+          hard limits (without violation tolerance). The solutions respect the
+          system limits unless the own limits of the clusters exceed their
+          shares.
+        - After each iteration, the shares are updated (consensus update):
+          the clusters that do not use their whole shares release the rest to
+          the clusters that use their whole shares and miss the target SOCs
+          of their EVs. The latter also receive a part of the shares of the
+          other clusters, which may shift their charging in time.
+        - The iterations stop when the shares do not change anymore, the
+          objective (the deviation from the target SOCs) does not improve or
+          the time limit is reached. The best solution with shares that
+          respects the system limits is returned.
+    The cluster problems of an iteration are independent of each other;
+    therefore, they can be solved concurrently by an executor.
+
+    Dual (price) coordination is not applied: the cluster problems are
+    mixed-integer and indifferent to the timing of charging within the
+    horizon, therefore their responses to prices oscillate.
+
+    Parameters
+    ----------
+    solver : pyomo SolverFactory object or HighsSolver
+        Optimization solver of the cluster problems. The solver must be
+        picklable if a process pool is used.
+    opt_step : int
+        Size of one time step in the optimization (seconds).
+    opt_horizon : list of integers
+        Time step identifiers in the optimization horizon.
+    bcap : dict of float
+        Battery capactiy of EVs (kWs).
+    inisoc : dict of float
+        Initial SOCs of EV batteries (0<inisoc[key]<1).
+    tarsoc : dict of float
+        Target SOCs of EVs (0<inisoc[key]<1).
+    minsoc : dict of float
+        Minimum allowed SOCs.
+    maxsoc : dict of float
+        Maximum allowed SOCs.
+    ch_eff : dict of float
+        Charging efficiency of chargers.
+    ds_eff : dict of float
+        Discharging efficiency of chargers.
+    pmax_pos : dict of float
+        Maximum charge power that EV battery can withdraw (kW).
+    pmax_neg : dict of float
+        Maximum discharge power that EV battery can supply (kW).
+    deptime : dict of int
+        Number of time steps until departures of EVs.
+    location : dict of tuples
+        The tuples indicating the location of the EV in the multicluter system.
+        'ev_id':(cluster_id,charger_id).
+    system_upperlimit: dict of float
+        Upper limit of net power consumption of multi-cluster system(kW).
+    system_lowerlimit: dict of float
+        Lower limit of net power consumption of multi-cluster system(kW).
+    clusters : list
+        List of clusters in the system.
+    cluster_upperlimits : dict of dict
+        Soft upper limit of cluster power consumption (kW).
+    cluster_lowerlimits : dict of dict
+        Soft upper limit of cluster power consumption (kW).
+    cluster_violationlimits : dict of float
+        Maximum allowed violation of upper-lower limits of clusters (kW).
+    rho_y : dict of float
+        Penalty factors for deviation of reference schedules (unitless).
+    rho_eps : dict of float
+        Penalty factors for violation of upper-lower soft limits (unitless).
+    executor : concurrent.futures.Executor, optional
+        Executor to solve the cluster problems of an iteration concurrently.
+        The default is None (sequential solving).
+    max_iterations : int, optional
+        Maximum number of iterations. If the system limits are violated by
+        the clusters with their own limits, at least one iteration with
+        shares is made. The default is 10.
+    transfer : float, optional
+        Part of the shares of the other clusters transferred to the clusters
+        missing their targets at the first update. The part of the k-th
+        update is transfer/sqrt(k). The default is 0.2.
+    residual_tolerance : float, optional
+        Tolerance of the residuals (kW). The default is 1e-3.
+    statistics : dict, optional
+        Dictionary to enter the statistics of the decomposition:
+            - Iterations --> Number of iterations,
+            - Converged --> Whether the system limits are respected by the
+              clusters with their own limits or the shares converged. False
+              if the iterations are stopped by the time limit or a cluster
+              problem without solution,
+            - Primal Residual --> Maximum violation of the system limits at
+              each iteration (kW),
+            - Dual Residual --> Maximum change of the shares of the system
+              limits at each iteration (kW),
+            - Iteration Time --> Wall time of each iteration (seconds),
+            - Wall Time --> Total wall time (seconds).
+        The default is None.
+    time_limit : float, optional
+        Time budget of the whole decomposition (seconds). The cluster problems
+        are solved with the remaining time as limit and no iteration is
+        started after the budget is used up. The default is None (no limit).
+
+    Returns
+    -------
+    p_schedule : dict
+        Power schedule.
+        It contains a dictionary for each EV. Each item in the EV dictionary
+        indicates the power to be supplied to the EV(kW) during a particular
+        time step.
+    s_schedule : dict
+        SOC schedule.
+        It contains a dictionary for each EV. Each item in the EV dictionary
+        indicates the SOC to be achieved by the EV by a particular time step.
+
+    Raises
+    ------
+    NoSolutionError
+        If the clusters with their own limits violate the system limits and
+        no iteration with shares respects them, e.g. if a cluster problem
+        with the shares has no solution or the time budget is used up.
+
+    """
+
+    start = time.perf_counter()
+    steps = opt_horizon[:-1]
+    clusters = list(clusters)
+    upper = np.array([system_upperlimit[t] for t in steps], dtype=float)
+    lower = np.array([system_lowerlimit[t] for t in steps], dtype=float)
+    cc_upper = np.array(
+        [[cluster_upperlimits[c][t] for t in steps] for c in clusters], dtype=float
+    )
+    cc_lower = np.array(
+        [[cluster_lowerlimits[c][t] for t in steps] for c in clusters], dtype=float
+    )
+    cc_tolerance = np.array(
+        [cluster_violationlimits[c] for c in clusters], dtype=float
+    )
+
+    evs = {c: [v for v in bcap.keys() if location[v][0] == c] for c in clusters}
+
+    def remaining():
+        # Remaining time of the budget (seconds)
+        if time_limit is None:
+            return None
+        return max(time_limit - (time.perf_counter() - start), 0.0)
+
+    def subproblem(n, upperlimit, lowerlimit, tolerance):
+        # Arguments of the rescheduling problem of the n-th cluster
+        c = clusters[n]
+
+        def select(parameter):
+            return dict((v, parameter[v]) for v in evs[c])
+
+        return (
+            solver,
+            opt_step,
+            opt_horizon,
+            dict(zip(steps, upperlimit[n].tolist())),
+            dict(zip(steps, lowerlimit[n].tolist())),
+            tolerance[n],
+            select(bcap),
+            select(inisoc),
+            select(tarsoc),
+            select(minsoc),
+            select(maxsoc),
+            select(ch_eff),
+            select(ds_eff),
+            select(pmax_pos),
+            select(pmax_neg),
+            select(deptime),
+            rho_y[c],
+            rho_eps[c],
+            None,
+            None,
+            remaining(),
+        )
+
+    def solve(upperlimit, lowerlimit, tolerance):
+        # Solves the cluster problems and returns their results and net
+        # consumptions (kW)
+        iteration_start = time.perf_counter()
+        if executor is not None and len(clusters) > 1:
+            futures = [
+                executor.submit(
+                    rescheduling_milp.reschedule,
+                    *subproblem(n, upperlimit, lowerlimit, tolerance),
+                )
+                for n in range(len(clusters))
+            ]
+            results = [future.result() for future in futures]
+        else:
+            # The problems solved sequentially share the remaining time
+            results = [
+                rescheduling_milp.reschedule(
+                    *subproblem(n, upperlimit, lowerlimit, tolerance)
+                )
+                for n in range(len(clusters))
+            ]
+        consumption = np.array(
+            [
+                _cluster_consumption(result[0], ch_eff, ds_eff, steps)
+                for result in results
+            ]
+        ).reshape(len(clusters), len(steps))
+        total = consumption.sum(axis=0)
+        primal_residuals.append(
+            max(
+                float(np.max(total - upper, initial=0.0)),
+                float(np.max(lower - total, initial=0.0)),
+            )
+        )
+        iteration_times.append(time.perf_counter() - iteration_start)
+        return results, consumption
+
+    primal_residuals = []
+    dual_residuals = []
+    iteration_times = []
+
+    ###########################################################################
+    # Clusters with their own limits
+    results, consumption = solve(cc_upper, cc_lower, cc_tolerance)
+    dual_residuals.append(0.0)
+    converged = primal_residuals[-1] <= residual_tolerance
+    ###########################################################################
+
+    ###########################################################################
+    # Clusters with shares of the system limits
+    if not converged:
+        share_upper = _share(np.maximum(consumption, 0.0), upper)
+        share_lower = _share(np.minimum(consumption, 0.0), lower)
+        no_tolerance = np.zeros(len(clusters))
+        penalty_y = np.array([rho_y[c] for c in clusters], dtype=float)
+        best = (True, np.inf)
+
+        for k in range(1, max(max_iterations, 2)):
+            if remaining() == 0.0:
+                break
+            upperlimit = np.maximum(np.minimum(cc_upper, share_upper), cc_lower)
+            lowerlimit = np.minimum(np.maximum(cc_lower, share_lower), upperlimit)
+            try:
+                results_k, consumption = solve(upperlimit, lowerlimit, no_tolerance)
+            except NoSolutionError:
+                # A cluster problem has no solution (within the remaining time)
+                break
+
+            # Energy (kWh) missing to the target SOCs of the EVs of the clusters
+            gap = [
+                [
+                    (tarsoc[v] - result[1][v][opt_horizon[-1]]) * bcap[v] / 3600
+                    for v in evs[c]
+                ]
+                for c, result in zip(clusters, results_k)
+            ]
+            shortfall = np.array([sum(gap_c) for gap_c in gap])
+            cost = sum(
+                penalty_y[n] * sum(abs(g) for g in gap_c) for n, gap_c in enumerate(gap)
+            )
+            # The iterates respecting the system limits are preferred to the
+            # solution of the clusters with their own limits
+            violated = primal_residuals[-1] > residual_tolerance
+            improved = (violated, cost) < (best[0], best[1] - 1e-9)
+            if improved:
+                best = (violated, cost)
+                results = results_k
+
+            # Consensus update of the shares of the upper limit: the clusters
+            # that do not use their whole shares release the rest, and the
+            # clusters below their targets (and consuming their whole shares)
+            # receive a part of the shares of the other clusters
+            needy = (consumption >= share_upper - residual_tolerance) & (
+                shortfall > residual_tolerance
+            )[:, None]
+            share_upper_next = _redistribute(consumption, share_upper, upper, needy)
+            donation = np.where(
+                needy | ~needy.any(axis=0), 0.0, np.maximum(share_upper_next, 0.0)
+            ) * (transfer / np.sqrt(k))
+            share_upper_next += np.where(
+                needy,
+                donation.sum(axis=0) / np.maximum(needy.sum(axis=0), 1),
+                -donation,
+            )
+
+            # The shares of the lower limit are released to the clusters above
+            # their targets
+            share_lower_next = _redistribute(
+                consumption,
+                share_lower,
+                lower,
+                (consumption <= share_lower + residual_tolerance)
+                & (shortfall < -residual_tolerance)[:, None],
+            )
+
+            dual_residuals.append(
+                max(
+                    float(np.max(np.abs(share_upper_next - share_upper))),
+                    float(np.max(np.abs(share_lower_next - share_lower))),
+                )
+            )
+            share_upper = share_upper_next
+            share_lower = share_lower_next
+
+            converged = dual_residuals[-1] <= residual_tolerance and not best[0]
+            if converged or not improved:
+                break
+
+        if best[0]:
+            # The solution would be applied although it violates the system limits
+            raise NoSolutionError(
+                "No solution respecting the system limits was found by the decomposition"
+            )
+    ###########################################################################
+
+    p_schedule = {}
+    s_schedule = {}
+    for result in results:
+        p_schedule.update(result[0])
+        s_schedule.update(result[1])
+
+    if statistics is not None:
+        statistics["Iterations"] = len(iteration_times)
+        statistics["Converged"] = converged
+        statistics["Primal Residual"] = primal_residuals
+        statistics["Dual Residual"] = dual_residuals
+        statistics["Iteration Time"] = iteration_times
+        statistics["Wall Time"] = time.perf_counter() - start
+
+    return p_schedule, s_schedule
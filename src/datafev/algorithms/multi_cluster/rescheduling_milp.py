@@ -25,6 +25,13 @@ import numpy as np
 import pandas as pd
 import pyomo.kernel as pmo
 from itertools import product
+from datafev.algorithms.warmstart import set_ev_warmstart, solve_model
+from datafev.algorithms.matrix_form import (
+    MatrixModel,
+    HighsSolver,
+    add_ev_constraints,
+    get_ev_schedules,
+)
 
 
 def reschedule(
@@ -51,6 +58,9 @@ def reschedule(
     rho_y,
     rho_eps,
     unbalance_limits=None,
+    warmstart=None,
+    statistics=None,
+    time_limit=None,
 ):
     """
     This function reschedules the charging operations of all clusters in 
@@ -64,8 +74,9 @@ def reschedule(
     
     Parameters
     ----------
-    solver : pyomo SolverFactory object
-        Optimization solver.
+    solver : pyomo SolverFactory object or HighsSolver
+        Optimization solver. The model is assembled in matrix form if a
+        datafev.algorithms.matrix_form.HighsSolver is given.
     opt_step : int
         Size of one time step in the optimization (seconds).
     opt_horizon : list of integers
@@ -109,6 +120,17 @@ def reschedule(
         Penalty factors for deviation of reference schedules (unitless).
     rho_eps : dict of float
         Penalty factors for violation of upper-lower soft limits (unitless).
+    warmstart : dict, optional
+        Power schedules used as a start solution (e.g., the schedules of the
+        previous control step shifted by one step). It is ignored by
+        HighsSolver ('Warm Start Ignored' in the statistics). The default is
+        None.
+    statistics : dict, optional
+        Dictionary to enter the statistics of the solution process
+        (see datafev.algorithms.warmstart.solve_model). The default is None.
+    time_limit : float, optional
+        Time limit of the solver (seconds). If it is reached, the best
+        solution found so far is returned. The default is None (no limit).
 
     Returns
     -------
@@ -124,6 +146,38 @@ def reschedule(
 
     """
 
+    if isinstance(solver, HighsSolver):
+        if statistics is not None:
+            # The matrix models are solved without start solutions
+            statistics["Warm Start Ignored"] = warmstart is not None
+        return _reschedule_matrix(
+            solver,
+            opt_step,
+            opt_horizon,
+            bcap,
+            inisoc,
+            tarsoc,
+            minsoc,
+            maxsoc,
+            ch_eff,
+            ds_eff,
+            pmax_pos,
+            pmax_neg,
+            deptime,
+            location,
+            system_upperlimit,
+            system_lowerlimit,
+            clusters,
+            cluster_upperlimits,
+            cluster_lowerlimits,
+            cluster_violationlimits,
+            rho_y,
+            rho_eps,
+            unbalance_limits,
+            statistics,
+            time_limit,
+        )
+
     P_CC_up_lim = cluster_upperlimits
     P_CC_low_lim = cluster_lowerlimits
     P_CC_vio_lim = cluster_violationlimits
@@ -340,7 +394,41 @@ def reschedule(
 
     ###########################################################################
     ######################Solving the optimization model ######################
-    result = solver.solve(model)
+    if warmstart is not None:
+        p_start = set_ev_warmstart(
+            model,
+            warmstart,
+            opt_step,
+            opt_horizon,
+            bcap,
+            inisoc,
+            tarsoc,
+            minsoc,
+            maxsoc,
+            pmax_pos,
+            pmax_neg,
+            deptime,
+        )
+        eps_start = dict([(c, 0.0) for c in model.C])
+        for t in model.T:
+            p_cs = 0.0
+            for c in model.C:
+                p_cc = sum(
+                    max(p_start[v][t], 0) / ch_eff[v] + min(p_start[v][t], 0) * ds_eff[v]
+                    for v in model.V
+                    if ev_connected_here[v, c] == 1
+                )
+                model.p_cc[c, t].set_value(p_cc)
+                if P_CC_up_lim != None:
+                    eps_start[c] = max(eps_start[c], p_cc - P_CC_up_lim[c][t])
+                if P_CC_low_lim != None:
+                    eps_start[c] = max(eps_start[c], P_CC_low_lim[c][t] - p_cc)
+                p_cs += p_cc
+            model.p_cs[t].set_value(p_cs)
+        for c in model.C:
+            model.eps[c].set_value(eps_start[c])
+
+    result = solve_model(solver, model, warmstart is not None, statistics, time_limit)
     # print(result)
     ###########################################################################
 
@@ -360,15 +448,135 @@ def reschedule(
     return p_schedule, s_schedule
 
 
+
+def _reschedule_matrix(
+    solver,
+    opt_step,
+    opt_horizon,
+    bcap,
+    inisoc,
+    tarsoc,
+    minsoc,
+    maxsoc,
+    ch_eff,
+    ds_eff,
+    pmax_pos,
+    pmax_neg,
+    deptime,
+    location,
+    system_upperlimit,
+    system_lowerlimit,
+    clusters,
+    cluster_upperlimits,
+    cluster_lowerlimits,
+    cluster_violationlimits,
+    rho_y,
+    rho_eps,
+    unbalance_limits=None,
+    statistics=None,
+    time_limit=None,
+):
+    # Matrix form of the model of 'reschedule' (solved by HighsSolver)
+    evs = list(bcap.keys())
+    steps = opt_horizon[:-1]
+    clusters = list(clusters)
+    nb_of_clusters = len(clusters)
+
+    ###########################################################################
+    ####################Constructing the optimization model####################
+    model = MatrixModel()
+    ev = add_ev_constraints(
+        model,
+        opt_step,
+        opt_horizon,
+        bcap,
+        inisoc,
+        minsoc,
+        maxsoc,
+        pmax_pos,
+        pmax_neg,
+        deptime,
+    )
+
+    E = np.array([bcap[v] for v in evs], dtype=float)
+    eff_ch = np.array([ch_eff[v] for v in evs], dtype=float)[:, None]
+    eff_ds = np.array([ds_eff[v] for v in evs], dtype=float)[:, None]
+    s_tar = np.array([tarsoc[v] for v in evs], dtype=float)
+
+    p_cc = model.add_variables((nb_of_clusters, len(steps)), lb=-np.inf)
+    p_cs = model.add_variables(
+        len(steps),
+        lb=[system_lowerlimit[t] for t in steps],
+        ub=[system_upperlimit[t] for t in steps],
+    )
+    eps = model.add_variables(
+        nb_of_clusters, ub=[cluster_violationlimits[c] for c in clusters]
+    )
+    y = model.add_variables(len(evs))
+
+    # Mapping EV powers to CC powers (EVs connected to the clusters)
+    rows = model.add_constraints((nb_of_clusters, len(steps)), lb=0.0, ub=0.0)
+    model.add_terms(rows, 1.0, p_cc)
+    here = [n for n, v in enumerate(evs) if location[v][0] in clusters]
+    cc_rows = rows[[clusters.index(location[evs[n]][0]) for n in here], :]
+    model.add_terms(cc_rows, -1 / eff_ch[here], ev["p_ev_pos"][here])
+    model.add_terms(cc_rows, eff_ds[here], ev["p_ev_neg"][here])
+
+    # Mapping CC powers to CS power
+    rows = model.add_constraints(len(steps), lb=0.0, ub=0.0)
+    model.add_terms(rows, 1.0, p_cs)
+    model.add_terms(rows[None, :], -1.0, p_cc)
+
+    # Upper-lower limits of the clusters
+    if cluster_upperlimits != None:
+        upper = [[cluster_upperlimits[c][t] for t in steps] for c in clusters]
+        rows = model.add_constraints((nb_of_clusters, len(steps)), ub=upper)
+        model.add_terms(rows, 1.0, p_cc)
+        model.add_terms(rows, -1.0, eps[:, None])
+    if cluster_lowerlimits != None:
+        lower = [[cluster_lowerlimits[c][t] for t in steps] for c in clusters]
+        rows = model.add_constraints((nb_of_clusters, len(steps)), lb=lower)
+        model.add_terms(rows, 1.0, p_cc)
+        model.add_terms(rows, 1.0, eps[:, None])
+
+    # Inter-cluster unbalance limits
+    if unbalance_limits != None:
+        unbalance = [
+            [[unbalance_limits[c1, c2][t] for t in steps] for c2 in clusters]
+            for c1 in clusters
+        ]
+        shape = (nb_of_clusters, nb_of_clusters, len(steps))
+        rows = model.add_constraints(shape, ub=unbalance)
+        model.add_terms(rows, 1.0, p_cc[:, None, :])
+        model.add_terms(rows, -1.0, p_cc[None, :, :])
+
+    # Deviations from the target SOCs
+    rows = model.add_constraints(len(evs), lb=s_tar)
+    model.add_terms(rows, 1.0, ev["s"][:, -1])
+    model.add_terms(rows, 1.0, y)
+    rows = model.add_constraints(len(evs), ub=s_tar)
+    model.add_terms(rows, 1.0, ev["s"][:, -1])
+    model.add_terms(rows, -1.0, y)
+
+    rho_y_ = np.array([rho_y[location[v][0]] for v in evs], dtype=float)
+    model.add_objective(rho_y_ * E / 3600, y)
+    model.add_objective([rho_eps[c] for c in clusters], eps)
+    ###########################################################################
+
+    x = solver.solve(model, statistics, time_limit)
+
+    return get_ev_schedules(x, ev, evs, opt_horizon)
+
+
 if __name__ == "__main__":
 
     import pandas as pd
     import numpy as np
-    from pyomo.environ import SolverFactory
+    from datafev.algorithms.solver import create_solver
 
     ###########################################################################
     # Input parameters
-    solver = SolverFactory("gurobi")
+    solver = create_solver()
 
     clusters = ["CC1", "CC2"]  # System has two clusters
     opt_horizon = list(range(13))  # 1 hour
@@ -0,0 +1,194 @@
+# The datafev framework
+
+# Copyright (C) 2022,
+# Institute for Automation of Complex Power Systems (ACS),
+# E.ON Energy Research Center (E.ON ERC),
+# RWTH Aachen University
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+# documentation files (the "Software"), to deal in the Software without restriction, including without limitation the
+# rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit
+# persons to whom the Software is furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of the
+# Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE
+# WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+# COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+# OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+
+import math
+import time
+from pyomo.environ import SolverFactory
+from datafev.algorithms.matrix_form import HighsSolver
+
+
+def relative_gap(result):
+    """
+    This function calculates the relative optimality gap of the solution
+    reported in a Pyomo results object.
+
+    Parameters
+    ----------
+    result : pyomo SolverResults object
+        Results of a solver call.
+
+    Returns
+    -------
+    float
+        Relative gap between the best bound and the objective value of the
+        solution. None if the solver does not report both values.
+
+    """
+
+    try:
+        lower = float(result.problem.lower_bound)
+        upper = float(result.problem.upper_bound)
+    except (AttributeError, TypeError, ValueError):
+        return None
+    if not (math.isfinite(lower) and math.isfinite(upper)):
+        return None
+    return abs(upper - lower) / max(abs(upper), abs(lower), 1e-10)
+
+
+class PyomoSolver(object):
+    """
+    Wrapper of Pyomo solver interfaces (e.g., gurobi, cplex, glpk). It is
+    accepted wherever the algorithms of datafev accept a Pyomo solver and
+    records the termination condition, relative optimality gap and wall time
+    of each solve in the attribute 'history'.
+    """
+
+    def __init__(self, solver):
+        """
+        Pyomo solvers are defined by the wrapped solver interface.
+
+        Parameters
+        ----------
+        solver : pyomo SolverFactory object or str
+            Solver interface or the name of the solver.
+
+        Returns
+        -------
+        None.
+
+        """
+
+        self.solver = SolverFactory(solver) if isinstance(solver, str) else solver
+        self.history = []
+
+    def __getattr__(self, name):
+        # Other attributes (e.g., warm_start_capable) of the wrapped interface
+        if name == "solver":
+            raise AttributeError(name)
+        return getattr(self.solver, name)
+
+    def solve(self, model, **kwargs):
+        """
+        This method solves a Pyomo model.
+
+        Parameters
+        ----------
+        model : pyomo ConcreteModel
+            Optimization model.
+        **kwargs :
+            Keyword arguments of the solve method of the wrapped interface.
+
+        Returns
+        -------
+        result :
+            Results object of the solver.
+
+        """
+
+        start = time.perf_counter()
+        result = self.solver.solve(model, **kwargs)
+        wall_time = time.perf_counter() - start
+
+        self.history.append(
+            {
+                "Termination Condition": str(result.solver.termination_condition),
+                "Gap": relative_gap(result),
+                "Wall Time": wall_time,
+            }
+        )
+
+        return result
+
+
+def create_solver(name="highs", **options):
+    """
+    This function creates the solver to be passed to the algorithms and
+    routines of datafev. By default, the open-source HiGHS solver is used
+    in-process (no license or solver installation is required).
+
+    Parameters
+    ----------
+    name : str, optional
+        'highs' for the in-process HiGHS solver (matrix form models) or the
+        name of a Pyomo solver interface (e.g., 'gurobi', 'cplex',
+        'appsi_highs'). The default is 'highs'. The in-process solver does not
+        keep the models between the calls and accepts no start solutions: use
+        'appsi_highs' for persistent models and warm starts.
+    **options :
+        Options of the HiGHS solver (time_limit, mip_rel_gap, presolve).
+        They are entered to the options of Pyomo solver interfaces otherwise.
+
+    Returns
+    -------
+    HighsSolver or PyomoSolver
+        Solver recording the statistics of each solve in 'history'.
+
+    """
+
+    if name == "highs":
+        return HighsSolver(**options)
+
+    solver = PyomoSolver(name)
+    for key, value in options.items():
+        solver.options[key] = value
+    return solver
+
+
+def check_warmstart(solver, warmstart=False, persistent=False):
+    """
+    This function checks that start solutions or persistent models are only
+    requested from solvers that support them. The matrix models solved by
+    HighsSolver are assembled at each call and scipy.optimize.milp accepts no
+    start solution; the time to the first incumbent is not measured either.
+
+    Parameters
+    ----------
+    solver : pyomo SolverFactory object, HighsSolver or PyomoSolver
+        Optimization solver.
+    warmstart : bool, optional
+        Whether start solutions are requested. The default is False.
+    persistent : bool, optional
+        Whether persistent models are requested. The default is False.
+
+    Returns
+    -------
+    None.
+
+    Raises
+    ------
+    ValueError
+        If the requests are made with HighsSolver.
+
+    """
+
+    if not (warmstart or persistent) or not isinstance(solver, HighsSolver):
+        return
+
+    requested = " and ".join(
+        name
+        for name, flag in (("start solutions", warmstart), ("persistent models", persistent))
+        if flag
+    )
+    raise ValueError(
+        "HighsSolver does not support "
+        + requested
+        + ": use a Pyomo solver interface (e.g., create_solver('appsi_highs'))"
+    )
@@ -0,0 +1,291 @@
+# The datafev framework
+
+# Copyright (C) 2022,
+# Institute for Automation of Complex Power Systems (ACS),
+# E.ON Energy Research Center (E.ON ERC),
+# RWTH Aachen University
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+# documentation files (the "Software"), to deal in the Software without restriction, including without limitation the
+# rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit
+# persons to whom the Software is furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of the
+# Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE
+# WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+# COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+# OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+
+
+import numpy as np
+from datafev.algorithms.vehicle import routing_milp
+from datafev.algorithms.vehicle.scheduling_greedy import _minimize_cost_arrays
+
+
+def _relaxed_candidates(
+    opt_horizon,
+    opt_step,
+    ecap,
+    tarsoc,
+    minsoc,
+    maxsoc,
+    crtsoc,
+    crttime,
+    arrtime,
+    deptime,
+    arrsoc,
+    p_ch,
+    p_ds,
+    g2v_dps,
+    v2g_dps,
+):
+    # Solves the per-candidate problems without the V2G allowance and with a
+    # single (linear) price per time step. The price is chosen between the V2G
+    # and G2V prices so that the cost of the relaxation never exceeds the cost
+    # of the original problem, i.e., it provides a lower bound. For steps where
+    # no such price exists (V2G price above the G2V price while both charging
+    # and discharging are possible), the bound is -inf.
+    clusters = list(arrtime.keys())
+    steps = list(opt_horizon)
+    n = len(clusters)
+
+    t = np.asarray(steps[:-1])[None, :]
+    t_arr = np.array([arrtime[c] for c in clusters], dtype=float)[:, None]
+    t_dep = np.array([deptime[c] for c in clusters], dtype=float)[:, None]
+    parked = (t_arr <= t) & (t < t_dep)
+    P_CH = np.where(parked, np.array([p_ch[c] for c in clusters])[:, None], 0.0)
+    P_DS = np.where(parked, np.array([p_ds[c] for c in clusters])[:, None], 0.0)
+
+    w_g2v = np.array([[g2v_dps[c][t] for t in steps[:-1]] for c in clusters])
+    w_v2g = np.array([[v2g_dps[c][t] for t in steps[:-1]] for c in clusters])
+    w_g2v = w_g2v.reshape(n, len(steps) - 1)
+    w_v2g = w_v2g.reshape(n, len(steps) - 1)
+    price = np.where(P_DS > 0, w_v2g, w_g2v)
+    bounded = ~np.any((P_CH > 0) & (P_DS > 0) & (w_v2g > w_g2v), axis=1)
+
+    def array(value):
+        return np.full(n, value, dtype=float)
+
+    p, s, infeasible = _minimize_cost_arrays(
+        opt_step,
+        steps,
+        array(ecap),
+        array(tarsoc),
+        array(minsoc),
+        array(maxsoc),
+        array(crtsoc),
+        array(crttime),
+        np.array([arrsoc[c] for c in clusters], dtype=float),
+        P_CH,
+        P_DS,
+        price,
+    )
+
+    p_pos = np.maximum(p[:, :-1], 0.0)
+    p_neg = np.maximum(-p[:, :-1], 0.0)
+    bound = np.where(bounded, (price * p[:, :-1]).sum(axis=1), -np.inf)
+    cost = (w_g2v * p_pos - w_v2g * p_neg).sum(axis=1)
+    discharge = p_neg.sum(axis=1) * opt_step
+
+    return p, s, bound * opt_step / 3600, cost * opt_step / 3600, discharge, infeasible
+
+
+def smart_routing(
+    solver,
+    opt_horizon,
+    opt_step,
+    ecap,
+    v2gall,
+    tarsoc,
+    minsoc,
+    maxsoc,
+    crtsoc,
+    crttime,
+    arrtime,
+    deptime,
+    arrsoc,
+    p_ch,
+    p_ds,
+    g2v_dps,
+    v2g_dps,
+    executor=None,
+):
+    """
+    This function solves the smart routing problem of
+    datafev.algorithms.vehicle.routing_milp.smart_routing by enumerating the
+    candidate clusters. Since the EV is allocated to exactly one cluster, the
+    problem splits into a small scheduling problem per candidate.
+
+    The candidates are first scheduled with the greedy single-EV solver
+    (datafev.algorithms.vehicle.scheduling_greedy) neglecting the V2G
+    allowance and with one price per time step. This gives a lower bound on
+    the cost of each candidate and, if the V2G allowance is respected, a
+    feasible schedule. If the G2V and V2G prices coincide (no arbitrage) and
+    the V2G allowance is not binding, the greedy schedules are optimal and no
+    optimization is needed. Otherwise, the candidates whose lower bounds are
+    below the best known cost are solved with the MILP restricted to that
+    candidate, in the order of their bounds (or concurrently by an executor).
+
+    Parameters
+    ----------
+    solver : pyomo SolverFactory object or HighsSolver
+        Optimization solver for the candidates that the greedy solver cannot
+        settle.
+    opt_horizon : list of integers
+        Time step identifiers in the optimization horizon.
+    opt_step : float
+        Size of one time step in the optimization (seconds).
+    ecap : float
+        Energy capacity of battery (kWs).
+    v2gall : float
+        V2G allowance discharge (kWs).
+    tarsoc : float
+        Target final soc (0<inisoc<1).
+    minsoc : float
+        Minimum soc.
+    maxsoc : float
+        Maximum soc.
+    crtsoc : float
+        Target soc at crttime.
+    crttime : int
+        Critical time s.t. s(srttime)> crtsoc.
+    arrtime : dict of int
+        Cluster differentiating arrival times.
+    deptime : dict of int
+        Cluster differentiating departure times.
+    arrsoc : dict of float
+        Cluster differentiating arrival soc (0<arrsoc<1).
+    p_ch : dict of float
+        Nominal charging power (kW).
+    p_ds : dict of float
+        Nominal discharging power (kW).
+    g2v_dps : dict of dict
+        G2V dynamic price signals of clusters (Eur/kWh).
+    v2g_dps : dict of dict
+        V2G dynamic price signals of clusters (Eur/kWh).
+    executor : concurrent.futures.Executor, optional
+        Executor to solve the remaining candidate problems concurrently. The
+        solver must be picklable if a process pool is used. The default is
+        None (sequential solving with pruning after each candidate).
+
+    Returns
+    -------
+    p_schedule : dict
+        Power schedule.
+        Each item in the EV dictionary indicates the power to be supplied to
+        the EV(kW) during a particular time step.
+    s_schedule : dict
+        SOC schedule.
+        Each item in the EV dictionary indicates the SOC to be achieved by the
+        EV by a particular time step.
+    target_cc : string
+        Cluster to send the EV.
+
+    Raises
+    ------
+    ValueError
+        If the target SOC cannot be achieved in any candidate cluster.
+
+    """
+
+    clusters = list(arrtime.keys())
+    steps = list(opt_horizon)
+
+    p, s, bound, cost, discharge, infeasible = _relaxed_candidates(
+        steps,
+        opt_step,
+        ecap,
+        tarsoc,
+        minsoc,
+        maxsoc,
+        crtsoc,
+        crttime,
+        arrtime,
+        deptime,
+        arrsoc,
+        p_ch,
+        p_ds,
+        g2v_dps,
+        v2g_dps,
+    )
+
+    if infeasible.all():
+        raise ValueError("Target SOC cannot be achieved in any candidate cluster")
+
+    def improves(value):
+        # Cost differences below 1e-9 Eur are neglected
+        return value < best_cost - 1e-9
+
+    # Incumbent: the cheapest greedy schedule that respects the V2G allowance
+    best = None
+    best_cost = np.inf
+    admissible = ~infeasible & (discharge <= v2gall + 1e-9)
+    for n in np.flatnonzero(admissible):
+        if improves(cost[n]):
+            p_n = dict(zip(steps, p[n].tolist()))
+            s_n = dict(zip(steps, s[n].tolist()))
+            best, best_cost = (p_n, s_n, clusters[n]), cost[n]
+
+    # Candidates that may beat the incumbent (greedy schedules matching their
+    # lower bounds are already optimal)
+    exact = admissible & (cost <= bound + 1e-9)
+    order = np.argsort(bound, kind="stable")
+    remaining = [n for n in order if not (infeasible[n] or exact[n])]
+
+    def subproblem(n):
+        c = clusters[n]
+        return (
+            solver,
+            steps,
+            opt_step,
+            ecap,
+            v2gall,
+            tarsoc,
+            minsoc,
+            maxsoc,
+            crtsoc,
+            crttime,
+            {c: arrtime[c]},
+            {c: deptime[c]},
+            {c: arrsoc[c]},
+            {c: p_ch[c]},
+            {c: p_ds[c]},
+            {c: g2v_dps[c]},
+            {c: v2g_dps[c]},
+        )
+
+    def evaluate(n, result):
+        p_n, s_n, _ = result
+        c = clusters[n]
+        return sum(
+            g2v_dps[c][t] * max(p_n[t], 0.0) + v2g_dps[c][t] * min(p_n[t], 0.0)
+            for t in steps[:-1]
+        ) * opt_step / 3600
+
+    if executor is not None:
+        remaining = [n for n in remaining if improves(bound[n])]
+        futures = [
+            executor.submit(routing_milp.smart_routing, *subproblem(n))
+            for n in remaining
+        ]
+        for n, future in zip(remaining, futures):
+            result = future.result()
+            result_cost = evaluate(n, result)
+            if improves(result_cost):
+                best, best_cost = result, result_cost
+    else:
+        for n in remaining:
+            if not improves(bound[n]):
+                break
+            result = routing_milp.smart_routing(*subproblem(n))
+            result_cost = evaluate(n, result)
+            if improves(result_cost):
+                best, best_cost = result, result_cost
+
+    if best is None:
+        raise ValueError("Target SOC cannot be achieved in any candidate cluster")
+
+    return best
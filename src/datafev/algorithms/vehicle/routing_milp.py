@@ -21,6 +21,8 @@
 
 from pyomo.core import *
 import pyomo.kernel as pmo
+import numpy as np
+from datafev.algorithms.matrix_form import MatrixModel, HighsSolver
 
 
 def smart_routing(
@@ -49,6 +51,9 @@ def smart_routing(
     
     Parameters
     ----------
+    solver : pyomo SolverFactory object or HighsSolver
+        Optimization solver. The model is assembled in matrix form if a
+        datafev.algorithms.matrix_form.HighsSolver is given.
     opt_step : float
         Size of one time step in the optimization (seconds).
     opt_horizon : list of integers
@@ -97,6 +102,27 @@ def smart_routing(
     
     """
 
+    if isinstance(solver, HighsSolver):
+        return _smart_routing_matrix(
+            solver,
+            opt_horizon,
+            opt_step,
+            ecap,
+            v2gall,
+            tarsoc,
+            minsoc,
+            maxsoc,
+            crtsoc,
+            crttime,
+            arrtime,
+            deptime,
+            arrsoc,
+            p_ch,
+            p_ds,
+            g2v_dps,
+            v2g_dps,
+        )
+
     conf_period = {}
     for t in opt_horizon:
         if t < crttime:
@@ -264,16 +290,139 @@ def smart_routing(
     return p_schedule, s_schedule, target_cc
 
 
+def _smart_routing_matrix(
+    solver,
+    opt_horizon,
+    opt_step,
+    ecap,
+    v2gall,
+    tarsoc,
+    minsoc,
+    maxsoc,
+    crtsoc,
+    crttime,
+    arrtime,
+    deptime,
+    arrsoc,
+    p_ch,
+    p_ds,
+    g2v_dps,
+    v2g_dps,
+):
+    # Matrix form of the model of 'smart_routing' (solved by HighsSolver)
+    steps = list(opt_horizon)
+    clusters = list(arrtime.keys())
+    nb_of_steps = len(steps)
+    nb_of_clusters = len(clusters)
+    shape = (nb_of_clusters, nb_of_steps)
+
+    t = np.asarray(steps)[None, :]
+    t_arr = np.array([arrtime[c] for c in clusters], dtype=float)[:, None]
+    t_dep = np.array([deptime[c] for c in clusters], dtype=float)[:, None]
+    parked = (t_arr <= t) & (t < t_dep)
+    P_CH = np.array([p_ch[c] for c in clusters], dtype=float)[:, None]
+    P_DS = np.array([p_ds[c] for c in clusters], dtype=float)[:, None]
+    P_CH_Max = max(p_ch.values())
+    P_DS_Max = max(p_ds.values())
+
+    # SOC must be larger than crtsoc in the confidence period
+    soc_lb = np.where(np.asarray(steps) < crttime, minsoc, max(minsoc, crtsoc))
+
+    ####################Constructing the optimization model####################
+    model = MatrixModel()
+
+    xc = model.add_variables(nb_of_clusters, binary=True)
+    xp = model.add_variables(nb_of_steps, binary=True)
+    p_ub = np.full(nb_of_steps, np.inf)
+    p_ub[-1] = 0.0
+    p = model.add_variables(nb_of_steps, lb=-p_ub, ub=p_ub)
+    p_pos = model.add_variables(nb_of_steps)
+    p_neg = model.add_variables(nb_of_steps)
+    pc_pos = model.add_variables(shape, ub=np.where(parked, np.inf, 0.0))
+    pc_neg = model.add_variables(shape, ub=np.where(parked, np.inf, 0.0))
+    soc = model.add_variables(nb_of_steps, lb=soc_lb, ub=maxsoc)
+
+    # Initial SOC depends on the selected cluster
+    rows = model.add_constraints(1, lb=0.0, ub=0.0)
+    model.add_terms(rows, 1.0, soc[0])
+    model.add_terms(rows, [-arrsoc[c] for c in clusters], xc)
+
+    # Storage conservation and final SOC
+    rows = model.add_constraints(nb_of_steps - 1, lb=0.0, ub=0.0)
+    model.add_terms(rows, 1.0, soc[1:])
+    model.add_terms(rows, -1.0, soc[:-1])
+    model.add_terms(rows, -opt_step / ecap, p[:-1])
+    rows = model.add_constraints(1, lb=tarsoc, ub=tarsoc)
+    model.add_terms(rows, 1.0, soc[-1])
+
+    # EV can be assigned to only one cluster
+    rows = model.add_constraints(1, lb=1.0, ub=1.0)
+    model.add_terms(rows, 1.0, xc)
+
+    # Charge/discharge only in the selected cluster
+    rows = model.add_constraints(shape, ub=0.0)
+    model.add_terms(rows, 1.0, pc_neg)
+    model.add_terms(rows, -P_DS, xc[:, None])
+    rows = model.add_constraints(shape, ub=0.0)
+    model.add_terms(rows, 1.0, pc_pos)
+    model.add_terms(rows, -P_CH, xc[:, None])
+
+    rows = model.add_constraints(nb_of_steps, lb=0.0, ub=0.0)
+    model.add_terms(rows, 1.0, p)
+    model.add_terms(rows[None, :], -1.0, pc_pos)
+    model.add_terms(rows[None, :], 1.0, pc_neg)
+
+    rows = model.add_constraints(nb_of_steps, lb=0.0, ub=0.0)
+    model.add_terms(rows, 1.0, p)
+    model.add_terms(rows, -1.0, p_pos)
+    model.add_terms(rows, 1.0, p_neg)
+
+    # Either charging or discharging at a time step
+    rows = model.add_constraints(nb_of_steps, ub=0.0)
+    model.add_terms(rows, 1.0, p_pos)
+    model.add_terms(rows, -P_CH_Max, xp)
+    rows = model.add_constraints(nb_of_steps, ub=P_DS_Max)
+    model.add_terms(rows, 1.0, p_neg)
+    model.add_terms(rows, P_DS_Max, xp)
+
+    rows = model.add_constraints(nb_of_steps, lb=0.0, ub=0.0)
+    model.add_terms(rows, 1.0, p_pos)
+    model.add_terms(rows[None, :], -1.0, pc_pos)
+    rows = model.add_constraints(nb_of_steps, lb=0.0, ub=0.0)
+    model.add_terms(rows, 1.0, p_neg)
+    model.add_terms(rows[None, :], -1.0, pc_neg)
+
+    # V2G allowance
+    rows = model.add_constraints(1, ub=v2gall)
+    model.add_terms(rows, opt_step, p_neg)
+
+    # Cost of charging in the selected cluster
+    w_g2v = np.array([[g2v_dps[c][t] for t in steps[:-1]] for c in clusters])
+    w_v2g = np.array([[v2g_dps[c][t] for t in steps[:-1]] for c in clusters])
+    model.add_objective(w_g2v * opt_step / 3600, pc_pos[:, :-1])
+    model.add_objective(-w_v2g * opt_step / 3600, pc_neg[:, :-1])
+
+    x = solver.solve(model)
+
+    p_schedule = dict(zip(steps, x[p].tolist()))
+    s_schedule = dict(zip(steps, x[soc].tolist()))
+    for n, c in enumerate(clusters):
+        if abs(x[xc[n]] - 1) <= 0.01:
+            target_cc = c
+
+    return p_schedule, s_schedule, target_cc
+
+
 if __name__ == "__main__":
 
     import pandas as pd
     import numpy as np
     from pyomo.environ import *
-    from pyomo.opt import SolverFactory
+    from datafev.algorithms.solver import create_solver
 
     ###########################################################################
     # Input parameters
-    solver = SolverFactory("cplex")
+    solver = create_solver()
     opt_step = 300  # seconds
     opt_horizon = range(13)  # [0 1 2 3 4 .. 12]  == 1 hour for opt_step=300 seconds
     ecap = 50 * 3600  # kWs
@@ -21,6 +21,8 @@
 
 from pyomo.core import *
 import pyomo.kernel as pmo
+import numpy as np
+from datafev.algorithms.matrix_form import MatrixModel, HighsSolver
 
 
 def maximum_final_soc(
@@ -48,6 +50,9 @@ def maximum_final_soc(
     
     Parameters
     ----------
+    solver : pyomo SolverFactory object or HighsSolver
+        Optimization solver. The model is assembled in matrix form if a
+        datafev.algorithms.matrix_form.HighsSolver is given.
     opt_step : float
         Size of one time step in the optimization (seconds).
     opt_horizon : list of integers
@@ -88,6 +93,25 @@ def maximum_final_soc(
 
     """
 
+    if isinstance(solver, HighsSolver):
+        return _maximum_final_soc_matrix(
+            solver,
+            opt_step,
+            opt_horizon,
+            ecap,
+            tarsoc,
+            v2gall,
+            minsoc,
+            maxsoc,
+            inisoc,
+            p_ch,
+            p_ds,
+            upperlimit,
+            lowerlimit,
+            penalty_up,
+            penalty_down,
+        )
+
     ####################Constructing the optimization model####################
     model = ConcreteModel()
 
@@ -173,15 +197,97 @@ def maximum_final_soc(
     return p_schedule, s_schedule#,soc_final
 
 
+
+def _maximum_final_soc_matrix(
+    solver,
+    opt_step,
+    opt_horizon,
+    ecap,
+    tarsoc,
+    v2gall,
+    minsoc,
+    maxsoc,
+    inisoc,
+    p_ch,
+    p_ds,
+    upperlimit,
+    lowerlimit,
+    penalty_up,
+    penalty_down,
+):
+    # Matrix form of the model of 'maximum_final_soc' (solved by HighsSolver)
+    steps = list(opt_horizon[:-1])
+    nb_of_steps = len(steps)
+
+    ####################Constructing the optimization model####################
+    model = MatrixModel()
+
+    xp = model.add_variables(nb_of_steps, binary=True)
+    p = model.add_variables(nb_of_steps, lb=-np.inf)
+    p_pos = model.add_variables(nb_of_steps)
+    p_neg = model.add_variables(nb_of_steps)
+    soc = model.add_variables(nb_of_steps + 1, lb=max(minsoc, 0.0), ub=maxsoc)
+    viol_up = model.add_variables(nb_of_steps)
+    viol_do = model.add_variables(nb_of_steps)
+
+    # Initial SOC, final SOC and storage conservation
+    rows = model.add_constraints(1, lb=inisoc, ub=inisoc)
+    model.add_terms(rows, 1.0, soc[0])
+    rows = model.add_constraints(1, lb=tarsoc, ub=tarsoc)
+    model.add_terms(rows, 1.0, soc[-1])
+    rows = model.add_constraints(nb_of_steps, lb=0.0, ub=0.0)
+    model.add_terms(rows, 1.0, soc[1:])
+    model.add_terms(rows, -1.0, soc[:-1])
+    model.add_terms(rows, -opt_step / ecap, p)
+
+    rows = model.add_constraints(nb_of_steps, lb=0.0, ub=0.0)
+    model.add_terms(rows, 1.0, p)
+    model.add_terms(rows, -1.0, p_pos)
+    model.add_terms(rows, 1.0, p_neg)
+
+    # Either charging or discharging at a time step
+    rows = model.add_constraints(nb_of_steps, ub=0.0)
+    model.add_terms(rows, 1.0, p_pos)
+    model.add_terms(rows, -p_ch, xp)
+    rows = model.add_constraints(nb_of_steps, ub=p_ds)
+    model.add_terms(rows, 1.0, p_neg)
+    model.add_terms(rows, p_ds, xp)
+
+    # V2G allowance
+    rows = model.add_constraints(1, ub=v2gall)
+    model.add_terms(rows, opt_step, p_neg)
+
+    # Soft capacity limits
+    rows = model.add_constraints(nb_of_steps, ub=[upperlimit[t] for t in steps])
+    model.add_terms(rows, 1.0, p)
+    model.add_terms(rows, -1.0, viol_up)
+    rows = model.add_constraints(nb_of_steps, lb=[lowerlimit[t] for t in steps])
+    model.add_terms(rows, 1.0, p)
+    model.add_terms(rows, 1.0, viol_do)
+
+    pen_up = np.array([penalty_up[t] for t in steps], dtype=float)
+    pen_do = np.array([penalty_down[t] for t in steps], dtype=float)
+    model.add_objective(pen_up * opt_step, viol_up)
+    model.add_objective(pen_do * opt_step, viol_do)
+    model.add_objective(-0.0001, soc[:-1])
+
+    x = solver.solve(model)
+
+    p_schedule = dict(zip(steps, x[p].tolist()))
+    s_schedule = dict(zip(list(opt_horizon), x[soc].tolist()))
+
+    return p_schedule, s_schedule
+
+
 if __name__ == "__main__":
 
-    from pyomo.environ import SolverFactory
+    from datafev.algorithms.solver import create_solver
     import pandas as pd
     import numpy as np
 
     ###########################################################################
     # Input parameters
-    solver = SolverFactory("cplex")
+    solver = create_solver()
     step = 300  # Time step size= 300 seconds = 5 minutes
     horizon = list(range(13))  # Optimization horizon= 12 steps = 60 minutes
     ecap = 55 * 3600  # Battery capacity= 55 kWh
@@ -0,0 +1,321 @@
+# The datafev framework
+
+# Copyright (C) 2022,
+# Institute for Automation of Complex Power Systems (ACS),
+# E.ON Energy Research Center (E.ON ERC),
+# RWTH Aachen University
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+# documentation files (the "Software"), to deal in the Software without restriction, including without limitation the
+# rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit
+# persons to whom the Software is furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of the
+# Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE
+# WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+# COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+# OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+
+
+import numpy as np
+
+
+def _greedy_fill(price, q_max, cum_lb, cum_ub, total):
+    # Minimizes sum(price * q) subject to 0 <= q <= q_max and
+    # cum_lb <= cumsum(q) <= cum_ub (prefix sums, the first column of the
+    # bounds refers to the empty prefix) and sum(q) == total. The constraints
+    # form a laminar family, so filling the cheapest slots first with the
+    # largest amount that keeps the remaining problem feasible is optimal.
+    # All arrays have a leading EV axis, each iteration fills one slot per EV.
+    nb_of_evs, nb_of_slots = price.shape
+
+    lb = cum_lb.copy()
+    ub = cum_ub.copy()
+    lb[:, 0] = 0.0
+    ub[:, 0] = 0.0
+    lb_end = lb.copy()
+    ub_end = ub.copy()
+    lb_end[:, -1] = total
+    ub_end[:, -1] = total
+
+    # Feasibility: the intervals of prefix sums reachable from the start and
+    # those from which the total is reachable must overlap at every step
+    Q_max = np.hstack((np.zeros((nb_of_evs, 1)), np.cumsum(q_max, axis=1)))
+    lo = np.maximum.accumulate(lb, axis=1)
+    hi = Q_max + np.minimum.accumulate(ub - Q_max, axis=1)
+    back_lo = Q_max + np.maximum.accumulate((lb_end - Q_max)[:, ::-1], axis=1)[:, ::-1]
+    back_hi = np.minimum.accumulate(ub_end[:, ::-1], axis=1)[:, ::-1]
+    gap = np.maximum(lo, back_lo) - np.minimum(hi, back_hi)
+    infeasible = np.any(gap > 1e-9, axis=1)
+
+    # Filling slot k shifts the prefix sums after k. With the running margins
+    # lb - cumsum(q) and ub_end - cumsum(q), the largest feasible amount for a
+    # free slot k is the smallest margin after k minus the largest before it.
+    margin_lo = lb.copy()
+    margin_hi = ub_end.copy()
+    position = np.arange(nb_of_slots + 1)[None, :]
+    order = np.argsort(price, axis=1, kind="stable")
+    rows = np.arange(nb_of_evs)
+    for rank in range(nb_of_slots):
+        k = order[:, rank]
+        if nb_of_evs == 1:
+            # Slicing is cheaper than masking for a single EV
+            k = k[0]
+            room = margin_hi[0, k + 1 :].min() - margin_lo[0, : k + 1].max()
+            amount = min(max(room, 0.0), q_max[0, k])
+            margin_lo[0, k + 1 :] -= amount
+            margin_hi[0, k + 1 :] -= amount
+            continue
+        after = position > k[:, None]
+        room = np.where(after, margin_hi, np.inf).min(axis=1)
+        room -= np.where(after, -np.inf, margin_lo).max(axis=1)
+        amount = np.clip(room, 0.0, q_max[rows, k])
+        margin_lo -= amount[:, None] * after
+        margin_hi -= amount[:, None] * after
+    q = np.diff(lb - margin_lo, axis=1)
+
+    return q, infeasible
+
+
+def _minimize_cost_arrays(
+    opt_step,
+    opt_horizon,
+    ecap,
+    tarsoc,
+    minsoc,
+    maxsoc,
+    crtsoc,
+    crttime,
+    inisoc,
+    p_ch,
+    p_ds,
+    price,
+):
+    # Vectorized solution of the LP of scheduling_lp.minimize_cost for the EVs
+    # along the first axis. The power limits p_ch and p_ds are given per EV and
+    # time slot. Power is written as p = q - p_ds with 0 <= q <= p_ch + p_ds so
+    # that the SOC path becomes a prefix sum of q.
+    steps = np.asarray(opt_horizon)
+    zeros = np.zeros((len(ecap), 1))
+
+    to_soc = (opt_step / ecap)[:, None]
+    q_max = (p_ch + p_ds) * to_soc
+    drift = np.hstack((zeros, np.cumsum(p_ds * to_soc, axis=1)))
+
+    # SOC must be larger than crtsoc in the confidence period
+    soc_lb = np.where(
+        steps[None, :] < crttime[:, None],
+        minsoc[:, None],
+        np.maximum(minsoc, crtsoc)[:, None],
+    )
+    soc_ub = np.repeat(maxsoc[:, None], len(steps), axis=1)
+    cum_lb = soc_lb - inisoc[:, None] + drift
+    cum_ub = soc_ub - inisoc[:, None] + drift
+    total = tarsoc - inisoc + drift[:, -1]
+
+    # The initial and final SOC must respect the SOC bounds
+    outside = (inisoc < soc_lb[:, 0] - 1e-9) | (inisoc > soc_ub[:, 0] + 1e-9)
+    outside |= (tarsoc < soc_lb[:, -1] - 1e-9) | (tarsoc > soc_ub[:, -1] + 1e-9)
+
+    q, infeasible = _greedy_fill(price, q_max, cum_lb, cum_ub, total)
+
+    p = np.hstack((q / to_soc - p_ds, zeros))
+    s = inisoc[:, None] + np.hstack((zeros, np.cumsum(q, axis=1) - drift[:, 1:]))
+
+    return p, s, infeasible | outside
+
+
+def minimize_cost(
+    opt_step,
+    opt_horizon,
+    ecap,
+    tarsoc,
+    minsoc,
+    maxsoc,
+    crtsoc,
+    crttime,
+    inisoc,
+    p_ch,
+    p_ds,
+    dps,
+):
+    """
+    This function optimizes the charging schedule of a single EV with the
+    objective of charging cost minimization for the given price signal. It
+    solves the LP of datafev.algorithms.vehicle.scheduling_lp.minimize_cost
+    exactly without an optimization solver: the price slots are sorted and
+    filled greedily with the largest amount of energy that keeps the SOC path
+    feasible. The losses in power transfer are neglected.
+
+    Parameters
+    ----------
+    opt_step : float
+        Size of one time step in the optimization (seconds).
+    opt_horizon : list of integers
+        Time step identifiers in the optimization horizon (0, 1, ..., T).
+    ecap : float
+        Energy capacity of battery (kWs).
+    tarsoc : float
+        Target final soc (0<inisoc<1).
+    minsoc : float
+        Minimum soc.
+    maxsoc : float
+        Maximum soc.
+    crtsoc : float
+        Target soc at crttime.
+    crttime : int
+        Critical time s.t. s(srttime) > crtsoc.
+    inisoc : float
+        Initial soc (0<inisoc<1).
+    p_ch : float
+        Nominal charging power (kW).
+    p_ds : float
+        Nominal discharging power (kW).
+    dps : dict of float
+        Dynamic price signal (Eur/kWh).
+
+    Returns
+    -------
+    p_schedule : dict
+        Power schedule.
+        Each item in the EV dictionary indicates the power to be supplied to
+        the EV(kW) during a particular time step.
+    s_schedule : dict
+        SOC schedule.
+        Each item in the EV dictionary indicates the SOC to be achieved by the
+        EV by a particular time step.
+
+    Raises
+    ------
+    ValueError
+        If the target SOC cannot be achieved within the SOC and power limits.
+
+    """
+
+    p_schedule, s_schedule = minimize_cost_batch(
+        opt_step,
+        opt_horizon,
+        {0: ecap},
+        {0: tarsoc},
+        {0: minsoc},
+        {0: maxsoc},
+        {0: crtsoc},
+        {0: crttime},
+        {0: inisoc},
+        {0: p_ch},
+        {0: p_ds},
+        {0: dps},
+    )
+
+    return p_schedule[0], s_schedule[0]
+
+
+def minimize_cost_batch(
+    opt_step,
+    opt_horizon,
+    ecap,
+    tarsoc,
+    minsoc,
+    maxsoc,
+    crtsoc,
+    crttime,
+    inisoc,
+    p_ch,
+    p_ds,
+    dps,
+):
+    """
+    This function optimizes the charging schedules of several EVs at once
+    (see minimize_cost). The EVs do not share any constraint; their problems
+    are solved simultaneously with array operations.
+
+    Parameters
+    ----------
+    opt_step : float
+        Size of one time step in the optimization (seconds).
+    opt_horizon : list of integers
+        Time step identifiers in the optimization horizon (0, 1, ..., T).
+    ecap : dict of float
+        Energy capacities of batteries (kWs).
+    tarsoc : dict of float
+        Target final socs.
+    minsoc : dict of float
+        Minimum socs.
+    maxsoc : dict of float
+        Maximum socs.
+    crtsoc : dict of float
+        Target socs at crttime.
+    crttime : dict of int
+        Critical times s.t. s(srttime) > crtsoc.
+    inisoc : dict of float
+        Initial socs.
+    p_ch : dict of float
+        Nominal charging powers (kW).
+    p_ds : dict of float
+        Nominal discharging powers (kW).
+    dps : dict of dict
+        Dynamic price signals of EVs (Eur/kWh).
+
+    Returns
+    -------
+    p_schedule : dict
+        Power schedule.
+        It contains a dictionary for each EV. Each item in the EV dictionary
+        indicates the power to be supplied to the EV(kW) during a particular
+        time step.
+    s_schedule : dict
+        SOC schedule.
+        It contains a dictionary for each EV. Each item in the EV dictionary
+        indicates the SOC to be achieved by the EV by a particular time step.
+
+    Raises
+    ------
+    ValueError
+        If the target SOC of an EV cannot be achieved within its SOC and power
+        limits.
+
+    """
+
+    evs = list(ecap.keys())
+    steps = list(opt_horizon)
+
+    def array(param):
+        return np.array([param[v] for v in evs], dtype=float)
+
+    def per_slot(param):
+        return np.repeat(array(param)[:, None], len(steps) - 1, axis=1)
+
+    price = np.array([[dps[v][t] for t in steps[:-1]] for v in evs], dtype=float)
+    price = price.reshape(len(evs), len(steps) - 1)
+
+    p, s, infeasible = _minimize_cost_arrays(
+        opt_step,
+        steps,
+        array(ecap),
+        array(tarsoc),
+        array(minsoc),
+        array(maxsoc),
+        array(crtsoc),
+        array(crttime),
+        array(inisoc),
+        per_slot(p_ch),
+        per_slot(p_ds),
+        price,
+    )
+
+    if infeasible.any():
+        raise ValueError(
+            "Target SOC cannot be achieved for the EVs: "
+            + ", ".join(str(v) for v, inf in zip(evs, infeasible) if inf)
+        )
+
+    p_schedule = {}
+    s_schedule = {}
+    for n, v in enumerate(evs):
+        p_schedule[v] = dict(zip(steps, p[n].tolist()))
+        s_schedule[v] = dict(zip(steps, s[n].tolist()))
+
+    return p_schedule, s_schedule
@@ -20,6 +20,8 @@
 
 
 from pyomo.core import *
+import numpy as np
+from datafev.algorithms.matrix_form import MatrixModel, HighsSolver
 
 
 def minimize_cost(
@@ -43,6 +45,9 @@ def minimize_cost(
 
     Parameters
     ----------
+    solver : pyomo SolverFactory object or HighsSolver
+        Optimization solver. The model is assembled in matrix form if a
+        datafev.algorithms.matrix_form.HighsSolver is given.
     opt_step : float
         Size of one time step in the optimization (seconds).
     opt_horizon : list of integers
@@ -82,6 +87,23 @@ def minimize_cost(
         EV by a particular time step.
     """
 
+    if isinstance(solver, HighsSolver):
+        return _minimize_cost_matrix(
+            solver,
+            opt_step,
+            opt_horizon,
+            ecap,
+            tarsoc,
+            minsoc,
+            maxsoc,
+            crtsoc,
+            crttime,
+            inisoc,
+            p_ch,
+            p_ds,
+            dps,
+        )
+
     conf_period = {}
     for t in opt_horizon:
         if t < crttime:
@@ -152,14 +174,67 @@ def minimize_cost(
     return p_schedule, s_schedule
 
 
+def _minimize_cost_matrix(
+    solver,
+    opt_step,
+    opt_horizon,
+    ecap,
+    tarsoc,
+    minsoc,
+    maxsoc,
+    crtsoc,
+    crttime,
+    inisoc,
+    p_ch,
+    p_ds,
+    dps,
+):
+    # Matrix form of the model of 'minimize_cost' (solved by HighsSolver)
+    steps = list(opt_horizon)
+    nb_of_steps = len(steps)
+
+    # SOC must be larger than crtsoc in the confidence period
+    soc_lb = np.where(np.asarray(steps) < crttime, minsoc, max(minsoc, crtsoc))
+
+    ####################Constructing the optimization model####################
+    model = MatrixModel()
+
+    p_lb = np.full(nb_of_steps, -p_ds, dtype=float)
+    p_ub = np.full(nb_of_steps, p_ch, dtype=float)
+    p_lb[-1] = max(p_lb[-1], 0.0)
+    p_ub[-1] = min(p_ub[-1], 0.0)
+    p = model.add_variables(nb_of_steps, lb=p_lb, ub=p_ub)
+    soc = model.add_variables(nb_of_steps, lb=soc_lb, ub=maxsoc)
+
+    # Initial SOC, storage conservation and final SOC
+    rows = model.add_constraints(1, lb=inisoc, ub=inisoc)
+    model.add_terms(rows, 1.0, soc[0])
+    rows = model.add_constraints(nb_of_steps - 1, lb=0.0, ub=0.0)
+    model.add_terms(rows, 1.0, soc[1:])
+    model.add_terms(rows, -1.0, soc[:-1])
+    model.add_terms(rows, -opt_step / ecap, p[:-1])
+    rows = model.add_constraints(1, lb=tarsoc, ub=tarsoc)
+    model.add_terms(rows, 1.0, soc[-1])
+
+    price = np.array([dps[t] for t in steps[:-1]], dtype=float)
+    model.add_objective(price * opt_step / 3600, p[:-1])
+
+    x = solver.solve(model)
+
+    p_schedule = dict(zip(steps, x[p].tolist()))
+    s_schedule = dict(zip(steps, x[soc].tolist()))
+
+    return p_schedule, s_schedule
+
+
 if __name__ == "__main__":
 
-    from pyomo.environ import SolverFactory
+    from datafev.algorithms.solver import create_solver
     import pandas as pd
 
     ###########################################################################
     # Input parameters
-    solver = SolverFactory("gurobi")
+    solver = create_solver()
     step = 600  # Time step size= 600 seconds = 10 minutes
     horizon = list(range(7))  # Optimization horizon= 6 steps = 60 minutes
     ecap = 55 * 3600  # Battery capacity= 55 kWh
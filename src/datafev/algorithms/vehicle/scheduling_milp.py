@@ -21,6 +21,8 @@
 
 from pyomo.core import *
 import pyomo.kernel as pmo
+import numpy as np
+from datafev.algorithms.matrix_form import MatrixModel, HighsSolver
 
 
 def minimize_cost(
@@ -47,6 +49,9 @@ def minimize_cost(
     
     Parameters
     ----------
+    solver : pyomo SolverFactory object or HighsSolver
+        Optimization solver. The model is assembled in matrix form if a
+        datafev.algorithms.matrix_form.HighsSolver is given.
     opt_step : float
         Size of one time step in the optimization (seconds).
     opt_horizon : list of integers
@@ -89,6 +94,25 @@ def minimize_cost(
         
     """
 
+    if isinstance(solver, HighsSolver):
+        return _minimize_cost_matrix(
+            solver,
+            opt_step,
+            opt_horizon,
+            ecap,
+            v2gall,
+            tarsoc,
+            minsoc,
+            maxsoc,
+            crtsoc,
+            crttime,
+            inisoc,
+            p_ch,
+            p_ds,
+            g2v_dps,
+            v2g_dps,
+        )
+
     conf_period = {}
     for t in opt_horizon:
         if t < crttime:
@@ -194,15 +218,90 @@ def minimize_cost(
     return p_schedule, s_schedule
 
 
+def _minimize_cost_matrix(
+    solver,
+    opt_step,
+    opt_horizon,
+    ecap,
+    v2gall,
+    tarsoc,
+    minsoc,
+    maxsoc,
+    crtsoc,
+    crttime,
+    inisoc,
+    p_ch,
+    p_ds,
+    g2v_dps,
+    v2g_dps,
+):
+    # Matrix form of the model of 'minimize_cost' (solved by HighsSolver)
+    steps = list(opt_horizon)
+    nb_of_steps = len(steps)
+
+    # SOC must be larger than crtsoc in the confidence period
+    soc_lb = np.where(np.asarray(steps) < crttime, minsoc, max(minsoc, crtsoc))
+
+    ####################Constructing the optimization model####################
+    model = MatrixModel()
+
+    xp = model.add_variables(nb_of_steps, binary=True)
+    p_ub = np.full(nb_of_steps, np.inf)
+    p_ub[-1] = 0.0
+    p = model.add_variables(nb_of_steps, lb=-p_ub, ub=p_ub)
+    p_pos = model.add_variables(nb_of_steps)
+    p_neg = model.add_variables(nb_of_steps)
+    soc = model.add_variables(nb_of_steps, lb=soc_lb, ub=maxsoc)
+
+    # Initial SOC, storage conservation and final SOC
+    rows = model.add_constraints(1, lb=inisoc, ub=inisoc)
+    model.add_terms(rows, 1.0, soc[0])
+    rows = model.add_constraints(nb_of_steps - 1, lb=0.0, ub=0.0)
+    model.add_terms(rows, 1.0, soc[1:])
+    model.add_terms(rows, -1.0, soc[:-1])
+    model.add_terms(rows, -opt_step / ecap, p[:-1])
+    rows = model.add_constraints(1, lb=tarsoc, ub=tarsoc)
+    model.add_terms(rows, 1.0, soc[-1])
+
+    rows = model.add_constraints(nb_of_steps, lb=0.0, ub=0.0)
+    model.add_terms(rows, 1.0, p)
+    model.add_terms(rows, -1.0, p_pos)
+    model.add_terms(rows, 1.0, p_neg)
+
+    # Either charging or discharging at a time step
+    rows = model.add_constraints(nb_of_steps, ub=0.0)
+    model.add_terms(rows, 1.0, p_pos)
+    model.add_terms(rows, -p_ch, xp)
+    rows = model.add_constraints(nb_of_steps, ub=p_ds)
+    model.add_terms(rows, 1.0, p_neg)
+    model.add_terms(rows, p_ds, xp)
+
+    # V2G allowance
+    rows = model.add_constraints(1, ub=v2gall)
+    model.add_terms(rows, opt_step, p_neg)
+
+    w_g2v = np.array([g2v_dps[t] for t in steps[:-1]], dtype=float)
+    w_v2g = np.array([v2g_dps[t] for t in steps[:-1]], dtype=float)
+    model.add_objective(w_g2v * opt_step / 3600, p_pos[:-1])
+    model.add_objective(-w_v2g * opt_step / 3600, p_neg[:-1])
+
+    x = solver.solve(model)
+
+    p_schedule = dict(zip(steps, x[p].tolist()))
+    s_schedule = dict(zip(steps, x[soc].tolist()))
+
+    return p_schedule, s_schedule
+
+
 if __name__ == "__main__":
 
-    from pyomo.environ import SolverFactory
+    from datafev.algorithms.solver import create_solver
     import pandas as pd
     import numpy as np
 
     ###########################################################################
     # Input parameters
-    solver = SolverFactory("gurobi")
+    solver = create_solver()
     step = 300  # Time step size= 300 seconds = 5 minutes
     horizon = list(range(13))  # Optimization horizon= 12 steps = 60 minutes
     ecap = 55 * 3600  # Battery capacity= 55 kWh
@@ -0,0 +1,429 @@
+# The datafev framework
+
+# Copyright (C) 2022,
+# Institute for Automation of Complex Power Systems (ACS),
+# E.ON Energy Research Center (E.ON ERC),
+# RWTH Aachen University
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+# documentation files (the "Software"), to deal in the Software without restriction, including without limitation the
+# rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit
+# persons to whom the Software is furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of the
+# Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE
+# WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+# COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+# OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+import time
+from pyomo.contrib.appsi.base import PersistentSolver
+from datafev.algorithms.solver import PyomoSolver, relative_gap
+from datafev.algorithms.matrix_form import NoSolutionError
+
+
+def shift_schedule(p_schedule, steps=1):
+    """
+    This function shifts the power schedules of a previous control step to
+    the current step (receding horizon). The steps that are not covered by the
+    previous schedules are filled with zero power.
+
+    Parameters
+    ----------
+    p_schedule : dict
+        Power schedules of the previous step. It contains a dictionary for each
+        EV. Each item in the EV dictionary indicates the power to be supplied
+        to the EV (kW) during a particular time step.
+    steps : int, optional
+        Number of time steps between the previous and the current step.
+        The default is 1.
+
+    Returns
+    -------
+    shifted : dict
+        Shifted power schedules.
+
+    """
+
+    shifted = {}
+    for v, schedule in p_schedule.items():
+        shifted[v] = {}
+        for t in schedule.keys():
+            if t - steps >= 0:
+                shifted[v][t - steps] = schedule[t]
+        last = max(schedule.keys()) if len(schedule) > 0 else -1
+        for t in range(max(last - steps + 1, 0), last + 1):
+            shifted[v][t] = 0.0
+    return shifted
+
+
+def receding_start(plan, ts, t_delta):
+    """
+    This function derives the start solution of a control step from the
+    plan of an earlier control step.
+
+    Start solutions are only accepted by the Pyomo solver interfaces that
+    support them (e.g., appsi_highs), which also measure the time to the first
+    incumbent. HighsSolver accepts no start solutions: the routines reject the
+    request with it (see datafev.algorithms.solver.check_warmstart).
+
+    Parameters
+    ----------
+    plan : dict
+        Control plan with the time of the control step that made the plan
+        ('Time') and the power schedules of the plan ('P Schedule').
+        None if there is no plan.
+    ts : datetime.datetime
+        Current time.
+    t_delta : datetime.timedelta
+        Resolution of the control steps.
+
+    Returns
+    -------
+    dict
+        Shifted power schedules of the plan. None if there is no plan made
+        at an earlier step of the time grid.
+
+    """
+
+    if plan is None:
+        return None
+    steps = (ts - plan["Time"]) / t_delta
+    if steps <= 0 or steps != int(steps):
+        return None
+    return shift_schedule(plan["P Schedule"], int(steps))
+
+
+def plan_step(plan, ts, t_delta, soc, tarsoc, deptime, limit_updates, tolerance):
+    """
+    This function checks whether the plan of an earlier control step can be
+    applied in the current step (event-triggered control). The plan must be
+    re-optimized if
+        - the connected EVs differ from the EVs of the plan (connection or
+          disconnection),
+        - the power limits have been updated since the plan was made,
+        - the target SOC of an EV at the end of the optimization horizon or
+          its departure differs from the one the plan was made for (the
+          targets move with the receding horizon),
+        - the plan does not cover the current step,
+        - or the SOC of an EV deviates from the SOC schedule of the plan by
+          more than the tolerance.
+
+    The rescheduling problems only penalize the SOCs at the end of the
+    optimization horizon; therefore, a reused plan may charge the EVs at other
+    times than re-optimization at every step would. The energy supplied to the
+    EVs differs only by the SOC deviations allowed by the tolerance.
+
+    Parameters
+    ----------
+    plan : dict
+        Control plan with the time of the control step that made the plan
+        ('Time'), the power and SOC schedules ('P Schedule', 'S Schedule'),
+        the target SOCs and the number of time steps until the departures
+        of the EVs ('Targets', 'Departures') and the number of limit updates
+        ('Limit Updates') at the time of planning. None if there is no plan.
+    ts : datetime.datetime
+        Current time.
+    t_delta : datetime.timedelta
+        Resolution of the control steps.
+    soc : dict of float
+        Current SOCs of the connected EVs.
+    tarsoc : dict of float
+        Current target SOCs of the connected EVs (at the end of the
+        optimization horizon).
+    deptime : dict of float
+        Current number of time steps until the departures of the connected
+        EVs.
+    limit_updates : hashable
+        Current number of updates of the power limits.
+    tolerance : float
+        Allowed deviation of the SOCs from the SOC schedule of the plan.
+
+    Returns
+    -------
+    int
+        Step of the plan to be applied in the current step. None if the plan
+        must be re-optimized.
+
+    """
+
+    if plan is None or plan.get("Limit Updates") != limit_updates:
+        return None
+    steps = (ts - plan["Time"]) / t_delta
+    if steps <= 0 or steps != int(steps):
+        return None
+    steps = int(steps)
+    if set(soc.keys()) != set(plan["P Schedule"].keys()):
+        return None
+    for v, soc_v in soc.items():
+        if steps not in plan["P Schedule"][v] or steps not in plan["S Schedule"][v]:
+            return None
+        if abs(soc_v - plan["S Schedule"][v][steps]) > tolerance:
+            return None
+        if tarsoc[v] != plan["Targets"][v]:
+            return None
+        if abs(plan["Departures"][v] - steps - deptime[v]) > 1e-9:
+            return None
+    return steps
+
+
+def start_trajectory(
+    p_schedule,
+    opt_step,
+    opt_horizon,
+    bcap,
+    inisoc,
+    minsoc,
+    maxsoc,
+    pmax_pos,
+    pmax_neg,
+    deptime,
+):
+    """
+    This function derives a feasible start trajectory of an EV from a start
+    power schedule. The power is limited to the power limits of the EV (and to
+    zero after its departure) and reduced where the SOC limits would be
+    violated. The SOC trajectory is recalculated from the current SOC.
+
+    Parameters
+    ----------
+    p_schedule : dict
+        Start power schedule of the EV (kW). Missing time steps are taken as
+        zero power.
+    opt_step : int
+        Size of one time step in the optimization (seconds).
+    opt_horizon : list of integers
+        Time step identifiers in the optimization horizon.
+    bcap : float
+        Battery capactiy of the EV (kWs).
+    inisoc : float
+        Initial SOC of the EV battery.
+    minsoc : float
+        Minimum allowed SOC.
+    maxsoc : float
+        Maximum allowed SOC.
+    pmax_pos : float
+        Maximum charge power that EV battery can withdraw (kW).
+    pmax_neg : float
+        Maximum discharge power that EV battery can supply (kW).
+    deptime : int
+        Number of time steps until departure of the EV.
+
+    Returns
+    -------
+    p_start : dict
+        Start power schedule (kW).
+    s_start : dict
+        Start SOC trajectory.
+
+    """
+
+    p_start = {}
+    s_start = {0: inisoc}
+    soc = inisoc
+    for t in opt_horizon[:-1]:
+
+        p = 0.0 if t >= deptime else p_schedule.get(t, 0.0)
+        p = min(max(p, -pmax_neg), pmax_pos)
+
+        # The SOC limits must not be violated by the start solution
+        soc_next = soc + p / bcap * opt_step
+        if soc_next > maxsoc:
+            p = max((maxsoc - soc) * bcap / opt_step, 0.0)
+        elif soc_next < minsoc:
+            p = min((minsoc - soc) * bcap / opt_step, 0.0)
+        soc = soc + p / bcap * opt_step
+
+        p_start[t] = p
+        s_start[t + 1] = soc
+
+    return p_start, s_start
+
+
+def set_ev_warmstart(
+    model,
+    p_schedule,
+    opt_step,
+    opt_horizon,
+    bcap,
+    inisoc,
+    tarsoc,
+    minsoc,
+    maxsoc,
+    pmax_pos,
+    pmax_neg,
+    deptime,
+):
+    """
+    This function enters a start solution to the EV variables of the MILP
+    rescheduling models (p_ev, p_ev_pos, p_ev_neg, x_ev, s, y indexed by EVs
+    and time steps). The start trajectories are derived by start_trajectory so
+    that they satisfy the constraints of the individual EVs. EVs without a
+    start schedule start with zero power.
+
+    Parameters
+    ----------
+    model : pyomo ConcreteModel
+        Rescheduling model.
+    p_schedule : dict
+        Start power schedules of the EVs (e.g., shifted previous schedules).
+    opt_step : int
+        Size of one time step in the optimization (seconds).
+    opt_horizon : list of integers
+        Time step identifiers in the optimization horizon.
+    bcap : dict of float
+        Battery capactiy of EVs (kWs).
+    inisoc : dict of float
+        Initial SOCs of EV batteries.
+    tarsoc : dict of float
+        Target SOCs of EVs.
+    minsoc : dict of float
+        Minimum allowed SOCs.
+    maxsoc : dict of float
+        Maximum allowed SOCs.
+    pmax_pos : dict of float
+        Maximum charge power that EV battery can withdraw (kW).
+    pmax_neg : dict of float
+        Maximum discharge power that EV battery can supply (kW).
+    deptime : dict of int
+        Number of time steps until departures of EVs.
+
+    Returns
+    -------
+    p_start : dict
+        Start power schedules of the EVs. They are used to calculate the start
+        values of the aggregate power variables of the models.
+
+    """
+
+    p_start = {}
+    last = max(opt_horizon)
+    for v in bcap.keys():
+        p_start[v], s_start = start_trajectory(
+            p_schedule.get(v, {}),
+            opt_step,
+            opt_horizon,
+            bcap[v],
+            inisoc[v],
+            minsoc[v],
+            maxsoc[v],
+            pmax_pos[v],
+            pmax_neg[v],
+            deptime[v],
+        )
+        for t, p in p_start[v].items():
+            model.p_ev[v, t].set_value(p)
+            model.p_ev_pos[v, t].set_value(max(p, 0.0))
+            model.p_ev_neg[v, t].set_value(max(-p, 0.0))
+            model.x_ev[v, t].set_value(1 if p > 0 else 0)
+        for t, soc in s_start.items():
+            model.s[v, t].set_value(soc)
+        model.y[v].set_value(abs(tarsoc[v] - s_start[last]))
+
+    return p_start
+
+
+def solve_model(solver, model, warmstart=False, statistics=None, time_limit=None):
+    """
+    This function solves an optimization model and measures the solution
+    process. The errors of the appsi interfaces for problems without a
+    feasible solution are raised as NoSolutionError.
+
+    Parameters
+    ----------
+    solver : pyomo SolverFactory object or PyomoSolver
+        Optimization solver.
+    model : pyomo ConcreteModel
+        Optimization model.
+    warmstart : bool, optional
+        If True, the current values of the variables are passed to the solver
+        as a start solution (if the solver supports it). The default is False.
+    statistics : dict, optional
+        Dictionary to enter the statistics of the solution process:
+            - Wall Time --> Duration of the solver call (seconds),
+            - Time To First Incumbent --> Time until the first feasible
+              solution has been found (seconds). It is measured for the appsi
+              HiGHS interface and None for other solvers,
+            - Warm Start --> Whether a start solution was passed,
+            - Warm Start Ignored --> Whether a start solution was requested
+              but the solver does not accept it,
+            - Termination Condition --> Termination condition of the solver,
+            - Gap --> Relative optimality gap of the solution (None if the
+              solver does not report the bounds).
+        The default is None.
+    time_limit : float, optional
+        Time limit of the solver (seconds). It is set in the configuration of
+        the appsi interfaces and passed as 'timelimit' to the other Pyomo
+        solvers. The default is None (no limit).
+
+    Returns
+    -------
+    result :
+        Results object of the solver.
+
+    """
+
+    kwargs = {}
+    if warmstart and solver.warm_start_capable():
+        kwargs["warmstart"] = True
+
+    interface = solver.solver if isinstance(solver, PyomoSolver) else solver
+
+    # The time limit applies to this solve only
+    previous_limit = None
+    if time_limit is not None:
+        if hasattr(interface, "config") and hasattr(interface.config, "time_limit"):
+            previous_limit = interface.config.time_limit
+            limit = time_limit
+            if previous_limit is not None:
+                limit = min(limit, previous_limit)
+            interface.config.time_limit = limit
+        else:
+            kwargs["timelimit"] = time_limit
+
+    # The first incumbent is observed by a callback of the HiGHS instance
+    highs = None
+    incumbent_times = []
+    if statistics is not None and isinstance(interface, PersistentSolver):
+        if getattr(interface, "_model", None) is not model:
+            interface.set_instance(model)
+        highs = getattr(interface, "_solver_model", None)
+        if not hasattr(highs, "cbMipImprovingSolution"):
+            highs = None
+
+    start = time.perf_counter()
+
+    def on_incumbent(event):
+        incumbent_times.append(time.perf_counter() - start)
+
+    if highs is not None:
+        highs.cbMipImprovingSolution.subscribe(on_incumbent)
+    try:
+        result = solver.solve(model, **kwargs)
+    except RuntimeError as error:
+        # The appsi interfaces cannot load a solution that was not found
+        if "feasible solution was not found" not in str(error):
+            raise
+        raise NoSolutionError(str(error)) from error
+    finally:
+        if highs is not None:
+            highs.cbMipImprovingSolution.unsubscribe(on_incumbent)
+        if time_limit is not None and "timelimit" not in kwargs:
+            interface.config.time_limit = previous_limit
+    wall_time = time.perf_counter() - start
+
+    if statistics is not None:
+        statistics["Wall Time"] = wall_time
+        statistics["Time To First Incumbent"] = (
+            incumbent_times[0] if len(incumbent_times) > 0 else None
+        )
+        statistics["Warm Start"] = "warmstart" in kwargs
+        statistics["Warm Start Ignored"] = warmstart and "warmstart" not in kwargs
+        statistics["Termination Condition"] = str(
+            result.solver.termination_condition
+        )
+        statistics["Gap"] = relative_gap(result)
+
+    return result
@@ -18,7 +18,10 @@
 # COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
 # OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
 
+import numpy as np
 import pandas as pd
+from datafev.data_handling.timeseries import StepSeries
+from datafev.data_handling.power_soc import query_power_limits
 
 
 class ChargingUnit(object):
@@ -55,12 +58,13 @@ class ChargingUnit(object):
         self.p_max_ds = p_max_ds
         self.eff = efficiency
 
+        self.cluster = None
         self.connected_ev = None
         self.connection_dataset = pd.DataFrame(
             columns=["EV ID", "Connection", "Disconnection"]
         )
-        self.supplied_power = pd.Series(dtype=float)
-        self.consumed_power = pd.Series(dtype=float)
+        self.supplied_power_record = StepSeries()
+        self.consumed_power_record = StepSeries()
 
         self.schedule_pow = {}
         self.schedule_soc = {}
@@ -89,6 +93,9 @@ class ChargingUnit(object):
         self.connection_dataset.loc[dataset_ind, "EV ID"] = ev.vehicle_id
         self.connection_dataset.loc[dataset_ind, "Connection"] = ts
 
+        if self.cluster is not None:
+            self.cluster.update_actual_schedule(self)
+
     def disconnect(self, ts):
         """
         This method disconnects the connected EV from the charger. It is called
@@ -109,6 +116,9 @@ class ChargingUnit(object):
         dataset_ind = max(self.connection_dataset.index)
         self.connection_dataset.loc[dataset_ind, "Disconnection"] = ts
 
+        if self.cluster is not None:
+            self.cluster.update_actual_schedule(self)
+
     def supply(self, ts, tdelta, p):
         """
         This method triggers 'charge' method of the connected EV. 
@@ -132,8 +142,42 @@ class ChargingUnit(object):
 
         """
         self.connected_ev.charge(ts, tdelta, p)
-        self.supplied_power[ts] = p
-        self.consumed_power[ts] = p / self.eff if p > 0 else p * self.eff
+        self.supplied_power_record[ts] = p
+        self.consumed_power_record[ts] = p / self.eff if p > 0 else p * self.eff
+
+    @property
+    def supplied_power(self):
+        """
+        Time indexed record of the power supplied to the connected EVs (kW).
+        The index is the regular grid from the first to the last supply: the
+        steps without supply (e.g., while no EV is connected) are NaN rows.
+        Supplies off the grid refine the grid. Use dropna() to obtain the
+        supplied steps only.
+
+        Returns
+        -------
+        pandas.Series
+            View on the supplied power record.
+
+        """
+        return self.supplied_power_record.to_series()
+
+    @property
+    def consumed_power(self):
+        """
+        Time indexed record of the power consumed from the grid (kW).
+        The index is the regular grid from the first to the last supply: the
+        steps without supply (e.g., while no EV is connected) are NaN rows.
+        Supplies off the grid refine the grid. Use dropna() to obtain the
+        supplied steps only.
+
+        Returns
+        -------
+        pandas.Series
+            View on the consumed power record.
+
+        """
+        return self.consumed_power_record.to_series()
 
     def set_schedule(self, ts, schedule_pow, schedule_soc):
         """
@@ -184,6 +228,9 @@ class ChargingUnit(object):
         """
         self.active_schedule_instance = ts
 
+        if self.cluster is not None:
+            self.cluster.update_actual_schedule(self)
+
     def uncontrolled_supply(self, ts, step):
         """
         This method is run to execute the uncontrolled charging behavior.
@@ -217,17 +264,13 @@ class ChargingUnit(object):
             # Limit due to the charger power capability
             lim_ch_pow = self.p_max_ch * step.seconds
 
-            if type(self.connected_ev.pow_soc_table) != type(None):
+            if self.connected_ev.pow_soc_curve is not None:
 
                 # The EV battery has a specific charger power-SOC dependency
                 # limiting the power transfer
-                table = self.connected_ev.pow_soc_table
-                soc_range = (
-                    table[(table["SOC_LB"] <= ev_soc) & (ev_soc < table["SOC_UB"])]
-                ).index[0]
+                p_max = self.connected_ev.pow_soc_curve.p_max(ev_soc)
 
                 # Limit due to the SOC dependency of charge power
-                p_max = table.loc[soc_range, "P_UB"]
                 lim_ev_socdep = p_max * step.seconds
                 e_max = min(lim_ev_batcap, lim_ch_pow, lim_ev_socdep)
 
@@ -279,3 +322,94 @@ class ChargingUnit(object):
             connections.loc[con_start:con_end, _id] = 1
         record = connections.sum(axis=1)
         return record
+
+
+def uncontrolled_supply(ts, step, chargers):
+    """
+    This function executes the uncontrolled charging behavior of multiple
+    chargers at once. The charge powers of all connected EVs are calculated
+    in a single vectorized pass, giving the same results as
+    'ChargingUnit.uncontrolled_supply'.
+
+    Parameters
+    ----------
+    ts : datetime.datetime
+        Current time.
+    step : datetime.timedelta
+        Length of time step.
+    chargers : list
+        ChargingUnit objects with connected EVs.
+
+    Returns
+    -------
+    None.
+
+    """
+
+    nb_of_cu = len(chargers)
+    if nb_of_cu == 0:
+        return
+
+    soc = np.empty(nb_of_cu)
+    bcap = np.empty(nb_of_cu)
+    p_max_ch = np.empty(nb_of_cu)
+    curves = []
+
+    for n, cu in enumerate(chargers):
+        ev = cu.connected_ev
+        soc[n] = ev.soc[ts]
+        bcap[n] = ev.bCapacity
+        p_max_ch[n] = cu.p_max_ch
+        curves.append(ev.pow_soc_curve if soc[n] < 1 else None)
+
+    # Limits of the EV batteries with specific charger power-SOC dependency
+    p_max_socdep = query_power_limits(curves, soc)
+
+    p_avr = uncontrolled_power(soc, bcap, p_max_ch, p_max_socdep, step)
+
+    # Execution of the uncontrolled behavior in the simulation
+    for n, cu in enumerate(chargers):
+        cu.supply(ts, step, float(p_avr[n]))
+
+
+def uncontrolled_power(soc, bcap, p_max_ch, p_max_socdep, step):
+    """
+    This function calculates the average charge powers of EVs charging with
+    max feasible power during a time step.
+
+    Parameters
+    ----------
+    soc : numpy.ndarray
+        Current SOCs of EVs.
+    bcap : numpy.ndarray
+        Battery capacities of EVs (kWs).
+    p_max_ch : numpy.ndarray
+        Maximum charge powers of the chargers (kW).
+    p_max_socdep : numpy.ndarray
+        SOC dependent power limits of the EV batteries (kW).
+        NaN for the EVs without power-SOC dependency.
+    step : datetime.timedelta
+        Length of time step.
+
+    Returns
+    -------
+    p_avr : numpy.ndarray
+        Average charge powers during the time step (kW).
+
+    """
+
+    seconds = step.seconds
+
+    # Limits due to the battery capacity and the charger power capability
+    e_max = np.minimum((1 - soc) * bcap, p_max_ch * seconds)
+
+    # Limits due to the SOC dependency of charge power
+    has_socdep = ~np.isnan(p_max_socdep)
+    e_max[has_socdep] = np.minimum(
+        e_max[has_socdep], p_max_socdep[has_socdep] * seconds
+    )
+
+    # EVs with full batteries do not charge
+    p_avr = np.where(soc < 1, e_max / seconds, 0.0)
+
+    return p_avr
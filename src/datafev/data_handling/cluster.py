@@ -22,7 +22,8 @@
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
-from datafev.data_handling.charger import ChargingUnit
+from datafev.data_handling.charger import ChargingUnit, uncontrolled_supply
+from datafev.data_handling.reservation import ReservationLedger, ReservationIndex
 
 
 class ChargerCluster(object):
@@ -76,23 +77,33 @@ class ChargerCluster(object):
             ]
         )
 
-        self.re_dataset = pd.DataFrame(
-            columns=[
-                "Active",
-                "EV ID",
-                "CU ID",
-                "Reserved At",
-                "From",
-                "Until",
-                "Cancelled At",
-                "Scheduled G2V",
-                "Scheduled V2G",
-                "Price",
-            ]
-        )
+        self.reservations = ReservationLedger()
+        self.reservation_index = ReservationIndex()
 
         self.chargers = {}
 
+        # Aggregate grid-side schedule of the connected EVs on a step grid
+        # (row per charger, column per step). The grid is learned from the
+        # first schedule entered; it is set to False if the schedules are not
+        # on a common grid.
+        self.schedule_grid = None
+        self.schedule_matrix = np.zeros((0, 0))
+        self.schedule_aggregate = np.zeros(0)
+        self.schedule_segments = {}
+
+        # Power held after the end of the schedule of a charger until the
+        # departure: (last scheduled step, held power, end of holding). It
+        # only applies to the queries that include the last scheduled step.
+        self.schedule_tails = {}
+
+        # Latest solution of the (MILP-based) charging control of the cluster.
+        # Used as the start solution of the next control step.
+        self.control_plan = None
+
+        # Number of calls of enter_power_limits. Plans made before the latest
+        # update of the limits are not applied by event-triggered control.
+        self.limit_updates = 0
+
         for _, i in topology_data.iterrows():
 
             cuID = i["cu_id"]
@@ -120,6 +131,25 @@ class ChargerCluster(object):
 
         self.power_installed += charging_unit.p_max_ch
         self.chargers[charging_unit.id] = charging_unit
+        self.reservation_index.add_cu(charging_unit.id)
+        self.schedule_matrix = np.vstack(
+            (self.schedule_matrix, np.zeros((1, self.schedule_matrix.shape[1])))
+        )
+        charging_unit.cluster = self
+
+    @property
+    def re_dataset(self):
+        """
+        Table of the reservations placed in the cluster. It is created from
+        the reservation ledger at each call and is therefore read-only.
+
+        Returns
+        -------
+        pandas.DataFrame
+            Table of reservations indexed by reservation identifiers.
+
+        """
+        return self.reservations.to_dataframe()
 
     def enter_power_limits(self, start, end, step, limits, tolerance=0):
         """
@@ -169,6 +199,7 @@ class ChargerCluster(object):
         self.upper_limit = upper.fillna(upper.fillna(method="ffill"))
         self.lower_limit = lower.fillna(lower.fillna(method="ffill"))
         self.violation_tolerance = tolerance
+        self.limit_updates += 1
 
     def reserve(self, ts, res_from, res_until, ev, cu, contract=None):
         """
@@ -202,20 +233,16 @@ class ChargerCluster(object):
 
         """
 
-        reservation_id = len(self.re_dataset) + 1
+        # TODO: Add check for overlap
+        reservation_id = self.reservations.append(
+            ev.vehicle_id, cu.id, ts, res_from, res_until
+        )
+        self.reservation_index.add(reservation_id, cu.id, res_from, res_until)
         ev.reservation_id = reservation_id
         ev.reserved_cluster = self
         ev.reserved_charger = cu
         cu.reserved_ev=ev
 
-        # TODO: Add check for overlap
-        self.re_dataset.loc[reservation_id, "Active"] = True
-        self.re_dataset.loc[reservation_id, "EV ID"] = ev.vehicle_id
-        self.re_dataset.loc[reservation_id, "CU ID"] = cu.id
-        self.re_dataset.loc[reservation_id, "Reserved At"] = ts
-        self.re_dataset.loc[reservation_id, "From"] = res_from
-        self.re_dataset.loc[reservation_id, "Until"] = res_until
-
         if contract != None:
 
             tdelta = contract["Resolution"]
@@ -229,8 +256,8 @@ class ChargerCluster(object):
                 scheduled_g2v = p_ref.sum() * tdelta / 3600
                 scheduled_v2g = -(p_ref[p_ref < 0].sum()) * tdelta / 3600
 
-                self.re_dataset.loc[reservation_id, "Scheduled G2V"] = scheduled_g2v
-                self.re_dataset.loc[reservation_id, "Scheduled V2G"] = scheduled_v2g
+                self.reservations.set(reservation_id, "Scheduled G2V", scheduled_g2v)
+                self.reservations.set(reservation_id, "Scheduled V2G", scheduled_v2g)
 
                 if contract["Payment"]:
 
@@ -243,8 +270,8 @@ class ChargerCluster(object):
                         ((p_ref[p_ref < 0] * pr_v2g[p_ref < 0]).sum()) * tdelta / 3600
                     )
 
-                    self.re_dataset.loc[reservation_id, "Price"] = (
-                        payment_for_g2v + payment_for_v2g
+                    self.reservations.set(
+                        reservation_id, "Price", payment_for_g2v + payment_for_v2g
                     )
 
     def unreserve(self, ts, reservation_id):
@@ -264,8 +291,8 @@ class ChargerCluster(object):
         None.
 
         """
-        self.re_dataset.loc[reservation_id, "Cancelled At"] = ts
-        self.re_dataset.loc[reservation_id, "Active"] = False
+        self.reservations.cancel(reservation_id, ts)
+        self.reservation_index.remove(reservation_id)
 
     def uncontrolled_supply(self, ts, step):
         """
@@ -283,9 +310,19 @@ class ChargerCluster(object):
         None.
         """
 
-        for cu_id, cu in self.chargers.items():
-            if cu.connected_ev != None:
-                cu.uncontrolled_supply(ts, step)
+        uncontrolled_supply(ts, step, self.connected_chargers())
+
+    def connected_chargers(self):
+        """
+        This method returns the chargers that have connected EVs.
+
+        Returns
+        -------
+        list
+            ChargingUnit objects with connected EVs.
+
+        """
+        return [cu for cu in self.chargers.values() if cu.connected_ev is not None]
 
     def enter_data_of_incoming_vehicle(self, ts, ev, cu):
         """
@@ -318,7 +355,7 @@ class ChargerCluster(object):
         self.cc_dataset.loc[cc_dataset_id, "Connected CU"] = cu.id
         self.cc_dataset.loc[cc_dataset_id, "Reservation ID"] = ev.reservation_id
 
-        reservation = self.re_dataset.loc[ev.reservation_id]
+        reservation = self.reservations.record(ev.reservation_id)
         self.cc_dataset.loc[cc_dataset_id, "Scheduled G2V [kWh]"] = (
             reservation["Scheduled G2V"]
             if pd.notna(reservation["Scheduled G2V"])
@@ -355,7 +392,7 @@ class ChargerCluster(object):
             (ev.soc[ts] - ev.soc_arr_real) * ev.bCapacity / 3600
         )
 
-        ev_v2x_ = pd.Series(ev.v2g)
+        ev_v2x_ = ev.v2g.to_series()
         resolution = ev_v2x_.index[1] - ev_v2x_.index[0]
         ev_v2x = ev_v2x_[ev.t_arr_real : ev.t_dep_real - resolution]
         self.cc_dataset.loc[ev.cc_dataset_id, "Total V2G [kWh]"] = (
@@ -392,6 +429,45 @@ class ChargerCluster(object):
         """
 
         time_index = pd.date_range(start=start, end=end, freq=step)
+
+        if self.schedule_grid is None:
+            # No schedule has been entered for the connected EVs
+            return pd.Series(0.0, index=time_index)
+
+        if self.schedule_grid is False:
+            grid_step, offset = None, True
+        else:
+            grid_start, grid_step = self.schedule_grid
+            first_step, offset = divmod(start - grid_start, grid_step)
+
+        if grid_step == step and not offset:
+            # The queried period is aligned with the grid of the aggregate
+            end_step = first_step + len(time_index)
+            lo = max(first_step, 0)
+            hi = min(end_step, len(self.schedule_aggregate))
+
+            # The powers held after the end of a schedule apply if the period
+            # includes the last scheduled step (forward filling of the period)
+            tails = [
+                (self.reservation_index.cu_position[cu_id], last, power, until)
+                for cu_id, (last, power, until) in self.schedule_tails.items()
+                if first_step <= last and last + 1 < min(until, hi)
+            ]
+            if len(tails) > 0:
+                window = self.schedule_matrix[:, lo:hi].copy()
+                for row, last, power, until in tails:
+                    window[row, last + 1 - lo : until - lo] = power
+                aggregate = window.sum(axis=0)
+            else:
+                aggregate = self.schedule_aggregate[lo:hi]
+
+            cc_sch = np.zeros(len(time_index))
+            if lo < hi:
+                cc_sch[lo - first_step : hi - first_step] = aggregate
+            return pd.Series(cc_sch, index=time_index)
+
+        # Queries that are not aligned with the grid of the aggregate are
+        # answered from the schedules of the chargers
         cu_sch_df = pd.DataFrame(index=time_index,columns=self.chargers.keys())
 
         for cu in self.chargers.values():
@@ -419,6 +495,137 @@ class ChargerCluster(object):
 
         return cc_sch
 
+    def update_actual_schedule(self, cu):
+        """
+        This method updates the aggregate schedule of the cluster after the
+        active schedule or the connection status of a charger has changed.
+        It is called by the charging units of the cluster.
+
+        The grid-side schedule of a charger is its active power schedule
+        scaled by the charger efficiency until the estimated departure of the
+        connected EV. As in the forward filling of query_actual_schedule, the
+        last scheduled power is held until the departure only in the queries
+        that include the last scheduled step; it is stored separately as the
+        tail of the schedule. Chargers without connected EV do not contribute.
+
+        Parameters
+        ----------
+        cu : ChargingUnit
+            Charging unit whose schedule or connection has changed.
+
+        Returns
+        -------
+        None.
+
+        """
+
+        if self.schedule_grid is False:
+            # The schedules are not on a common grid
+            return
+
+        row = self.reservation_index.cu_position[cu.id]
+        updated = []
+
+        # Remove the previous contribution of the charger
+        if cu.id in self.schedule_segments:
+            lo, hi = self.schedule_segments.pop(cu.id)
+            self.schedule_matrix[row, lo:hi] = 0.0
+            updated.append((lo, hi))
+        self.schedule_tails.pop(cu.id, None)
+
+        ev = cu.connected_ev
+        sch_inst = getattr(cu, "active_schedule_instance", None)
+
+        if ev is not None and sch_inst is not None:
+
+            cu_sch = cu.schedule_pow[sch_inst].dropna()
+
+            if len(cu_sch) > 0:
+
+                if self.schedule_grid is None:
+                    grid_step = (
+                        cu_sch.index[1] - cu_sch.index[0]
+                        if len(cu_sch) > 1
+                        else ev.t_dep_est - cu_sch.index[0]
+                    )
+                    self.schedule_grid = (cu_sch.index[0], grid_step)
+
+                grid_start, grid_step = self.schedule_grid
+                first_step, offset = divmod(cu_sch.index[0] - grid_start, grid_step)
+                dep_step = (ev.t_dep_est - grid_start) // grid_step
+                last_step = min(first_step + len(cu_sch) - 1, dep_step)
+
+                if offset or (cu_sch.index[1:] - cu_sch.index[:-1] != grid_step).any():
+                    # The schedule is not on the grid of the aggregate
+                    self.schedule_grid = False
+                    return
+
+                if last_step >= first_step:
+
+                    cu_pow = cu_sch.to_numpy(dtype=float)[: last_step - first_step + 1]
+                    cu_pow = np.where(
+                        cu_pow > 0,
+                        cu_pow / cu.eff,
+                        np.where(cu_pow < 0, cu_pow * cu.eff, cu_pow),
+                    )
+
+                    lo, hi = self._extend_schedule_grid(
+                        first_step, max(last_step, dep_step) + 1
+                    )
+                    hi = lo + len(cu_pow)
+                    self.schedule_matrix[row, lo:hi] = cu_pow
+                    self.schedule_segments[cu.id] = (lo, hi)
+                    updated.append((lo, hi))
+
+                    if dep_step > last_step:
+                        # Last power held until departure (forward filling)
+                        self.schedule_tails[cu.id] = (
+                            hi - 1,
+                            cu_pow[-1],
+                            hi + dep_step - last_step,
+                        )
+
+        # Aggregate the updated steps
+        for lo, hi in updated:
+            self.schedule_aggregate[lo:hi] = self.schedule_matrix[:, lo:hi].sum(
+                axis=0
+            )
+
+    def _extend_schedule_grid(self, first_step, end_step):
+        # Extends the schedule grid so that it includes the given steps and
+        # returns their positions in the matrix
+        nb_of_cu, nb_of_steps = self.schedule_matrix.shape
+
+        if first_step < 0:
+            shift = -first_step
+            self.schedule_matrix = np.hstack(
+                (np.zeros((nb_of_cu, shift)), self.schedule_matrix)
+            )
+            self.schedule_aggregate = np.concatenate(
+                (np.zeros(shift), self.schedule_aggregate)
+            )
+            grid_start, grid_step = self.schedule_grid
+            self.schedule_grid = (grid_start - shift * grid_step, grid_step)
+            for cu_id, (lo, hi) in self.schedule_segments.items():
+                self.schedule_segments[cu_id] = (lo + shift, hi + shift)
+            for cu_id, (last, power, until) in self.schedule_tails.items():
+                self.schedule_tails[cu_id] = (last + shift, power, until + shift)
+            first_step, end_step = first_step + shift, end_step + shift
+            nb_of_steps += shift
+
+        if end_step > nb_of_steps:
+            capacity = max(nb_of_steps, 1)
+            while capacity < end_step:
+                capacity *= 2
+            self.schedule_matrix = np.hstack(
+                (self.schedule_matrix, np.zeros((nb_of_cu, capacity - nb_of_steps)))
+            )
+            self.schedule_aggregate = np.concatenate(
+                (self.schedule_aggregate, np.zeros(capacity - nb_of_steps))
+            )
+
+        return first_step, end_step
+
     def query_actual_occupation(self, ts):
         """
         This function identifies currently occupied chargers. It  is usually
@@ -468,54 +675,52 @@ class ChargerCluster(object):
             eff --> power conversion efficiency of the charger.
 
         """
-        available_chargers = pd.DataFrame(
-            columns=["max p_ch", "max p_ds", "eff"], dtype=np.float16
-        )
-        all_active_reservations = self.re_dataset[
-            self.re_dataset["Active"] == True
-        ]  # Reservations that are not cancelled
+        is_available = self.reservation_index.available(start, end, step)
+        available_cus = [
+            self.chargers[cu_id]
+            for cu_id, free in zip(self.reservation_index.cu_ids, is_available)
+            if free
+        ]
+
+        if len(available_cus) == 0:
+            available_chargers = pd.DataFrame(
+                columns=["max p_ch", "max p_ds", "eff"], dtype=np.float16
+            )
+        else:
+            available_chargers = pd.DataFrame(
+                {
+                    "max p_ch": [cu.p_max_ch for cu in available_cus],
+                    "max p_ds": [cu.p_max_ds for cu in available_cus],
+                    "eff": [cu.eff for cu in available_cus],
+                },
+                index=[cu.id for cu in available_cus],
+            )
 
-        for cu in self.chargers.values():
-
-            active_reservations = all_active_reservations[
-                all_active_reservations["CU ID"] == cu.id
-            ]
-            period = pd.date_range(start=start, end=end, freq=step)
-
-            if len(active_reservations) == 0:
-                cu_availability_series = pd.Series(True, index=period)
-            else:
-
-                start_of_first_reservation = active_reservations["From"].min()
-                end_of_last_reservation = active_reservations["Until"].max()
-
-                index_set = pd.date_range(
-                    start=min(start, start_of_first_reservation),
-                    end=max(end, end_of_last_reservation),
-                    freq=step,
-                )
-
-                test_per_reservation = pd.DataFrame(index=index_set)
-                test_per_reservation.loc[:, :] = True
+        return available_chargers
 
-                for res in active_reservations.index:
-                    res_start = self.re_dataset.loc[res, "From"]
-                    res_until = self.re_dataset.loc[res, "Until"]
-                    test_per_reservation.loc[res_start : res_until - step, step] = False
+    def query_charger_availability(self, cu_id, start, end, step):
+        """
+        This function checks whether a particular charger is available for a
+        specific period.
 
-                cu_availability_series = (test_per_reservation.all(axis="columns")).loc[
-                    period
-                ]
+        Parameters
+        ----------
+        cu_id : str
+            String identifier of the charger.
+        start : datetime.datetime
+            Start of queried period.
+        end : datetime.datetime
+            End of queried period.
+        step : datetime.timedelta
+            Time resolution in the queried period.
 
-            is_cu_available = cu_availability_series.all()
-            if is_cu_available == True:
-                available_chargers.loc[cu.id] = {
-                    "max p_ch": cu.p_max_ch,
-                    "max p_ds": cu.p_max_ds,
-                    "eff": cu.eff,
-                }
+        Returns
+        -------
+        bool
+            True if the charger has no active reservation in the period.
 
-        return available_chargers
+        """
+        return self.reservation_index.is_available(cu_id, start, end, step)
 
     def analyze_consumption_profile(self, start, end, step):
         """
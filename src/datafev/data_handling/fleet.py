@@ -20,6 +20,9 @@
 
 
 from datafev.data_handling.vehicle import ElectricVehicle
+from datafev.data_handling.timeseries import StepSeries
+from datafev.data_handling.power_soc import compile_power_soc_tables
+import numpy as np
 import pandas as pd
 
 
@@ -57,28 +60,91 @@ class EVFleet(object):
         self.outgoing_at = dict([(t, []) for t in sim_horizon])
         self.outgoing_at[None] = []
 
+        ##################################################################################################
+        # Allocate the fleet-wide state table
+        # Each EV owns a contiguous segment of the table that covers the time
+        # steps from its arrival until its departure (or the end of the horizon)
+        horizon = pd.DatetimeIndex(sim_horizon)
+        self.resolution = None
+        if len(horizon) > 1 and (horizon[1:] - horizon[:-1]).nunique() == 1:
+            self.resolution = (horizon[1] - horizon[0]).to_pytimedelta()
+
+        if self.resolution is not None:
+            horizon_end = horizon[-1] + self.resolution
+            arrivals = pd.to_datetime(behavior["Real Arrival Time"])
+            departures = pd.to_datetime(behavior["Real Departure Time"])
+            departures = departures.fillna(horizon_end).clip(upper=horizon_end)
+            lengths = ((departures - arrivals) // self.resolution + 1).fillna(0)
+            lengths = lengths.clip(lower=0).astype(int).to_numpy()
+        else:
+            lengths = np.zeros(len(behavior), dtype=int)
+        offsets = np.concatenate(([0], np.cumsum(lengths)))
+
+        self.soc_table = np.full(offsets[-1], np.nan)
+        self.g2v_table = np.full(offsets[-1], np.nan)
+        self.v2g_table = np.full(offsets[-1], np.nan)
+        self.state_segments = {}
+        ##################################################################################################
+
         ##################################################################################################
         # Define behavior
-        for _, i in behavior.iterrows():
+        # The behavior data is read column-wise instead of row by row
+        columns = {
+            "ev_id": behavior["ev_id"].tolist(),
+            "bcap": behavior["Battery Capacity (kWh)"].tolist(),
+            "p_max_ch": behavior["p_max_ch (kW)"].tolist(),
+            "p_max_ds": behavior["p_max_ds (kW)"].tolist(),
+            "t_res": behavior["Reservation Time"].tolist(),
+            "t_arr_est": behavior["Estimated Arrival Time"].tolist(),
+            "t_dep_est": behavior["Estimated Departure Time"].tolist(),
+            "soc_arr_est": behavior["Estimated Arrival SOC"].tolist(),
+            "soc_tar_at_t_dep_est": behavior[
+                "Target SOC @ Estimated Departure Time"
+            ].tolist(),
+            "v2g_allow": (behavior["V2G Allowance (kWh)"] * 3600).tolist(),
+            "t_arr_real": behavior["Real Arrival Time"].tolist(),
+            "soc_arr_real": behavior["Real Arrival SOC"].tolist(),
+            "t_dep_real": behavior["Real Departure Time"].tolist(),
+            "cluster_target": behavior["Target Cluster"].tolist(),
+        }
+
+        for row in range(len(behavior)):
 
             # Initialization of an EV object
-            evID = i["ev_id"]
-            bcap = i["Battery Capacity (kWh)"]
-            p_max_ch = i["p_max_ch (kW)"]
-            p_max_ds = i["p_max_ds (kW)"]
-            ev = ElectricVehicle(evID, bcap, p_max_ch, p_max_ds)
+            evID = columns["ev_id"][row]
+            ev = ElectricVehicle(
+                evID,
+                columns["bcap"][row],
+                columns["p_max_ch"][row],
+                columns["p_max_ds"][row],
+            )
 
             # Assigning the scenario parameters
-            ev.t_res = i["Reservation Time"]
-            ev.t_arr_est = i["Estimated Arrival Time"]
-            ev.t_dep_est = i["Estimated Departure Time"]
-            ev.soc_arr_est = i["Estimated Arrival SOC"]
-            ev.soc_tar_at_t_dep_est = i["Target SOC @ Estimated Departure Time"]
-            ev.v2g_allow = i["V2G Allowance (kWh)"] * 3600
-            ev.t_arr_real = i["Real Arrival Time"]
-            ev.soc_arr_real = i["Real Arrival SOC"]
-            ev.t_dep_real = i["Real Departure Time"]
-            ev.cluster_target = i["Target Cluster"]
+            ev.t_res = columns["t_res"][row]
+            ev.t_arr_est = columns["t_arr_est"][row]
+            ev.t_dep_est = columns["t_dep_est"][row]
+            ev.soc_arr_est = columns["soc_arr_est"][row]
+            ev.soc_tar_at_t_dep_est = columns["soc_tar_at_t_dep_est"][row]
+            ev.v2g_allow = columns["v2g_allow"][row]
+            ev.t_arr_real = columns["t_arr_real"][row]
+            ev.soc_arr_real = columns["soc_arr_real"][row]
+            ev.t_dep_real = columns["t_dep_real"][row]
+            ev.cluster_target = columns["cluster_target"][row]
+
+            if lengths[row] > 0:
+                segment = slice(offsets[row], offsets[row + 1])
+                start = ev.t_arr_real.to_pydatetime()
+                ev.soc = StepSeries(
+                    start, self.resolution, buffer=self.soc_table[segment]
+                )
+                ev.g2v = StepSeries(
+                    start, self.resolution, buffer=self.g2v_table[segment]
+                )
+                ev.v2g = StepSeries(
+                    start, self.resolution, buffer=self.v2g_table[segment]
+                )
+                self.state_segments[evID] = segment
+
             ev.soc[ev.t_arr_real] = ev.soc_arr_real
 
             self.objects[evID] = ev
@@ -98,14 +164,24 @@ class EVFleet(object):
 
         ##################################################################################################
         # Calculate statistics
-        self.presence_distribution = {}
-        for t in sim_horizon:
-            self.presence_distribution[t] = len(
-                behavior[
-                    (behavior["Real Arrival Time"] <= t)
-                    & (behavior["Real Departure Time"] > t)
-                ]
-            )
+        # Sweep line over the sorted arrival and departure times: an EV is present at t if it has
+        # arrived until t (arrival <= t) and has not departed until t (departure > t)
+        arrivals = pd.to_datetime(behavior["Real Arrival Time"])
+        departures = pd.to_datetime(behavior["Real Departure Time"])
+        valid = (arrivals.notna() & departures.notna()).to_numpy()
+        arr_ns = arrivals.to_numpy(dtype="datetime64[ns]")[valid].astype(np.int64)
+        dep_ns = departures.to_numpy(dtype="datetime64[ns]")[valid].astype(np.int64)
+        arr_sorted = np.sort(arr_ns)
+        end_sorted = np.sort(np.maximum(arr_ns, dep_ns))
+
+        t_ns = horizon.to_numpy(dtype="datetime64[ns]").astype(np.int64)
+        nb_of_present = np.searchsorted(
+            arr_sorted, t_ns, side="right"
+        ) - np.searchsorted(end_sorted, t_ns, side="right")
+
+        self.presence_distribution = dict(
+            zip(list(sim_horizon), nb_of_present.tolist())
+        )
         ##################################################################################################
 
     def enter_power_soc_table(self, table):
@@ -113,6 +189,7 @@ class EVFleet(object):
         In practice, power that can be handled (withdrawn/injected) by EV 
         batteries change by SOC. This method is called to enter SOC dependency 
         data of the EVs in the scenario. SOC dependency is defined in a table.
+        The table is compiled once; EVs with identical data share a curve.
 
         Parameters
         ----------
@@ -129,8 +206,9 @@ class EVFleet(object):
         None.
 
         """
+        curves = compile_power_soc_tables(table, list(self.objects.keys()))
         for ev_id, ev in self.objects.items():
-            ev.pow_soc_table = table.loc[ev_id].copy()
+            ev.pow_soc_curve = curves[ev_id]
 
     def reserving_vehicles_at(self, ts):
         """
@@ -221,9 +299,9 @@ class EVFleet(object):
 
                 ev = self.objects[ev_id]
 
-                soc.loc[:, ev_id] = pd.Series(ev.soc, dtype="float64")
-                g2v.loc[:, ev_id] = pd.Series(ev.g2v, dtype="float64")
-                v2g.loc[:, ev_id] = pd.Series(ev.v2g, dtype="float64")
+                soc.loc[:, ev_id] = ev.soc.to_series()
+                g2v.loc[:, ev_id] = ev.g2v.to_series()
+                v2g.loc[:, ev_id] = ev.v2g.to_series()
                 status[ev_id] = ev.admitted
 
             soc.to_excel(writer, sheet_name="SOC Trajectory")
@@ -23,6 +23,7 @@ from itertools import product
 import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
+from datafev.data_handling.charger import uncontrolled_supply
 
 
 class MultiClusterSystem(object):
@@ -51,6 +52,14 @@ class MultiClusterSystem(object):
         self.id = system_id
         self.clusters = {}
 
+        # Latest solution of the centralized (MILP-based) charging control.
+        # Used as the start solution of the next control step.
+        self.control_plan = None
+
+        # Number of calls of enter_power_limits. Plans made before the latest
+        # update of the limits are not applied by event-triggered control.
+        self.limit_updates = 0
+
     def add_cc(self, cluster):
         """
         This method is run at initialization of the multicluster system object.
@@ -136,6 +145,7 @@ class MultiClusterSystem(object):
         lower = capacity_lb.reindex(timerange)
         self.upper_limit = upper.fillna(upper.fillna(method="ffill"))
         self.lower_limit = lower.fillna(lower.fillna(method="ffill"))
+        self.limit_updates += 1
 
     def query_actual_schedules(self, ts, t_delta, horizon):
         """
@@ -246,8 +256,10 @@ class MultiClusterSystem(object):
         None.
         """
 
+        chargers = []
         for cc_id, cc in self.clusters.items():
-            cc.uncontrolled_supply(ts, step)
+            chargers.extend(cc.connected_chargers())
+        uncontrolled_supply(ts, step, chargers)
 
     def export_results_to_excel(self, start, end, step, xlfile):
         """
@@ -0,0 +1,246 @@
+# The datafev framework
+
+# Copyright (C) 2022,
+# Institute for Automation of Complex Power Systems (ACS),
+# E.ON Energy Research Center (E.ON ERC),
+# RWTH Aachen University
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+# documentation files (the "Software"), to deal in the Software without restriction, including without limitation the
+# rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit
+# persons to whom the Software is furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of the
+# Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE
+# WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+# COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+# OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+import numpy as np
+import pandas as pd
+
+
+class PowerSOCCurve(object):
+    """
+    Compiled SOC dependency of the power capability of an EV battery.
+    The SOC ranges of a power-SOC table are stored in sorted breakpoint
+    arrays so that the range of an SOC value is found by binary search.
+    """
+
+    def __init__(self, table):
+        """
+        Curves are compiled from power-SOC tables.
+
+        Parameters
+        ----------
+        table : pandas.DataFrame
+            SOC dependency data of a single EV with the following columns:
+                - index --> Identifier of the SOC range,
+                - SOC_LB --> Lower bound of a particular SOC range,
+                - SOC_UB --> Upper bound of a particular SOC range,
+                - P_LB --> Lower bound of power capability in a particular SOC range,
+                - P_UB --> Upper bound of power capability in a particular SOC range.
+            The SOC ranges [SOC_LB, SOC_UB) must not overlap.
+
+        Returns
+        -------
+        None.
+
+        """
+
+        self.table = table
+
+        sorted_table = table.sort_values("SOC_LB", kind="mergesort")
+        self.ranges = sorted_table.index.to_numpy()
+        self.soc_lb = sorted_table["SOC_LB"].to_numpy(dtype=float)
+        self.soc_ub = sorted_table["SOC_UB"].to_numpy(dtype=float)
+        self.p_ub = sorted_table["P_UB"].to_numpy(dtype=float)
+        self.p_lb = (
+            sorted_table["P_LB"].to_numpy(dtype=float)
+            if "P_LB" in sorted_table
+            else np.zeros(len(sorted_table))
+        )
+
+        if (self.soc_lb[1:] < self.soc_ub[:-1]).any():
+            raise ValueError("SOC ranges of the power-SOC table overlap")
+
+        # Cumulative time-to-SOC tables per charger rating (see time_table)
+        self._time_tables = {}
+
+    def locate(self, soc):
+        """
+        This method identifies the SOC ranges of the given SOC values.
+
+        Parameters
+        ----------
+        soc : float or numpy.ndarray
+            SOC values.
+
+        Returns
+        -------
+        pos : int or numpy.ndarray
+            Positions of the SOC ranges in the sorted breakpoint arrays.
+
+        """
+
+        soc_arr = np.asarray(soc, dtype=float)
+        pos = np.searchsorted(self.soc_lb, soc_arr, side="right") - 1
+        if ((pos < 0) | (soc_arr >= self.soc_ub[np.maximum(pos, 0)])).any():
+            raise ValueError("SOC value outside the ranges of the power-SOC table")
+        return pos
+
+    def p_max(self, soc):
+        """
+        This method returns the power capability limits (P_UB) at the given
+        SOC values.
+
+        Parameters
+        ----------
+        soc : float or numpy.ndarray
+            SOC values.
+
+        Returns
+        -------
+        float or numpy.ndarray
+            Maximum charge powers (kW).
+
+        """
+        return self.p_ub[self.locate(soc)]
+
+    def time_table(self, p_chmax):
+        """
+        This method returns the cumulative time-to-SOC table of the curve for
+        a charger rating. Tables are computed once per rating.
+
+        Parameters
+        ----------
+        p_chmax : float
+            Maximum charge power of the charger-EV pair (kW).
+
+        Returns
+        -------
+        p_feasible : numpy.ndarray
+            Maximum feasible charge power in each SOC range (kW).
+        cum_time : numpy.ndarray
+            Minimum time (seconds per kWs of battery capacity) to charge from
+            the lower bound of the first SOC range to the lower bound of each
+            range. The last item refers to the upper bound of the last range.
+
+        """
+
+        p_chmax = float(p_chmax)
+        if p_chmax not in self._time_tables:
+            p_feasible = np.minimum(self.p_ub, p_chmax)
+            time_in_range = (self.soc_ub - self.soc_lb) / p_feasible
+            cum_time = np.concatenate(([0.0], np.cumsum(time_in_range)))
+            self._time_tables[p_chmax] = (p_feasible, cum_time)
+        return self._time_tables[p_chmax]
+
+    def min_charge_time(self, soc_from, soc_to, bcap, p_chmax):
+        """
+        This method calculates the minimum time required to charge EV
+        batteries from given SOC values to higher target SOC values.
+
+        Parameters
+        ----------
+        soc_from : float or numpy.ndarray
+            Initial SOC values.
+        soc_to : float or numpy.ndarray
+            Target SOC values (not smaller than the initial SOC values).
+        bcap : float or numpy.ndarray
+            Battery capacities (kWs).
+        p_chmax : float
+            Maximum charge power of the charger-EV pair (kW).
+
+        Returns
+        -------
+        float or numpy.ndarray
+            Minimum charging times (seconds).
+
+        """
+
+        p_feasible, cum_time = self.time_table(p_chmax)
+        soc_from = np.asarray(soc_from, dtype=float)
+        soc_to = np.asarray(soc_to, dtype=float)
+        I = self.locate(soc_from)
+        F = self.locate(soc_to)
+
+        # Within the initial range, the ranges in between and the target range
+        t_same = (soc_to - soc_from) * bcap / p_feasible[I]
+        t_first = (self.soc_ub[I] - soc_from) * bcap / p_feasible[I]
+        t_between = (cum_time[F] - cum_time[np.minimum(I + 1, F)]) * bcap
+        t_last = (soc_to - self.soc_lb[F]) * bcap / p_feasible[F]
+
+        return np.where(I == F, t_same, t_first + t_between + t_last)
+
+
+def compile_power_soc_tables(table, vehicle_ids):
+    """
+    This function compiles the SOC dependency data of a fleet. Vehicles with
+    identical curves share a single PowerSOCCurve object.
+
+    Parameters
+    ----------
+    table : pandas.DataFrame
+        SOC dependency data of all EVs. The first index level is the EV
+        identifier and the second level is the identifier of the SOC range.
+    vehicle_ids : list
+        Identifiers of the EVs whose curves are compiled.
+
+    Returns
+    -------
+    curves : dict
+        PowerSOCCurve objects of the EVs (keys are the EV identifiers).
+
+    """
+
+    compiled = {}
+    curves = {}
+    for ev_id in vehicle_ids:
+        ev_table = table.loc[ev_id]
+        key = (
+            tuple(ev_table.columns),
+            pd.util.hash_pandas_object(ev_table).to_numpy().tobytes(),
+        )
+        if key not in compiled:
+            compiled[key] = PowerSOCCurve(ev_table)
+        curves[ev_id] = compiled[key]
+    return curves
+
+
+def query_power_limits(curves, soc):
+    """
+    This function returns the SOC dependent power limits of multiple EVs.
+    The EVs are grouped by their curves so that each distinct curve is
+    queried once.
+
+    Parameters
+    ----------
+    curves : list
+        PowerSOCCurve objects of the EVs (None for EVs without SOC
+        dependency).
+    soc : numpy.ndarray
+        SOC values of the EVs.
+
+    Returns
+    -------
+    p_max : numpy.ndarray
+        Maximum charge powers (kW). NaN for EVs without SOC dependency.
+
+    """
+
+    soc = np.asarray(soc, dtype=float)
+    p_max = np.full(len(soc), np.nan)
+
+    groups = {}
+    for n, curve in enumerate(curves):
+        if curve is not None:
+            groups.setdefault(id(curve), (curve, []))[1].append(n)
+
+    for curve, members in groups.values():
+        members = np.array(members)
+        p_max[members] = curve.p_max(soc[members])
+
+    return p_max
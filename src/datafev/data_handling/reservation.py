@@ -0,0 +1,423 @@
+# The datafev framework
+
+# Copyright (C) 2022,
+# Institute for Automation of Complex Power Systems (ACS),
+# E.ON Energy Research Center (E.ON ERC),
+# RWTH Aachen University
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+# documentation files (the "Software"), to deal in the Software without restriction, including without limitation the
+# rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit
+# persons to whom the Software is furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of the
+# Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE
+# WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+# COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+# OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+from bisect import bisect_right
+import numpy as np
+import pandas as pd
+
+
+class ReservationLedger(object):
+    """
+    Append-only record of the reservations placed in a charger cluster.
+    The reservation data is kept in column lists and is converted to a
+    DataFrame only when it is exported.
+    """
+
+    # Column names and the dtypes used when exporting the ledger
+    columns = {
+        "Active": bool,
+        "EV ID": object,
+        "CU ID": object,
+        "Reserved At": "datetime64[ns]",
+        "From": "datetime64[ns]",
+        "Until": "datetime64[ns]",
+        "Cancelled At": "datetime64[ns]",
+        "Scheduled G2V": float,
+        "Scheduled V2G": float,
+        "Price": float,
+    }
+
+    def __init__(self):
+        """
+        Ledgers are initialized empty.
+
+        Returns
+        -------
+        None.
+
+        """
+
+        self.data = dict([(col, []) for col in self.columns])
+
+    def __len__(self):
+        return len(self.data["Active"])
+
+    def append(self, ev_id, cu_id, reserved_at, res_from, res_until):
+        """
+        This method adds a new active reservation to the ledger.
+
+        Parameters
+        ----------
+        ev_id : str
+            Identifier of the reserving EV.
+        cu_id : str
+            Identifier of the reserved charger.
+        reserved_at : datetime.datetime
+            Time at which the reservation is placed.
+        res_from : datetime.datetime
+            Start of the reservation period.
+        res_until : datetime.datetime
+            End of the reservation period.
+
+        Returns
+        -------
+        reservation_id : int
+            Identifier of the reservation (starting from 1).
+
+        """
+
+        entries = {
+            "Active": True,
+            "EV ID": ev_id,
+            "CU ID": cu_id,
+            "Reserved At": reserved_at,
+            "From": res_from,
+            "Until": res_until,
+        }
+        for col, values in self.data.items():
+            values.append(entries.get(col))
+
+        reservation_id = len(self)
+        return reservation_id
+
+    def cancel(self, reservation_id, ts):
+        """
+        This method marks a reservation as cancelled.
+
+        Parameters
+        ----------
+        reservation_id : int
+            Identifier of the reservation.
+        ts : datetime.datetime
+            Cancellation time.
+
+        Returns
+        -------
+        None.
+
+        """
+        self.data["Active"][reservation_id - 1] = False
+        self.data["Cancelled At"][reservation_id - 1] = ts
+
+    def set(self, reservation_id, col, value):
+        """
+        This method enters a value to a particular field of a reservation.
+
+        Parameters
+        ----------
+        reservation_id : int
+            Identifier of the reservation.
+        col : str
+            Name of the field (one of ReservationLedger.columns).
+        value :
+            Value to be entered.
+
+        Returns
+        -------
+        None.
+
+        """
+        self.data[col][reservation_id - 1] = value
+
+    def get(self, reservation_id, col):
+        """
+        This method returns the value of a particular field of a reservation.
+
+        Parameters
+        ----------
+        reservation_id : int
+            Identifier of the reservation.
+        col : str
+            Name of the field (one of ReservationLedger.columns).
+
+        Returns
+        -------
+        value :
+            Value of the field (None if it has not been entered).
+
+        """
+        return self.data[col][reservation_id - 1]
+
+    def record(self, reservation_id):
+        """
+        This method returns all fields of a reservation.
+
+        Parameters
+        ----------
+        reservation_id : int
+            Identifier of the reservation.
+
+        Returns
+        -------
+        dict
+            Field names as keys and entered values as values.
+
+        """
+        return dict(
+            [(col, values[reservation_id - 1]) for col, values in self.data.items()]
+        )
+
+    def active_reservations(self):
+        """
+        This method returns the identifiers of the reservations that have
+        not been cancelled.
+
+        Returns
+        -------
+        list
+            Identifiers of the active reservations.
+
+        """
+        return [
+            pos + 1 for pos, active in enumerate(self.data["Active"]) if active
+        ]
+
+    def to_dataframe(self):
+        """
+        This method converts the ledger to a DataFrame.
+
+        Returns
+        -------
+        df : pandas.DataFrame
+            Table of reservations indexed by reservation identifiers.
+
+        """
+
+        index = pd.RangeIndex(1, len(self) + 1)
+        df = pd.DataFrame(index=index)
+        for col, dtype in self.columns.items():
+            values = self.data[col]
+            if dtype == float:
+                values = [np.nan if v is None else v for v in values]
+            df[col] = pd.Series(values, index=index, dtype=dtype)
+        return df
+
+
+class ReservationIndex(object):
+    """
+    Interval index of the active reservation periods of the chargers in a
+    cluster. It is used to check whether chargers are free in a queried
+    period without building time series of the reservations.
+
+    The reservation periods and the queried periods are assumed to be
+    aligned with the time resolution of the query (as it is the case in the
+    simulation), i.e. a reservation from 'From' until 'Until' blocks the
+    steps From, From+step, ..., Until-step.
+    """
+
+    def __init__(self):
+        """
+        Indices are initialized empty.
+
+        Returns
+        -------
+        None.
+
+        """
+
+        self.cu_ids = []
+        self.cu_position = {}
+
+        # Per charger: reservation periods sorted by start (ns since epoch)
+        # and the running maximum of the ends of the sorted periods
+        self.starts = {}
+        self.periods = {}
+        self.max_until = {}
+
+        # Charger of each indexed reservation
+        self.location = {}
+
+        # Flat array of all indexed periods for cluster-wide queries
+        self.arrays = None
+
+    def add_cu(self, cu_id):
+        """
+        This method adds a charger to the index.
+
+        Parameters
+        ----------
+        cu_id : str
+            Identifier of the charger.
+
+        Returns
+        -------
+        None.
+
+        """
+
+        self.cu_position[cu_id] = len(self.cu_ids)
+        self.cu_ids.append(cu_id)
+        self.starts[cu_id] = []
+        self.periods[cu_id] = []
+        self.max_until[cu_id] = []
+
+    def _update_running_max(self, cu_id):
+        # Recalculates the running maximum of the ends of the periods
+        running_max = []
+        for period in self.periods[cu_id]:
+            if not running_max or period[1] > running_max[-1][0]:
+                running_max.append((period[1], period))
+            else:
+                running_max.append(running_max[-1])
+        self.max_until[cu_id] = running_max
+        self.arrays = None
+
+    def add(self, reservation_id, cu_id, res_from, res_until):
+        """
+        This method adds a reservation period to the index. It takes O(k)
+        time for k reservations of the charger (insertion into the sorted
+        periods and recalculation of the running maximum of their ends).
+
+        Parameters
+        ----------
+        reservation_id : int
+            Identifier of the reservation.
+        cu_id : str
+            Identifier of the reserved charger.
+        res_from : datetime.datetime
+            Start of the reservation period.
+        res_until : datetime.datetime
+            End of the reservation period.
+
+        Returns
+        -------
+        None.
+
+        """
+
+        period = (pd.Timestamp(res_from).value, pd.Timestamp(res_until).value)
+        pos = bisect_right(self.starts[cu_id], period[0])
+        self.starts[cu_id].insert(pos, period[0])
+        self.periods[cu_id].insert(pos, period + (reservation_id,))
+        self.location[reservation_id] = cu_id
+        self._update_running_max(cu_id)
+
+    def remove(self, reservation_id):
+        """
+        This method removes a reservation period from the index. It takes
+        O(k) time for k reservations of the charger.
+
+        Parameters
+        ----------
+        reservation_id : int
+            Identifier of the reservation.
+
+        Returns
+        -------
+        None.
+
+        """
+
+        cu_id = self.location.pop(reservation_id, None)
+        if cu_id is None:
+            return
+        for pos, period in enumerate(self.periods[cu_id]):
+            if period[2] == reservation_id:
+                del self.starts[cu_id][pos]
+                del self.periods[cu_id][pos]
+                break
+        self._update_running_max(cu_id)
+
+    def is_available(self, cu_id, start, end, step):
+        """
+        This method checks whether a charger is free in a queried period.
+        The check takes O(log k) time for k reservations of the charger.
+
+        Parameters
+        ----------
+        cu_id : str
+            Identifier of the charger.
+        start : datetime.datetime
+            Start of the queried period.
+        end : datetime.datetime
+            End of the queried period (included in the period).
+        step : datetime.timedelta
+            Time resolution of the queried period.
+
+        Returns
+        -------
+        bool
+            True if no active reservation overlaps the queried period.
+
+        """
+
+        start = pd.Timestamp(start).value
+        end = pd.Timestamp(end).value
+        step = pd.Timedelta(step).value
+
+        # Only the periods starting before the end of the query can overlap
+        nb_of_candidates = bisect_right(self.starts[cu_id], end)
+        if nb_of_candidates == 0 or start > end:
+            return True
+
+        latest_until, period = self.max_until[cu_id][nb_of_candidates - 1]
+        if latest_until - step < start:
+            return True
+        if period[1] - step >= period[0]:
+            return False
+
+        # The period with the latest end is shorter than a step
+        for res_from, res_until, _ in self.periods[cu_id][:nb_of_candidates]:
+            if res_until - step >= max(start, res_from):
+                return False
+        return True
+
+    def available(self, start, end, step):
+        """
+        This method checks all chargers of the index at once.
+
+        Parameters
+        ----------
+        start : datetime.datetime
+            Start of the queried period.
+        end : datetime.datetime
+            End of the queried period (included in the period).
+        step : datetime.timedelta
+            Time resolution of the queried period.
+
+        Returns
+        -------
+        numpy.ndarray
+            Boolean array in the order of 'cu_ids'. An element is True if the
+            corresponding charger is free in the queried period.
+
+        """
+
+        if self.arrays is None:
+            periods = [
+                (self.cu_position[cu_id],) + period[:2]
+                for cu_id in self.cu_ids
+                for period in self.periods[cu_id]
+            ]
+            self.arrays = np.array(periods, dtype=np.int64).reshape(-1, 3)
+
+        start = pd.Timestamp(start).value
+        end = pd.Timestamp(end).value
+        step = pd.Timedelta(step).value
+
+        cu_pos, res_from, res_until = self.arrays.T
+        overlapping = (res_from <= end) & (
+            res_until - step >= np.maximum(start, res_from)
+        )
+
+        free = np.ones(len(self.cu_ids), dtype=bool)
+        if start <= end:
+            free[cu_pos[overlapping]] = False
+        return free
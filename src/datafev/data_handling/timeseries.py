@@ -0,0 +1,260 @@
+# The datafev framework
+
+# Copyright (C) 2022,
+# Institute for Automation of Complex Power Systems (ACS),
+# E.ON Energy Research Center (E.ON ERC),
+# RWTH Aachen University
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+# documentation files (the "Software"), to deal in the Software without restriction, including without limitation the
+# rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit
+# persons to whom the Software is furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of the
+# Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE
+# WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+# COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+# OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+from math import gcd
+from datetime import timedelta
+import numpy as np
+import pandas as pd
+
+
+class StepSeries(object):
+    """
+    Time indexed record of float values stored in a numpy array. The time
+    stamps are mapped to integer steps on a regular grid so that writing and
+    reading a value does not require any index manipulation in pandas.
+    """
+
+    def __init__(self, start=None, resolution=None, capacity=288, buffer=None):
+        """
+        A record is defined by the origin and the resolution of its time grid.
+        Both are learned from the first written time stamps if not specified.
+
+        Parameters
+        ----------
+        start : datetime.datetime, optional
+            Time stamp of the first step. The default is None.
+        resolution : datetime.timedelta, optional
+            Length of a step. The default is None.
+        capacity : int, optional
+            Number of steps preallocated for a growable record.
+            The default is 288.
+        buffer : numpy.ndarray, optional
+            Externally owned one-dimensional array to store the values in
+            (e.g., a row of a fleet-wide state table). Records with an external
+            buffer do not grow; values that do not fit in the buffer are kept
+            in a dictionary. The default is None.
+
+        Returns
+        -------
+        None.
+
+        """
+
+        self.start = start
+        self.resolution = resolution
+
+        if buffer is None:
+            self.values = np.full(capacity, np.nan)
+            self.growable = True
+            self.length = 0
+        else:
+            self.values = buffer
+            self.growable = False
+            self.length = len(buffer)
+
+        # Values that cannot be mapped to the array (only for fixed buffers)
+        self.overflow = {}
+
+    def locate(self, ts):
+        """
+        This method returns the step of the grid that corresponds to the time
+        stamp 'ts'.
+
+        Parameters
+        ----------
+        ts : datetime.datetime
+            Time stamp to locate.
+
+        Returns
+        -------
+        pos : int
+            Index of the step in the array.
+            None if 'ts' is not on the grid.
+
+        """
+
+        if self.start is None:
+            return None
+        offset = ts - self.start
+        if self.resolution is None:
+            return 0 if offset == timedelta(0) else None
+        pos, rem = divmod(offset, self.resolution)
+        if rem or pos < 0:
+            return None
+        return int(pos)
+
+    def _relayout(self, ts):
+        # Rebuilds the grid of a growable record such that it contains 'ts'
+        items = list(self.items())
+        stamps = [key for key, _ in items] + [ts]
+        start = min(stamps)
+        micro = 0
+        for stamp in stamps:
+            micro = gcd(micro, int((stamp - start) / timedelta(microseconds=1)))
+        self.start = start
+        self.resolution = timedelta(microseconds=micro) if micro > 0 else None
+        self.values = np.full(max(len(self.values), 1), np.nan)
+        self.length = 0
+        for key, value in items:
+            self[key] = value
+
+    def _grow(self, size):
+        # Doubles the capacity until 'size' steps fit into the array
+        capacity = max(len(self.values), 1)
+        while capacity < size:
+            capacity *= 2
+        values = np.full(capacity, np.nan)
+        values[: self.length] = self.values[: self.length]
+        self.values = values
+
+    def __setitem__(self, ts, value):
+
+        if self.start is None:
+            self.start = ts
+        elif self.resolution is None and ts > self.start and self.growable:
+            self.resolution = ts - self.start
+
+        pos = self.locate(ts)
+
+        if pos is None or pos >= len(self.values):
+            if not self.growable:
+                self.overflow[ts] = value
+                return
+            if pos is None:
+                self._relayout(ts)
+                pos = self.locate(ts)
+            if pos >= len(self.values):
+                self._grow(pos + 1)
+
+        self.values[pos] = value
+        if pos >= self.length:
+            self.length = pos + 1
+
+    def __getitem__(self, ts):
+
+        pos = self.locate(ts)
+        if pos is not None and pos < self.length:
+            value = self.values[pos]
+            if value == value:
+                return value
+        elif ts in self.overflow:
+            return self.overflow[ts]
+        raise KeyError(ts)
+
+    def __contains__(self, ts):
+        try:
+            self[ts]
+        except KeyError:
+            return False
+        return True
+
+    def __len__(self):
+        return int(np.count_nonzero(~np.isnan(self.values[: self.length]))) + len(
+            self.overflow
+        )
+
+    def get(self, ts, default=None):
+        """
+        This method returns the value at 'ts' or 'default' if there is none.
+
+        Parameters
+        ----------
+        ts : datetime.datetime
+            Time stamp.
+        default : optional
+            Value returned for missing time stamps. The default is None.
+
+        Returns
+        -------
+        float
+            Recorded value.
+
+        """
+        try:
+            return self[ts]
+        except KeyError:
+            return default
+
+    def items(self):
+        """
+        This method returns the recorded (time stamp, value) pairs in
+        chronological order.
+
+        Returns
+        -------
+        list
+            List of (time stamp, value) tuples.
+
+        """
+
+        items = []
+        if self.start is not None:
+            for pos in np.flatnonzero(~np.isnan(self.values[: self.length])):
+                ts = (
+                    self.start + int(pos) * self.resolution
+                    if self.resolution is not None
+                    else self.start
+                )
+                items.append((ts, self.values[pos]))
+        items.extend(self.overflow.items())
+        return sorted(items, key=lambda item: item[0])
+
+    def keys(self):
+        """
+        This method returns the recorded time stamps in chronological order.
+
+        Returns
+        -------
+        list
+            List of time stamps.
+
+        """
+        return [key for key, _ in self.items()]
+
+    def to_series(self):
+        """
+        This method returns the record as a pandas Series. For records without
+        off-grid values, the series is a view on the underlying array (i.e. no
+        data is copied); the steps without a recorded value are NaN.
+
+        Returns
+        -------
+        series : pandas.Series
+            Time indexed record.
+
+        """
+
+        if self.start is None:
+            return pd.Series(dtype=float)
+
+        if self.resolution is None:
+            index = pd.DatetimeIndex([self.start])[: self.length]
+        else:
+            index = pd.date_range(
+                start=self.start, periods=self.length, freq=self.resolution
+            )
+        series = pd.Series(self.values[: self.length], index=index, copy=False)
+
+        if self.overflow:
+            series = pd.concat(
+                [series.dropna(), pd.Series(self.overflow, dtype=float)]
+            ).sort_index()
+
+        return series
@@ -18,12 +18,48 @@
 # COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
 # OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
 
+from datafev.data_handling.timeseries import StepSeries
+from datafev.data_handling.power_soc import PowerSOCCurve
+
 
 class ElectricVehicle(object):
     """
     Simulation model of electric vehicles.
     """
 
+    __slots__ = (
+        "type",
+        "vehicle_id",
+        "bCapacity",
+        "p_max_ch",
+        "p_max_ds",
+        "pow_soc_curve",
+        "minSoC",
+        "maxSoC",
+        "soc",
+        "v2g",
+        "g2v",
+        "t_res",
+        "t_arr_est",
+        "t_dep_est",
+        "soc_arr_est",
+        "soc_tar_at_t_dep_est",
+        "v2g_allow",
+        "t_arr_real",
+        "soc_arr_real",
+        "t_dep_real",
+        "cluster_target",
+        "reserved",
+        "admitted",
+        "contract",
+        "reservation_id",
+        "reserved_cluster",
+        "reserved_charger",
+        "connected_cu",
+        "connected_cc",
+        "cc_dataset_id",
+    )
+
     def __init__(
         self,
         carID,
@@ -73,9 +109,54 @@ class ElectricVehicle(object):
 
         self.minSoC = minSoC
         self.maxSoC = maxSoC
-        self.soc = {}
-        self.v2g = {}
-        self.g2v = {}
+
+        # Time indexed state records. EVFleet replaces them with views on its
+        # fleet-wide state table.
+        self.soc = StepSeries()
+        self.v2g = StepSeries()
+        self.g2v = StepSeries()
+
+        # Scenario parameters (assigned by EVFleet)
+        self.t_res = None
+        self.t_arr_est = None
+        self.t_dep_est = None
+        self.soc_arr_est = None
+        self.soc_tar_at_t_dep_est = None
+        self.v2g_allow = None
+        self.t_arr_real = None
+        self.soc_arr_real = None
+        self.t_dep_real = None
+        self.cluster_target = None
+
+        # Status parameters (assigned by the routines)
+        self.reserved = False
+        self.admitted = False
+        self.contract = None
+        self.reservation_id = None
+        self.reserved_cluster = None
+        self.reserved_charger = None
+        self.connected_cu = None
+        self.connected_cc = None
+        self.cc_dataset_id = None
+
+    @property
+    def pow_soc_table(self):
+        """
+        Power-SOC table of the EV battery (None if the power capability does
+        not depend on SOC). The table is compiled to 'pow_soc_curve' when it
+        is set.
+
+        Returns
+        -------
+        pandas.DataFrame
+            Power-SOC table.
+
+        """
+        return None if self.pow_soc_curve is None else self.pow_soc_curve.table
+
+    @pow_soc_table.setter
+    def pow_soc_table(self, table):
+        self.pow_soc_curve = None if table is None else PowerSOCCurve(table)
 
     def charge(self, ts, tdelta, p_in):
         """
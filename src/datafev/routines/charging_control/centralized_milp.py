@@ -19,11 +19,30 @@
 # OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
 
 
+import time
 import pandas as pd
 from datafev.algorithms.multi_cluster.rescheduling_milp import reschedule
-
-
-def charging_routine(ts, t_delta, horizon, system, solver, penalty_parameters):
+from datafev.algorithms.multi_cluster import rescheduling_decomposition
+from datafev.algorithms.warmstart import receding_start, plan_step
+from datafev.algorithms.solver import check_warmstart
+from datafev.routines.charging_control.parallel import attempt, fallbacks
+
+
+def charging_routine(
+    ts,
+    t_delta,
+    horizon,
+    system,
+    solver,
+    penalty_parameters,
+    warmstart=False,
+    deadline=None,
+    fallback="llf",
+    decomposition=False,
+    executor=None,
+    event_triggered=False,
+    soc_tolerance=0.01,
+):
     """
     This routine is executed periodically during operation of charger clusters.
 
@@ -42,10 +61,43 @@ def charging_routine(ts, t_delta, horizon, system, solver, penalty_parameters):
         Optimization horizon of rescheduling.
     system : data_handling.multi_cluster
         Multi-cluster system object.
-    solver : pyomo SolverFactory object
-        Optimization solver.
+    solver : pyomo SolverFactory object, HighsSolver or PyomoSolver
+        Optimization solver (see datafev.algorithms.solver.create_solver).
     penalty_parameters : dict
         Cost parameters for capacity violation/devations.
+    warmstart : bool, optional
+        If True, the plan of the previous control step (system.control_plan) is shifted by one step and passed to the
+        solver as a start solution (see datafev.algorithms.warmstart.receding_start). The default is False.
+    deadline : float, optional
+        Time budget (seconds) of the rescheduling problem in a control step. It is passed to the solver as a time limit.
+        If the limit is reached, the best solution found so far is applied. The default is None (no limit).
+    fallback : str, optional
+        Heuristic applied to the clusters if the rescheduling problem is not solved (no solution within the deadline or
+        infeasible): "llf" (least-laxity-first) or "fcfs" (first-come-first-serve). The heuristics respect the limits
+        of the clusters and their charge powers are scaled down to the upper limit of the system; the lower limit of
+        the system is not enforced by them. If None, the errors of the solver are raised. The applied
+        path ("milp", "milp incumbent" or the heuristic) and the times of the solver ('Solve Time') and the heuristic
+        ('Fallback Time') are entered in the statistics of the control plan. The default is "llf".
+    decomposition : bool, optional
+        If True, the rescheduling problem is decomposed into the problems of the clusters, which are coordinated by
+        sharing the system limits (see datafev.algorithms.multi_cluster.rescheduling_decomposition). The residuals and
+        iteration times are entered in the statistics of the control plan. The start solutions are not used then.
+        The deadline applies to the whole decomposition. The control path is "milp incumbent" if the decomposition
+        has not converged (statistics 'Converged'). The fallback is applied if the decomposition finds no solution
+        respecting the system limits, also without deadline. The default is False.
+    executor : concurrent.futures.Executor, optional
+        Executor (e.g., a persistent process pool) to solve the cluster problems of the decomposition concurrently.
+        The solver must be picklable in that case. The default is None (sequential solving).
+    event_triggered : bool, optional
+        If True, the plan of an earlier control step (system.control_plan) is applied without re-optimization until an
+        event triggers the rescheduling: connection/disconnection of an EV, update of the power limits of the system or
+        a cluster (enter_power_limits), change of the horizon-end target SOC or the estimated departure of an EV or
+        deviation of an SOC from the SOC schedule of the plan by more than soc_tolerance. The number of steps at which
+        the plan is applied is entered as 'Reused Steps' in its statistics. The default is False.
+        A reused plan may charge the EVs at other times than rescheduling at every step would (see
+        datafev.algorithms.warmstart.plan_step).
+    soc_tolerance : float, optional
+        Allowed deviation of the SOCs from the SOC schedule in event-triggered control. The default is 0.01.
 
     Returns
     -------
@@ -57,6 +109,8 @@ def charging_routine(ts, t_delta, horizon, system, solver, penalty_parameters):
     opt_horizon = list(range(len(schedule_horizon)))
     opt_step = t_delta.seconds
 
+    check_warmstart(solver, warmstart)
+
     ################################################################################################
     # Step 1: Identification of charging demand
 
@@ -173,30 +227,113 @@ def charging_routine(ts, t_delta, horizon, system, solver, penalty_parameters):
 
         ################################################################################################
         # Step 2: Solving (MILP-based) rescheduling problem to centrally decide how the chargers will operate now
-        p_schedule, s_schedule = reschedule(
-            solver,
-            opt_step,
-            opt_horizon,
-            bcap,
-            inisoc,
-            tarsoc,
-            minsoc,
-            maxsoc,
-            ch_eff,
-            ds_eff,
-            pmax_pos,
-            pmax_neg,
-            deptime,
-            location,
-            system_upperlimit,
-            system_lowerlimit,
-            clusters,
-            cluster_upperlimits,
-            cluster_lowerlimits,
-            cluster_violationlimits,
-            rho_y,
-            rho_eps,
+        limit_updates = (
+            system.limit_updates,
+            tuple(system.clusters[cc_id].limit_updates for cc_id in clusters),
         )
+        step = None
+        if event_triggered:
+            step = plan_step(
+                system.control_plan,
+                ts,
+                t_delta,
+                inisoc,
+                tarsoc,
+                deptime,
+                limit_updates,
+                soc_tolerance,
+            )
+
+        if step is not None:
+            # No event since the plan was made: the system is not rescheduled
+            plan = system.control_plan
+            plan["Statistics"]["Reused Steps"] = plan["Statistics"].get("Reused Steps", 0) + 1
+            p_charge = {ev_id: p[step] for ev_id, p in plan["P Schedule"].items()}
+        else:
+            start = receding_start(system.control_plan, ts, t_delta) if warmstart else None
+            statistics = {}
+            problem = (
+                solver,
+                opt_step,
+                opt_horizon,
+                bcap,
+                inisoc,
+                tarsoc,
+                minsoc,
+                maxsoc,
+                ch_eff,
+                ds_eff,
+                pmax_pos,
+                pmax_neg,
+                deptime,
+                location,
+                system_upperlimit,
+                system_lowerlimit,
+                clusters,
+                cluster_upperlimits,
+                cluster_lowerlimits,
+                cluster_violationlimits,
+                rho_y,
+                rho_eps,
+            )
+            if decomposition:
+                algorithm = rescheduling_decomposition.reschedule
+                options = {"executor": executor}
+            else:
+                algorithm = reschedule
+                options = {"warmstart": start}
+            if fallback is not None and (deadline is not None or decomposition):
+                # Unsolved problems are handled by the fallback
+                result = attempt(
+                    algorithm,
+                    *problem,
+                    statistics=statistics,
+                    time_limit=deadline,
+                    **options,
+                )
+            else:
+                result = algorithm(
+                    *problem, statistics=statistics, time_limit=deadline, **options
+                )
+
+            if result is not None:
+                p_schedule, s_schedule = result
+                if decomposition:
+                    # Iterates are applied if the decomposition has not converged
+                    converged = statistics.get("Converged")
+                else:
+                    converged = statistics.get("Termination Condition") != "maxTimeLimit"
+                if not converged:
+                    statistics["Control Path"] = "milp incumbent"
+                else:
+                    statistics["Control Path"] = "milp"
+                p_charge = {ev_id: p[0] for ev_id, p in p_schedule.items()}
+            else:
+                # The power distribution of the clusters is decided by the heuristic
+                fallback_start = time.perf_counter()
+                p_charge = fallbacks[fallback](
+                    ts, t_delta, [system.clusters[cc_id] for cc_id in clusters]
+                )
+
+                # The charge powers are scaled down to the upper limit of the system
+                consumption = sum(max(p, 0) / ch_eff[ev_id] for ev_id, p in p_charge.items())
+                if consumption > max(system_upperlimit[0], 0):
+                    scale = max(system_upperlimit[0], 0) / consumption
+                    p_charge = {ev_id: p * scale if p > 0 else p for ev_id, p in p_charge.items()}
+                statistics["Fallback Time"] = time.perf_counter() - fallback_start
+                statistics["Control Path"] = fallback
+                p_schedule = {ev_id: {0: p} for ev_id, p in p_charge.items()}
+                s_schedule = {ev_id: {0: soc} for ev_id, soc in inisoc.items()}
+
+            system.control_plan = {
+                "Time": ts,
+                "P Schedule": p_schedule,
+                "S Schedule": s_schedule,
+                "Statistics": statistics,
+                "Targets": dict(tarsoc),
+                "Departures": dict(deptime),
+                "Limit Updates": limit_updates,
+            }
         ################################################################################################
 
         ################################################################################################
@@ -206,5 +343,5 @@ def charging_routine(ts, t_delta, horizon, system, solver, penalty_parameters):
                 cu = system.clusters[cc_id].chargers[cu_id]
                 if cu.connected_ev != None:
                     ev_id = cu.connected_ev.vehicle_id
-                    cu.supply(ts, t_delta, p_schedule[ev_id][0])
+                    cu.supply(ts, t_delta, p_charge[ev_id])
         ################################################################################################
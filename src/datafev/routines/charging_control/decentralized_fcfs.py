@@ -19,6 +19,7 @@
 # OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
 
 import pandas as pd
+from datafev.data_handling.power_soc import query_power_limits
 
 
 def charging_routine(ts, t_delta, system):
@@ -44,12 +45,46 @@ def charging_routine(ts, t_delta, system):
 
     """
 
+    clusters = list(system.clusters.values())
+
+    p_charge = power_allocation(ts, t_delta, clusters)
+
+    ################################################################################################
+    # Step 3: Charging
+    for cluster in clusters:
+        for cu in cluster.chargers.values():
+            if cu.connected_ev != None:
+                cu.supply(ts, t_delta, p_charge[cu.connected_ev.vehicle_id])
+    ################################################################################################
+
+
+def power_allocation(ts, t_delta, clusters):
+    """
+    This function distributes the power limits of clusters to the connected EVs based on "first-come-first-serve"
+    logic. It is used by the charging routine of this module and as a fallback of the MILP-based routines.
+
+    Parameters
+    ----------
+    ts : datetime
+        Current time.
+    t_delta : timedelta
+        Control horizon.
+    clusters : list of data_handling.cluster
+        Clusters whose power limits are distributed.
+
+    Returns
+    -------
+    p_charge : dict of float
+        Charge power (kW) to each connected EV (keys are the EV identifiers).
+
+    """
+
     step = t_delta.seconds
 
-    # Loop through the clusters
-    for cc_id in system.clusters.keys():
+    p_charge = {}  # Will contain the charge power consumed by the EVs
 
-        cluster = system.clusters[cc_id]
+    # Loop through the clusters
+    for cluster in clusters:
 
         if cluster.query_actual_occupation(ts) > 0:
             # The cluster includes connected EVs
@@ -62,6 +97,23 @@ def charging_routine(ts, t_delta, system):
                 {}
             )  # Will contain the connection time of EVs (from their arrial until now)
 
+            # SOC dependent power limits of the connected EVs that want to keep charging
+            connected_evs = [cu.connected_ev for cu in cluster.connected_chargers()]
+            p_max_socdep = dict(
+                zip(
+                    [ev.vehicle_id for ev in connected_evs],
+                    query_power_limits(
+                        [
+                            ev.pow_soc_curve
+                            if ev.soc[ts] < ev.soc_tar_at_t_dep_est
+                            else None
+                            for ev in connected_evs
+                        ],
+                        [ev.soc[ts] for ev in connected_evs],
+                    ),
+                )
+            )
+
             # Loop through the chargers
             for cu_id, cu in cluster.chargers.items():
 
@@ -91,17 +143,10 @@ def charging_routine(ts, t_delta, system):
                             cu.p_max_ch * step
                         )  # Limit due to the charger power capability
 
-                        if ev.pow_soc_table != None:
+                        if ev.pow_soc_curve is not None:
 
                             # The EV battery has a specific charger power-SOC dependency limiting the power transfer
-                            table = ev.pow_soc_table
-                            soc_range = (
-                                table[
-                                    (table["SOC_LB"] <= ev_soc)
-                                    & (ev_soc < table["SOC_UB"])
-                                ]
-                            ).index[0]
-                            p_max = table.loc[soc_range, "P_UB"]
+                            p_max = p_max_socdep[ev_id]
                             lim_ev_socdep = (
                                 p_max * step
                             )  # Limit due to the SOC dependency of charge power
@@ -125,7 +170,6 @@ def charging_routine(ts, t_delta, system):
             ################################################################################################
             # Step 2: Power distribution based on first-come-first-serve algorithm
             upperlimit = cluster.upper_limit[ts]  # Cluster level constraint
-            p_charge = {}  # Will contain the charge power consumed by the EVs
 
             vehicles_sorted = (pd.Series(contime).sort_values(ascending=False)).index
             free_margin = upperlimit
@@ -143,11 +187,4 @@ def charging_routine(ts, t_delta, system):
                 p_charge[ev] = p_to_ev
             ################################################################################################
 
-            ################################################################################################
-            # Step 3: Charging
-            for cu_id in system.clusters[cc_id].chargers.keys():
-                cu = system.clusters[cc_id].chargers[cu_id]
-                if cu.connected_ev != None:
-                    ev_id = cu.connected_ev.vehicle_id
-                    cu.supply(ts, t_delta, p_charge[ev_id])
-            ################################################################################################
+    return p_charge
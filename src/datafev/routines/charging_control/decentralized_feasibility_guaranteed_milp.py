@@ -20,11 +20,26 @@
 
 
 import pandas as pd
+from functools import partial
 from datafev.algorithms.cluster.rescheduling_milp import reschedule
 from datafev.algorithms.cluster.potentialEstimationG2V_milp import calculate_G2V_potential
 from datafev.algorithms.cluster.potentialEstimationV2G_milp import calculate_V2G_potential
-
-def charging_routine(ts, t_delta, horizon, system, solver, penalty_parameters):
+from datafev.algorithms.cluster import potentialEstimation_greedy
+from datafev.algorithms.warmstart import receding_start
+from datafev.algorithms.solver import check_warmstart
+from datafev.routines.charging_control.parallel import solve_cluster_problems, get_solver
+
+def charging_routine(
+    ts,
+    t_delta,
+    horizon,
+    system,
+    solver,
+    penalty_parameters,
+    executor=None,
+    warmstart=False,
+    greedy_estimation=False,
+):
     """
     This routine is executed periodically during operation of charger clusters.
 
@@ -35,6 +50,7 @@ def charging_routine(ts, t_delta, horizon, system, solver, penalty_parameters):
     negative net consumption (i.e., V2G supply). 
     
     The control architecture is decentralized; therefore, each cluster applies its own control. The applied control is based on MILP rescheduling.
+    The problems of the clusters are independent and can be solved concurrently by an executor.
 
     Parameters
     ----------
@@ -46,10 +62,25 @@ def charging_routine(ts, t_delta, horizon, system, solver, penalty_parameters):
         Optimization horizon of rescheduling.
     system : data_handling.multi_cluster
         Multi-cluster system object.
-    solver : pyomo SolverFactory object
-        Optimization solver.
+    solver : pyomo SolverFactory object, HighsSolver, PyomoSolver or str
+        Optimization solver or its name (see
+        datafev.algorithms.solver.create_solver).
     penalty_parameters : dict
         Cost parameters for capacity violation / devations.
+    executor : concurrent.futures.Executor, optional
+        Executor (e.g., a persistent process pool) to solve the cluster problems concurrently. Solvers that cannot be
+        pickled must be given by name in that case. The results are applied in the order of the clusters.
+        The default is None (sequential solving).
+    warmstart : bool, optional
+        If True, the plan of the previous control step of each cluster (cluster.control_plan) is shifted by one step
+        and passed to the solver as a start solution of the rescheduling problem (see
+        datafev.algorithms.warmstart.receding_start). The default is False.
+    greedy_estimation : bool, optional
+        If True, the G2V/V2G potentials of the clusters are calculated by charging/discharging the EVs as fast as
+        possible (datafev.algorithms.cluster.potentialEstimation_greedy) instead of solving two MILPs. The G2V MILP is
+        still solved for the clusters where the greedy estimate is not exact (EVs with V2G capability and conversion
+        losses, see potentialEstimation_greedy.is_G2V_exact). Initial SOCs outside the SOC ranges raise a ValueError
+        in both estimations. The default is False.
 
     Returns
     -------
@@ -61,6 +92,10 @@ def charging_routine(ts, t_delta, horizon, system, solver, penalty_parameters):
     opt_horizon = list(range(len(schedule_horizon)))
     opt_step = t_delta.seconds
 
+    check_warmstart(get_solver(solver), warmstart)
+
+    problems = {}  # Will contain the rescheduling problems of the clusters with connected EVs
+
     # Loop through the clusters
     for cc_id in system.clusters.keys():
 
@@ -131,223 +166,316 @@ def charging_routine(ts, t_delta, horizon, system, solver, penalty_parameters):
 
             ################################################################################################
             
-            ################################################################################################
-            ################################################################################################
+            problems[cc_id] = (
+                opt_step,
+                opt_horizon,
+                upperlimit,
+                lowerlimit,
+                tolerance,
+                bcap,
+                inisoc,
+                tarsoc,
+                minsoc,
+                maxsoc,
+                ch_eff,
+                ds_eff,
+                pmax_pos,
+                pmax_neg,
+                deptime,
+                rho_y,
+                rho_eps,
+            )
+
+    ################################################################################################
+    # Step 2-3: Checking the feasibility of the power consumption constraints and solving (MILP-based) rescheduling
+    # problems to optimize the power distribution in clusters
+    options = {}  # Will contain the start solutions and solution statistics of the problems
+    for cc_id in problems.keys():
+        start = None
+        if warmstart:
+            start = receding_start(system.clusters[cc_id].control_plan, ts, t_delta)
+        options[cc_id] = {
+            "warmstart": start,
+            "statistics": {},
+            "greedy_estimation": greedy_estimation,
+        }
+
+    results = solve_cluster_problems(
+        _reschedule_with_feasibility_check,
+        solver,
+        list(problems.values()),
+        executor,
+        list(options.values()),
+    )
+    ################################################################################################
+
+    ################################################################################################
+    # Step 4: Charging
+    for cc_id, (p_schedule, s_schedule) in zip(problems.keys(), results):
+        system.clusters[cc_id].control_plan = {
+            "Time": ts,
+            "P Schedule": p_schedule,
+            "S Schedule": s_schedule,
+            "Statistics": options[cc_id]["statistics"],
+        }
+        for cu_id in system.clusters[cc_id].chargers.keys():
+            cu = system.clusters[cc_id].chargers[cu_id]
+            if cu.connected_ev != None:
+                ev_id = cu.connected_ev.vehicle_id
+                cu.supply(ts, t_delta, p_schedule[ev_id][0])
+    ################################################################################################
+
+
+def _reschedule_with_feasibility_check(
+    solver,
+    opt_step,
+    opt_horizon,
+    upperlimit,
+    lowerlimit,
+    tolerance,
+    bcap,
+    inisoc,
+    tarsoc,
+    minsoc,
+    maxsoc,
+    ch_eff,
+    ds_eff,
+    pmax_pos,
+    pmax_neg,
+    deptime,
+    rho_y,
+    rho_eps,
+    warmstart=None,
+    statistics=None,
+    greedy_estimation=False,
+):
+    # Adjusts the power consumption limits of a cluster to the G2V/V2G potentials of the connected EVs (if necessary)
+    # and reschedules the charging operations. It is defined at module level so that it can be run by the workers of
+    # a process pool.
+
+    upperlimit_was_infeasible=False
+    lowerlimit_was_infeasible=False
+    
+    
+    ################################################################################################
+    #If there is a minimum V2G injection constraint
+    if any(v < 0 for v in upperlimit.values()):
+
+    
+        # Step 2.1: Solving (MILP-based) V2G estimation problem to calculate the minimum net consumption of cluster  
+        if greedy_estimation:
+            estimator = potentialEstimation_greedy.calculate_V2G_potential
+        else:
+            estimator = partial(calculate_V2G_potential, solver)
+        p_ref_min, s_ref_min,c_ref_min= estimator(
+            opt_step,
+            opt_horizon,
+            bcap,
+            inisoc,
+            tarsoc,
+            minsoc,
+            maxsoc,
+            ch_eff,
+            ds_eff,
+            pmax_pos,
+            pmax_neg,
+            deptime,
+        )
+        
+        upperlimit_adjusted={}
+        for t in sorted(c_ref_min.keys()):
+            upperlimit_adjusted[t]=max(c_ref_min[t],upperlimit[t])
             
-            upperlimit_was_infeasible=False
-            lowerlimit_was_infeasible=False
+        if upperlimit_adjusted!=upperlimit:
+            
+            upperlimit_was_infeasible=True
+        
+        else:
             
+            upperlimit_was_infeasible=False
             
-            ################################################################################################
-            #If there is a minimum V2G injection constraint
-            if any(v < 0 for v in upperlimit.values()):
+    else:
+        
+        upperlimit_was_infeasible=False
+    ################################################################################################   
+        
+    
+    ################################################################################################
+    #If there is a minimum G2V consumption constraint
+    if any(v > 0 for v in lowerlimit.values()):       
+        
+           
+        # Step 2.2: Solving (MILP-based) G2V estimation problem to calculate the maximum net consumption of cluster         
+        if greedy_estimation and potentialEstimation_greedy.is_G2V_exact(ch_eff, ds_eff, pmax_neg):
+            estimator = potentialEstimation_greedy.calculate_G2V_potential
+        else:
+            estimator = partial(calculate_G2V_potential, solver)
+        p_ref_max, s_ref_max,c_ref_max= estimator(
+            opt_step,
+            opt_horizon,
+            bcap,
+            inisoc,
+            tarsoc,
+            minsoc,
+            maxsoc,
+            ch_eff,
+            ds_eff,
+            pmax_pos,
+            pmax_neg,
+            deptime,
+        )
         
+        lowerlimit_adjusted={}
+        for t in sorted(c_ref_max.keys()):
+            lowerlimit_adjusted[t]=min(c_ref_max[t],lowerlimit[t])
             
-                # Step 2.1: Solving (MILP-based) V2G estimation problem to calculate the minimum net consumption of cluster  
-                p_ref_min, s_ref_min,c_ref_min= calculate_V2G_potential(
-                    solver,
-                    opt_step,
-                    opt_horizon,
-                    bcap,
-                    inisoc,
-                    tarsoc,
-                    minsoc,
-                    maxsoc,
-                    ch_eff,
-                    ds_eff,
-                    pmax_pos,
-                    pmax_neg,
-                    deptime,
-                )
-                
-                upperlimit_adjusted={}
-                for t in sorted(c_ref_min.keys()):
-                    upperlimit_adjusted[t]=max(c_ref_min[t],upperlimit[t])
-                    
-                if upperlimit_adjusted!=upperlimit:
-                    
-                    upperlimit_was_infeasible=True
-                
-                else:
-                    
-                    upperlimit_was_infeasible=False
-                    
-            else:
-                
-                upperlimit_was_infeasible=False
-            ################################################################################################   
-                
             
-            ################################################################################################
-            #If there is a minimum G2V consumption constraint
-            if any(v > 0 for v in lowerlimit.values()):       
-                
-                   
-                # Step 2.2: Solving (MILP-based) G2V estimation problem to calculate the maximum net consumption of cluster         
-                p_ref_max, s_ref_max,c_ref_max= calculate_G2V_potential(
-                    solver,
-                    opt_step,
-                    opt_horizon,
-                    bcap,
-                    inisoc,
-                    tarsoc,
-                    minsoc,
-                    maxsoc,
-                    ch_eff,
-                    ds_eff,
-                    pmax_pos,
-                    pmax_neg,
-                    deptime,
-                )
-                
-                lowerlimit_adjusted={}
-                for t in sorted(c_ref_max.keys()):
-                    lowerlimit_adjusted[t]=min(c_ref_max[t],lowerlimit[t])
-                    
-                    
-                if lowerlimit_adjusted!=lowerlimit:
-                    
-                    lowerlimit_was_infeasible=True
-                
-                else:
-                    
-                    lowerlimit_was_infeasible=False
-                
-            else:
-                
-                lowerlimit_was_infeasible=False    
-            ################################################################################################
+        if lowerlimit_adjusted!=lowerlimit:
             
-            ################################################################################################
-            ################################################################################################
+            lowerlimit_was_infeasible=True
+        
+        else:
             
+            lowerlimit_was_infeasible=False
+        
+    else:
+        
+        lowerlimit_was_infeasible=False    
+    ################################################################################################
+    
+    ################################################################################################
+    ################################################################################################
+    
 
-            ################################################################################################
-            # Step 3: Solving (MILP-based) rescheduling problem to optimize the power distribution in cluster 
-            #if V2G potential is sufficient
-            #if G2V potential is sufficient
-            #Otherwise consider the V2G maximizing schedules
+    ################################################################################################
+    # Step 3: Solving (MILP-based) rescheduling problem to optimize the power distribution in cluster 
+    #if V2G potential is sufficient
+    #if G2V potential is sufficient
+    #Otherwise consider the V2G maximizing schedules
+    
+    if lowerlimit_was_infeasible and upperlimit_was_infeasible:
+        
+        if all(lowerlimit_adjusted[t] <= upperlimit_adjusted[t] for t in upperlimit_adjusted):
+        
+
+            p_schedule, s_schedule = reschedule(
+                solver,
+                opt_step,
+                opt_horizon,
+                upperlimit_adjusted,
+                lowerlimit_adjusted,
+                tolerance,
+                bcap,
+                inisoc,
+                tarsoc,
+                minsoc,
+                maxsoc,
+                ch_eff,
+                ds_eff,
+                pmax_pos,
+                pmax_neg,
+                deptime,
+                rho_y,
+                rho_eps,
+                warmstart=warmstart,
+                statistics=statistics,
+            )
             
-            if lowerlimit_was_infeasible and upperlimit_was_infeasible:
-                
-                if all(lowerlimit_adjusted[t] <= upperlimit_adjusted[t] for t in upperlimit_adjusted):
-                
-
-                    p_schedule, s_schedule = reschedule(
-                        solver,
-                        opt_step,
-                        opt_horizon,
-                        upperlimit_adjusted,
-                        lowerlimit_adjusted,
-                        tolerance,
-                        bcap,
-                        inisoc,
-                        tarsoc,
-                        minsoc,
-                        maxsoc,
-                        ch_eff,
-                        ds_eff,
-                        pmax_pos,
-                        pmax_neg,
-                        deptime,
-                        rho_y,
-                        rho_eps,
-                    )
-                    
-                else:
-                    
-                    raise ValueError('Some elements of adjusted lower limit are larger or equal to those of adjusted upper limit')
-                    
-            elif upperlimit_was_infeasible:
-                 
-                if upperlimit_adjusted==c_ref_min:
-                    
-                    p_schedule=p_ref_min
-                    
-                else:
-                    
-                    p_schedule, s_schedule = reschedule(
-                        solver,
-                        opt_step,
-                        opt_horizon,
-                        upperlimit_adjusted,
-                        lowerlimit,
-                        tolerance,
-                        bcap,
-                        inisoc,
-                        tarsoc,
-                        minsoc,
-                        maxsoc,
-                        ch_eff,
-                        ds_eff,
-                        pmax_pos,
-                        pmax_neg,
-                        deptime,
-                        rho_y,
-                        rho_eps,
-                    )
-                    
-                    
-            elif lowerlimit_was_infeasible:
-                 
-                if lowerlimit_adjusted==c_ref_max:
-                    
-                    p_schedule=p_ref_max
-                    
-                else:
-                    
-                    p_schedule, s_schedule = reschedule(
-                        solver,
-                        opt_step,
-                        opt_horizon,
-                        upperlimit,
-                        lowerlimit_adjusted,
-                        tolerance,
-                        bcap,
-                        inisoc,
-                        tarsoc,
-                        minsoc,
-                        maxsoc,
-                        ch_eff,
-                        ds_eff,
-                        pmax_pos,
-                        pmax_neg,
-                        deptime,
-                        rho_y,
-                        rho_eps,
-                    ) 
-                    
-            else:
-                              
-                p_schedule, s_schedule = reschedule(
-                    solver,
-                    opt_step,
-                    opt_horizon,
-                    upperlimit,
-                    lowerlimit,
-                    tolerance,
-                    bcap,
-                    inisoc,
-                    tarsoc,
-                    minsoc,
-                    maxsoc,
-                    ch_eff,
-                    ds_eff,
-                    pmax_pos,
-                    pmax_neg,
-                    deptime,
-                    rho_y,
-                    rho_eps,
-                )                          
-                    
-                
-            ################################################################################################
+        else:
+            
+            raise ValueError('Some elements of adjusted lower limit are larger or equal to those of adjusted upper limit')
+            
+    elif upperlimit_was_infeasible:
+         
+        if upperlimit_adjusted==c_ref_min:
+            
+            p_schedule=p_ref_min
+            s_schedule=s_ref_min
+            
+        else:
+            
+            p_schedule, s_schedule = reschedule(
+                solver,
+                opt_step,
+                opt_horizon,
+                upperlimit_adjusted,
+                lowerlimit,
+                tolerance,
+                bcap,
+                inisoc,
+                tarsoc,
+                minsoc,
+                maxsoc,
+                ch_eff,
+                ds_eff,
+                pmax_pos,
+                pmax_neg,
+                deptime,
+                rho_y,
+                rho_eps,
+                warmstart=warmstart,
+                statistics=statistics,
+            )
+            
+            
+    elif lowerlimit_was_infeasible:
+         
+        if lowerlimit_adjusted==c_ref_max:
+            
+            p_schedule=p_ref_max
+            s_schedule=s_ref_max
+            
+        else:
+            
+            p_schedule, s_schedule = reschedule(
+                solver,
+                opt_step,
+                opt_horizon,
+                upperlimit,
+                lowerlimit_adjusted,
+                tolerance,
+                bcap,
+                inisoc,
+                tarsoc,
+                minsoc,
+                maxsoc,
+                ch_eff,
+                ds_eff,
+                pmax_pos,
+                pmax_neg,
+                deptime,
+                rho_y,
+                rho_eps,
+                warmstart=warmstart,
+                statistics=statistics,
+            ) 
+            
+    else:
+                      
+        p_schedule, s_schedule = reschedule(
+            solver,
+            opt_step,
+            opt_horizon,
+            upperlimit,
+            lowerlimit,
+            tolerance,
+            bcap,
+            inisoc,
+            tarsoc,
+            minsoc,
+            maxsoc,
+            ch_eff,
+            ds_eff,
+            pmax_pos,
+            pmax_neg,
+            deptime,
+            rho_y,
+            rho_eps,
+            warmstart=warmstart,
+            statistics=statistics,
+        )                          
+            
+        
+    ################################################################################################
 
-            ################################################################################################
-            # Step 3: Charging
-            for cu_id in system.clusters[cc_id].chargers.keys():
-                cu = system.clusters[cc_id].chargers[cu_id]
-                if cu.connected_ev != None:
-                    ev_id = cu.connected_ev.vehicle_id
-                    cu.supply(ts, t_delta, p_schedule[ev_id][0])
-            ################################################################################################
+    return p_schedule, s_schedule
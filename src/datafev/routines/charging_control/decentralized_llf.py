@@ -18,7 +18,9 @@
 # COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
 # OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
 
-from datafev.algorithms.cluster.prioritization_llf import leastlaxityfirst
+import numpy as np
+from datafev.algorithms.cluster.prioritization_llf import leastlaxityfirst_array
+from datafev.data_handling.power_soc import query_power_limits
 
 
 def charging_routine(ts, t_delta, system):
@@ -44,125 +46,103 @@ def charging_routine(ts, t_delta, system):
 
     """
 
-    step = t_delta.seconds
+    # Clusters that include connected EVs (their EVs are handled together)
+    clusters = [
+        cluster
+        for cluster in system.clusters.values()
+        if cluster.query_actual_occupation(ts) > 0
+    ]
+
+    p_charge = power_allocation(ts, t_delta, clusters)
 
-    # Loop through the clusters
-    for cc_id in system.clusters.keys():
+    ################################################################################################
+    # Step 3: Charging
+    for cluster in clusters:
+        for cu in cluster.chargers.values():
+            if cu.connected_ev != None:
+                cu.supply(ts, t_delta, p_charge[cu.connected_ev.vehicle_id])
+    ################################################################################################
 
-        cluster = system.clusters[cc_id]
 
-        if cluster.query_actual_occupation(ts) > 0:
-            # The cluster includes connected EVs
+def power_allocation(ts, t_delta, clusters):
+    """
+    This function distributes the power limits of clusters to the connected EVs based on "least-laxity-first" logic.
+    It is used by the charging routine of this module and as a fallback of the MILP-based routines.
+
+    Parameters
+    ----------
+    ts : datetime
+        Current time.
+    t_delta : timedelta
+        Control horizon.
+    clusters : list of data_handling.cluster
+        Clusters whose power limits are distributed.
+
+    Returns
+    -------
+    p_charge : dict of float
+        Charge power (kW) to each connected EV (keys are the EV identifiers).
+
+    """
+
+    step = t_delta.seconds
 
-            ################################################################################################
-            # Step 1: Identification of charging demand
-
-            inisoc = {}  # Will contain the current SOC values of EV batteries
-            tarsoc = (
-                {}
-            )  # Will contain the target SOC values of EV batteries (at estimate departure time)
-            bcap = {}  # Will contain the EV battery capacities
-            eff = {}  # Will contain the power conversion efficiencies during
-            p_socdep = {}  # Will contain the data of SOC dependency of charge power
-            p_chmax = (
-                {}
-            )  # Will contain the maximum charge power that can be handled by EV-charger pair
-            p_re = {}  # Will contain the charge powers that EVs request
-            leadtime = (
-                {}
-            )  # Will contain the lead time for charging from now arrial until estimate departure)
-
-            # Loop through the chargers
-            for cu_id, cu in cluster.chargers.items():
-
-                ev = cu.connected_ev
-
-                if ev != None:
-
-                    # There is an EV connected in this charger
-                    ev_id = ev.vehicle_id
-
-                    # Current SOC of EV
-                    ev_soc = ev.soc[ts]
-                    inisoc[ev_id] = ev_soc
-
-                    # Target SOC of EV (for estimated departure time)
-                    ev_tarsoc = ev.soc_tar_at_t_dep_est
-                    tarsoc[ev_id] = ev_tarsoc
-
-                    # Energy capactiy of the EV battery
-                    ev_bcap = ev.bCapacity
-                    bcap[ev_id] = ev_bcap
-
-                    # Power conversion efficiency of charger
-                    eff[ev_id] = cu.eff
-
-                    # Maximum charge power that can be handled by EV-charger pair (for the whole SOC curve)
-                    p_chmax[ev_id] = min(ev.p_max_ch, cu.p_max_ch)
-
-                    # How long EV will stay connected to the charger (seconds)
-                    leadtime[ev_id] = (
-                        (ev.t_dep_est - ts).seconds if ts < ev.t_dep_est else 0.001
-                    )
-
-                    if ev_soc >= ev_tarsoc:
-
-                        # The EV connected here has already reached its target SOC
-                        p_re[ev_id] = 0.0
-
-                    else:
-
-                        # The EV connected here wants to keep charging
-                        # Calculation of the amount of energy that can be supplied to the EV
-                        lim_ev_batcap = (
-                            1 - ev_soc
-                        ) * ev_bcap  # Limit due to the battery capacity of EV
-                        lim_ch_pow = (
-                            cu.p_max_ch * step
-                        )  # Limit due to the charger power capability
-
-                        if ev.pow_soc_table != None:
-
-                            # The EV battery has a specific charger power-SOC dependency limiting the power transfer
-                            table = ev.pow_soc_table
-                            soc_range = (
-                                table[
-                                    (table["SOC_LB"] <= ev_soc)
-                                    & (ev_soc < table["SOC_UB"])
-                                ]
-                            ).index[0]
-                            p_max = table.loc[soc_range, "P_UB"]
-                            lim_ev_socdep = (
-                                p_max * step
-                            )  # Limit due to the SOC dependency of charge power
-
-                            e_max = min(lim_ev_batcap, lim_ch_pow, lim_ev_socdep)
-                            p_socdep[ev_id] = table.to_dict()
-
-                        else:
-
-                            # The power transfer is only limited by the charger's power and battery capacity
-                            e_max = min(lim_ev_batcap, lim_ch_pow)
-                            p_socdep[ev_id] = None
-
-                        # Charge powers requested by EVs during the control horizon
-                        p_re[ev_id] = e_max / step
-
-            ################################################################################################
-
-            ################################################################################################
-            # Step 2: Power distribution based on first-come-first-serve algorithm
-            upperlimit = cluster.upper_limit[ts]  # Cluster level constraint
-            p_charge = leastlaxityfirst(
-                inisoc, tarsoc, bcap, eff, p_socdep, p_chmax, p_re, leadtime, upperlimit
-            )
-            ################################################################################################
-
-            ################################################################################################
-            # Step 3: Charging
-            for cu_id in system.clusters[cc_id].chargers.keys():
-                cu = system.clusters[cc_id].chargers[cu_id]
-                if cu.connected_ev != None:
-                    ev_id = cu.connected_ev.vehicle_id
-                    cu.supply(ts, t_delta, p_charge[ev_id])
-            ################################################################################################
+    # Chargers with connected EVs
+    chargers = [
+        (n, cu)
+        for n, cluster in enumerate(clusters)
+        for cu in cluster.chargers.values()
+        if cu.connected_ev != None
+    ]
+
+    if len(chargers) == 0:
+        return {}
+
+    ################################################################################################
+    # Step 1: Identification of charging demand
+    evs = [cu.connected_ev for _, cu in chargers]
+    ev_cluster = np.array([n for n, _ in chargers])  # Positions of the EVs' clusters
+
+    inisoc = np.array([ev.soc[ts] for ev in evs])  # Current SOC values of EV batteries
+    tarsoc = np.array(
+        [ev.soc_tar_at_t_dep_est for ev in evs]
+    )  # Target SOC values of EV batteries (at estimate departure time)
+    bcap = np.array([ev.bCapacity for ev in evs])  # EV battery capacities
+    eff = np.array([cu.eff for _, cu in chargers])  # Power conversion efficiencies
+    p_socdep = [ev.pow_soc_curve for ev in evs]  # SOC dependency of charge power
+    p_chmax = np.array(
+        [min(ev.p_max_ch, cu.p_max_ch) for ev, (_, cu) in zip(evs, chargers)]
+    )  # Maximum charge power that can be handled by EV-charger pair (for the whole SOC curve)
+    leadtime = np.array(
+        [(ev.t_dep_est - ts).seconds if ts < ev.t_dep_est else 0.001 for ev in evs]
+    )  # Lead time for charging from now until estimate departure (seconds)
+
+    # The EVs that have not reached their target SOCs want to keep charging
+    charging = inisoc < tarsoc
+
+    # SOC dependent power limits of the EVs that want to keep charging
+    p_max_socdep = query_power_limits(
+        [curve if ch else None for curve, ch in zip(p_socdep, charging)], inisoc
+    )
+
+    # Calculation of the amount of energy that can be supplied to the EVs
+    lim_ev_batcap = (1 - inisoc) * bcap  # Limit due to the battery capacity of EV
+    lim_ch_pow = np.array([cu.p_max_ch for _, cu in chargers]) * step  # Limit due to the charger power capability
+    lim_ev_socdep = np.where(
+        np.isnan(p_max_socdep), np.inf, p_max_socdep * step
+    )  # Limit due to the SOC dependency of charge power
+    e_max = np.minimum(np.minimum(lim_ev_batcap, lim_ch_pow), lim_ev_socdep)
+
+    # Charge powers requested by EVs during the control horizon
+    p_re = np.where(charging, e_max / step, 0.0)
+    ################################################################################################
+
+    ################################################################################################
+    # Step 2: Power distribution based on least-laxity-first algorithm
+    upperlimit = np.array([cluster.upper_limit[ts] for cluster in clusters])  # Cluster level constraints
+    p_charge = leastlaxityfirst_array(
+        inisoc, tarsoc, bcap, eff, p_socdep, p_chmax, p_re, leadtime, upperlimit, ev_cluster
+    )
+    ################################################################################################
+
+    return dict(zip([ev.vehicle_id for ev in evs], p_charge.tolist()))
@@ -19,17 +19,44 @@
 # OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
 
 
+import time
+from functools import partial
 import pandas as pd
-from datafev.algorithms.cluster.rescheduling_milp import reschedule
-
-
-def charging_routine(ts, t_delta, horizon, system, solver, penalty_parameters):
+from datafev.algorithms.cluster.rescheduling_milp import reschedule, Rescheduler
+from datafev.algorithms.cluster import rescheduling_milp, rescheduling_aggregation
+from datafev.algorithms.warmstart import receding_start, plan_step
+from datafev.algorithms.solver import check_warmstart
+from datafev.routines.charging_control.parallel import (
+    solve_cluster_problems,
+    get_solver,
+    attempt,
+    fallbacks,
+)
+
+def charging_routine(
+    ts,
+    t_delta,
+    horizon,
+    system,
+    solver,
+    penalty_parameters,
+    executor=None,
+    reschedulers=None,
+    warmstart=False,
+    deadline=None,
+    fallback="llf",
+    event_triggered=False,
+    soc_tolerance=0.01,
+    presolve=False,
+    aggregation=False,
+):
     """
     This routine is executed periodically during operation of charger clusters.
 
     It addresses the scenarios where EVs connected in clusters have previously defined charging schedules that may
     require deviations due to the local power consumption constraints of clusters. The control architecture is
     decentralized; therefore, each cluster applies its own control. The applied control is based on MILP rescheduling.
+    The rescheduling problems of the clusters are independent and can be solved concurrently by an executor.
 
     Parameters
     ----------
@@ -41,10 +68,56 @@ def charging_routine(ts, t_delta, horizon, system, solver, penalty_parameters):
         Optimization horizon of rescheduling.
     system : data_handling.multi_cluster
         Multi-cluster system object.
-    solver : pyomo SolverFactory object
-        Optimization solver.
+    solver : pyomo SolverFactory object, HighsSolver, PyomoSolver or str
+        Optimization solver or its name (see
+        datafev.algorithms.solver.create_solver).
     penalty_parameters : dict
         Cost parameters for capacity violation / devations.
+    executor : concurrent.futures.Executor, optional
+        Executor (e.g., a persistent process pool) to solve the cluster problems concurrently. Solvers that cannot be
+        pickled must be given by name in that case. The results are applied in the order of the clusters.
+        The default is None (sequential solving).
+    reschedulers : dict, optional
+        Persistent rescheduling models of the clusters (keys are the cluster identifiers). If a dictionary is given,
+        the models are kept in it between the calls of the routine (missing models are created) and only the changed
+        data is updated at each call. The persistent models are solved sequentially in this process. They require a
+        Pyomo solver interface (e.g., appsi_highs): HighsSolver assembles the models at each call and a ValueError is
+        raised. The default is None (the models are constructed at each call).
+    warmstart : bool, optional
+        If True, the plan of the previous control step of each cluster (cluster.control_plan) is shifted by one step
+        and passed to the solver as a start solution (see datafev.algorithms.warmstart.receding_start).
+        The default is False.
+    deadline : float, optional
+        Time budget (seconds) of the rescheduling problems in a control step. It is passed to the solver as a time
+        limit: the problems solved sequentially share the budget whereas each problem gets the whole budget when they
+        are solved by an executor. If the limit is reached, the best solution found so far is applied. The default is
+        None (no limit).
+    fallback : str, optional
+        Heuristic applied to the clusters whose rescheduling problems are not solved (no solution within the deadline
+        or infeasible): "llf" (least-laxity-first) or "fcfs" (first-come-first-serve). If None, the errors of the
+        solver are raised. The applied path ("milp", "milp incumbent" or the heuristic) and the times of the solver
+        ('Solve Time') and the heuristic ('Fallback Time') are entered in the statistics of the control plans.
+        The default is "llf".
+    event_triggered : bool, optional
+        If True, the plan of an earlier control step of a cluster (cluster.control_plan) is applied without
+        re-optimization until an event triggers the rescheduling of the cluster: connection/disconnection of an EV,
+        update of the power limits (cluster.enter_power_limits), change of the horizon-end target SOC or the estimated
+        departure of an EV or deviation of an SOC from the SOC schedule of the plan by more than soc_tolerance. The
+        number of steps at which a plan is applied is entered as 'Reused Steps' in its statistics. The default is False.
+        A reused plan may charge the EVs at other times than rescheduling at every step would (see
+        datafev.algorithms.warmstart.plan_step).
+    soc_tolerance : float, optional
+        Allowed deviation of the SOCs from the SOC schedule in event-triggered control. The default is 0.01.
+    presolve : bool, optional
+        If True, the EVs without flexibility (see datafev.algorithms.cluster.rescheduling_milp.presolve) are fixed
+        before the rescheduling: they are removed from the problems, their consumption is subtracted from the limits of
+        the clusters and their schedules are merged in the control plans. The number of fixed EVs is entered as
+        'Fixed EVs' in the statistics of the control plans. The default is False.
+    aggregation : bool, optional
+        If True, the rescheduling problems are solved on virtual batteries aggregating the EVs with similar departures
+        and energy demands (see datafev.algorithms.cluster.rescheduling_aggregation). The approximation gap is entered
+        in the statistics of the control plans. The start solutions and the persistent models are not used then.
+        The default is False.
 
     Returns
     -------
@@ -56,6 +129,14 @@ def charging_routine(ts, t_delta, horizon, system, solver, penalty_parameters):
     opt_horizon = list(range(len(schedule_horizon)))
     opt_step = t_delta.seconds
 
+    if not aggregation:
+        check_warmstart(get_solver(solver), warmstart, reschedulers is not None)
+
+    problems = {}  # Will contain the rescheduling problems of the clusters with connected EVs
+    planned = {}  # Will contain the steps of the plans applied without re-optimization (event-triggered control)
+    presolved = {}  # Will contain the schedules of the EVs fixed by the presolve
+    demands = {}  # Will contain the target SOCs and departures the plans are made for
+
     # Loop through the clusters
     for cc_id in system.clusters.keys():
 
@@ -138,10 +219,62 @@ def charging_routine(ts, t_delta, horizon, system, solver, penalty_parameters):
 
             ################################################################################################
 
-            ################################################################################################
-            # Step 2: Solving (MILP-based) rescheduling problem to optimize the power distribution in cluster
-            p_schedule, s_schedule = reschedule(
-                solver,
+            demands[cc_id] = (dict(tarsoc), dict(deptime))
+
+            if event_triggered:
+                step = plan_step(
+                    cluster.control_plan,
+                    ts,
+                    t_delta,
+                    inisoc,
+                    tarsoc,
+                    deptime,
+                    cluster.limit_updates,
+                    soc_tolerance,
+                )
+                if step is not None:
+                    # No event since the plan was made: the cluster is not rescheduled
+                    planned[cc_id] = step
+                    continue
+
+            if presolve:
+                # Fixing the EVs without flexibility and reducing the limits by their consumption
+                fixed_p, fixed_s, upperlimit, lowerlimit = rescheduling_milp.presolve(
+                    opt_step,
+                    opt_horizon,
+                    upperlimit,
+                    lowerlimit,
+                    bcap,
+                    inisoc,
+                    tarsoc,
+                    minsoc,
+                    maxsoc,
+                    ch_eff,
+                    ds_eff,
+                    pmax_pos,
+                    pmax_neg,
+                    deptime,
+                )
+                for ev_id in fixed_p.keys():
+                    for parameter in (
+                        bcap,
+                        inisoc,
+                        tarsoc,
+                        minsoc,
+                        maxsoc,
+                        ch_eff,
+                        ds_eff,
+                        pmax_pos,
+                        pmax_neg,
+                        deptime,
+                    ):
+                        del parameter[ev_id]
+                presolved[cc_id] = (fixed_p, fixed_s)
+                if len(bcap) == 0:
+                    # All EVs of the cluster are fixed
+                    continue
+
+            problems[cc_id] = (
                 opt_step,
                 opt_horizon,
                 upperlimit,
@@ -160,13 +293,114 @@ def charging_routine(ts, t_delta, horizon, system, solver, penalty_parameters):
                 rho_y,
                 rho_eps,
             )
-            ################################################################################################
 
-            ################################################################################################
-            # Step 3: Charging
-            for cu_id in system.clusters[cc_id].chargers.keys():
-                cu = system.clusters[cc_id].chargers[cu_id]
-                if cu.connected_ev != None:
-                    ev_id = cu.connected_ev.vehicle_id
-                    cu.supply(ts, t_delta, p_schedule[ev_id][0])
-            ################################################################################################
+    ################################################################################################
+    # Step 2: Solving (MILP-based) rescheduling problems to optimize the power distribution in clusters
+    options = {}  # Will contain the start solutions and solution statistics of the problems
+    for cc_id in problems.keys():
+        options[cc_id] = {"statistics": {}}
+        if not aggregation:
+            start = None
+            if warmstart:
+                start = receding_start(system.clusters[cc_id].control_plan, ts, t_delta)
+            options[cc_id]["warmstart"] = start
+
+    if aggregation:
+        rescheduling = rescheduling_aggregation.reschedule
+    else:
+        rescheduling = reschedule
+
+    guarded = deadline is not None and fallback is not None  # Unsolved problems are handled by the fallback
+
+    if reschedulers is None and (executor is not None or deadline is None):
+        if deadline is not None:
+            for cc_id in problems.keys():
+                options[cc_id]["time_limit"] = deadline
+        results = solve_cluster_problems(
+            partial(attempt, rescheduling) if guarded else rescheduling,
+            solver,
+            list(problems.values()),
+            executor,
+            list(options.values()),
+        )
+    else:
+        # Sequential solving: the problems share the deadline
+        start = time.perf_counter()
+        results = []
+        for cc_id, problem in problems.items():
+            if reschedulers is None or aggregation:
+                algorithm = partial(rescheduling, get_solver(solver))
+            else:
+                if cc_id not in reschedulers:
+                    reschedulers[cc_id] = Rescheduler(get_solver(solver))
+                algorithm = reschedulers[cc_id].reschedule
+            if deadline is not None:
+                budget = deadline - (time.perf_counter() - start)
+                if budget <= 0 and guarded:
+                    results.append(None)
+                    continue
+                options[cc_id]["time_limit"] = max(budget, 0.0)
+            if guarded:
+                results.append(attempt(algorithm, *problem, **options[cc_id]))
+            else:
+                results.append(algorithm(*problem, **options[cc_id]))
+    ################################################################################################
+
+    ################################################################################################
+    # Step 3: Charging
+    results = dict(zip(problems.keys(), results))
+    for cc_id in presolved.keys():
+        if cc_id not in problems:
+            results[cc_id] = ({}, {})
+            options[cc_id] = {"statistics": {"Control Path": "presolve"}}
+
+    for cc_id, result in results.items():
+        cluster = system.clusters[cc_id]
+        statistics = options[cc_id]["statistics"]
+
+        if result is not None:
+            p_schedule, s_schedule = result
+            if cc_id in presolved:
+                p_schedule.update(presolved[cc_id][0])
+                s_schedule.update(presolved[cc_id][1])
+                statistics["Fixed EVs"] = len(presolved[cc_id][0])
+            if statistics.get("Termination Condition") == "maxTimeLimit":
+                statistics["Control Path"] = "milp incumbent"
+            else:
+                statistics.setdefault("Control Path", "milp")
+            p_charge = {ev_id: p[0] for ev_id, p in p_schedule.items()}
+        else:
+            # The power distribution of the cluster is decided by the heuristic
+            fallback_start = time.perf_counter()
+            p_charge = fallbacks[fallback](ts, t_delta, [cluster])
+            statistics["Fallback Time"] = time.perf_counter() - fallback_start
+            statistics["Control Path"] = fallback
+            p_schedule = {ev_id: {0: p} for ev_id, p in p_charge.items()}
+            s_schedule = {
+                cu.connected_ev.vehicle_id: {0: cu.connected_ev.soc[ts]}
+                for cu in cluster.chargers.values()
+                if cu.connected_ev != None
+            }
+
+        cluster.control_plan = {
+            "Time": ts,
+            "P Schedule": p_schedule,
+            "S Schedule": s_schedule,
+            "Statistics": statistics,
+            "Targets": demands[cc_id][0],
+            "Departures": demands[cc_id][1],
+            "Limit Updates": cluster.limit_updates,
+        }
+        for cu_id in cluster.chargers.keys():
+            cu = cluster.chargers[cu_id]
+            if cu.connected_ev != None:
+                ev_id = cu.connected_ev.vehicle_id
+                cu.supply(ts, t_delta, p_charge[ev_id])
+
+    for cc_id, step in planned.items():
+        cluster = system.clusters[cc_id]
+        plan = cluster.control_plan
+        plan["Statistics"]["Reused Steps"] = plan["Statistics"].get("Reused Steps", 0) + 1
+        for cu in cluster.connected_chargers():
+            cu.supply(ts, t_delta, plan["P Schedule"][cu.connected_ev.vehicle_id][step])
+    ################################################################################################
@@ -0,0 +1,155 @@
+# The datafev framework
+
+# Copyright (C) 2022,
+# Institute for Automation of Complex Power Systems (ACS),
+# E.ON Energy Research Center (E.ON ERC),
+# RWTH Aachen University
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+# documentation files (the "Software"), to deal in the Software without restriction, including without limitation the
+# rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit
+# persons to whom the Software is furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of the
+# Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE
+# WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+# COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+# OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+import time
+from datafev.algorithms.solver import create_solver
+from datafev.algorithms.matrix_form import NoSolutionError
+from datafev.routines.charging_control import decentralized_fcfs, decentralized_llf
+
+# Solver instances created by name (kept alive in the worker processes of an executor)
+_solvers = {}
+
+# Heuristic power allocations applied when the rescheduling problems are not solved in time
+fallbacks = {
+    "llf": decentralized_llf.power_allocation,
+    "fcfs": decentralized_fcfs.power_allocation,
+}
+
+
+def attempt(algorithm, *args, **kwargs):
+    """
+    This function calls a rescheduling algorithm and returns None if it does not provide a solution (e.g., if the
+    time limit is reached before an incumbent is found or the problem is infeasible). It is a module-level function so
+    that it can be sent to the workers of an executor.
+
+    Parameters
+    ----------
+    algorithm : function
+        Rescheduling function (or method) returning the power and SOC schedules.
+    *args, **kwargs
+        Arguments of the algorithm. The solution time is entered as 'Solve Time' in kwargs["statistics"] if given.
+
+    Returns
+    -------
+    tuple or None
+        Power and SOC schedules, or None if no solution is available.
+
+    """
+
+    start = time.perf_counter()
+    try:
+        p_schedule, s_schedule = algorithm(*args, **kwargs)
+    except NoSolutionError:
+        p_schedule = None
+    if kwargs.get("statistics") is not None:
+        kwargs["statistics"]["Solve Time"] = time.perf_counter() - start
+
+    if p_schedule is None or any(p.get(0) is None for p in p_schedule.values()):
+        return None
+    return p_schedule, s_schedule
+
+
+def get_solver(solver):
+    """
+    This function returns the solver object of a solver specification.
+
+    Parameters
+    ----------
+    solver : pyomo SolverFactory object, HighsSolver, PyomoSolver or str
+        Optimization solver or the name of the solver ('highs' for the
+        in-process HiGHS solver). Solvers given by name are created once per
+        process (see datafev.algorithms.solver.create_solver) and reused
+        afterwards.
+
+    Returns
+    -------
+    pyomo SolverFactory object, HighsSolver or PyomoSolver
+        Optimization solver.
+
+    """
+
+    if isinstance(solver, str):
+        if solver not in _solvers:
+            _solvers[solver] = create_solver(solver)
+        return _solvers[solver]
+    return solver
+
+
+def _solve_problem(algorithm, solver, args, kwargs):
+    # Executed in the workers: solves a single cluster problem. The statistics
+    # dictionary is returned since the workers fill their own copies of it.
+    result = algorithm(get_solver(solver), *args, **kwargs)
+    return result, kwargs.get("statistics")
+
+
+def solve_cluster_problems(
+    algorithm, solver, problems, executor=None, options=None
+):
+    """
+    This function solves the optimization problems of multiple clusters. The
+    problems are independent of each other; therefore, they can be solved
+    concurrently by an executor.
+
+    Parameters
+    ----------
+    algorithm : function
+        Module-level optimization function called as algorithm(solver, *args).
+    solver : pyomo SolverFactory object, HighsSolver, PyomoSolver or str
+        Optimization solver. Solvers that cannot be pickled (e.g., appsi_highs)
+        must be given by name when a process pool is used.
+    problems : list
+        Argument tuples of the problems (excluding the solver).
+    executor : concurrent.futures.Executor, optional
+        Executor to solve the problems concurrently. A process pool created once
+        for the whole simulation keeps its workers (and their solvers) alive
+        between the calls. The default is None (sequential solving).
+    options : list of dict, optional
+        Keyword arguments of the problems (e.g., start solutions). Statistics
+        dictionaries ('statistics') filled by the workers are copied back.
+        The default is None.
+
+    Returns
+    -------
+    list
+        Results of the problems in the order of 'problems'.
+
+    """
+
+    if options is None:
+        options = [{} for _ in problems]
+
+    if executor is None or len(problems) < 2:
+        return [
+            _solve_problem(algorithm, solver, args, kwargs)[0]
+            for args, kwargs in zip(problems, options)
+        ]
+
+    futures = [
+        executor.submit(_solve_problem, algorithm, solver, args, kwargs)
+        for args, kwargs in zip(problems, options)
+    ]
+
+    results = []
+    for future, kwargs in zip(futures, options):
+        result, statistics = future.result()
+        if kwargs.get("statistics") is not None:
+            kwargs["statistics"].update(statistics)
+        results.append(result)
+    return results
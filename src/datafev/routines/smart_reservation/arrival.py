@@ -68,7 +68,9 @@ def arrival_routine(ts, tdelta, fleet):
 
                 # The reserved charger is occupied by another EV
                 old_reservation_id = ev.reservation_id
-                old_reservation = reserved_cluster.re_dataset.loc[old_reservation_id]
+                old_reservation = reserved_cluster.reservations.record(
+                    old_reservation_id
+                )
 
                 # Look for another available charger with same characteristics (identical)
                 available_cus = reserved_cluster.query_availability(
@@ -115,15 +117,15 @@ def arrival_routine(ts, tdelta, fleet):
                     )
 
                     # Add the smart reservation details
-                    reserved_cluster.re_dataset.loc[
-                        ev.reservation_id, "Scheduled G2V"
-                    ] = old_reservation_scheduled_g2v
-                    reserved_cluster.re_dataset.loc[
-                        ev.reservation_id, "Scheduled V2G"
-                    ] = old_reservation_scheduled_v2g
-                    reserved_cluster.re_dataset.loc[
-                        ev.reservation_id, "Price V2G"
-                    ] = old_reservation_price
+                    reserved_cluster.reservations.set(
+                        ev.reservation_id, "Scheduled G2V", old_reservation_scheduled_g2v
+                    )
+                    reserved_cluster.reservations.set(
+                        ev.reservation_id, "Scheduled V2G", old_reservation_scheduled_v2g
+                    )
+                    reserved_cluster.reservations.set(
+                        ev.reservation_id, "Price", old_reservation_price
+                    )
 
                     # Enter the data of the EV to the connection dataset of the cluster
                     new_reserved_charger.connect(ts, ev)
@@ -137,7 +139,7 @@ def arrival_routine(ts, tdelta, fleet):
                     )
 
                     # Old reservation will be removed
-                    reserved_charger.unreserve(ts, old_reservation_id)
+                    reserved_cluster.unreserve(ts, old_reservation_id)
 
                     ev.admitted = True
 
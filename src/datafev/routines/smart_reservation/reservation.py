@@ -19,9 +19,11 @@
 # OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
 
 
+import numpy as np
 import pandas as pd
-from datafev.algorithms.cluster.pricing_rule import idp
+from datafev.algorithms.cluster.pricing_rule import idp_array
 from datafev.algorithms.vehicle.routing_milp import smart_routing
+from datafev.algorithms.vehicle import routing_enumeration
 
 
 def reservation_routine(
@@ -34,6 +36,7 @@ def reservation_routine(
     f_discount=0.001,
     f_markup=0.001,
     arbitrage_coeff=0.0,
+    candidate_enumeration=False,
 ):
     """
     This routine is executed to reserve chargers for the EVs approaching a multi-cluster system.
@@ -53,8 +56,8 @@ def reservation_routine(
         Multi-cluster system object.
     fleet : data_handling.fleet
         EV fleet object.
-    solver : pyomo.SolverFactory
-        Optimization solver.
+    solver : pyomo.SolverFactory, HighsSolver or PyomoSolver
+        Optimization solver (see datafev.algorithms.solver.create_solver).
     traffic_forecast : dict of dict
         Traffic forecast data.
     f_discount : dict of float, optional
@@ -63,6 +66,9 @@ def reservation_routine(
         Markup factor (to motivate load decrease) in dynamic pricing. The default is 0.05.
     arbitrage_coeff : float, optional
         Arbitrage coefficient to distinguish G2V/V2G prices. The default is 0.0.
+    candidate_enumeration : bool, optional
+        If True, the smart routing problem is solved per candidate charger with lower bound pruning
+        (datafev.algorithms.vehicle.routing_enumeration) instead of a single MILP. The default is False.
 
     Returns
     -------
@@ -72,6 +78,10 @@ def reservation_routine(
 
     reserving_vehicles = fleet.reserving_vehicles_at(ts)
 
+    # Schedules and price signals of the clusters per queried window. They are computed once per cluster and window,
+    # and discarded when a reservation changes the schedule of the cluster.
+    offers = {}
+
     for ev in reserving_vehicles:
         
         #print(ev.vehicle_id)
@@ -133,15 +143,48 @@ def reservation_routine(
             v2g_dps = {}
             arrtime_min = ev.t_arr_est + candidate_chargers["arrtime"].min() * tdelta
             deptime_max = ev.t_arr_est + candidate_chargers["deptime"].max() * tdelta
+            window = (arrtime_min, deptime_max)
+            unpriced = [
+                cc_id
+                for cc_id in candidate_chargers["cluster"].unique()
+                if window not in offers.setdefault(cc_id, {})
+            ]
+            if len(unpriced) > 0:
+                clusters = [system.clusters[cc_id] for cc_id in unpriced]
+                cc_schedule = np.array(
+                    [cc.query_actual_schedule(arrtime_min, deptime_max, tdelta).values for cc in clusters], dtype=float
+                )
+                tou_tariff = system.tou_price.loc[arrtime_min:deptime_max].values
+                cc_power_ub = [cc.upper_limit[arrtime_min:deptime_max].values for cc in clusters]
+                cc_power_lb = [cc.lower_limit[arrtime_min:deptime_max].values for cc in clusters]
+
+                # The price signals are calculated for the steps of the window
+                nb_of_steps = cc_schedule.shape[1]
+                if len(tou_tariff) != nb_of_steps:
+                    raise ValueError("The TOU tariff of the system does not cover the period from %s to %s" % window)
+                for cc, ub, lb in zip(clusters, cc_power_ub, cc_power_lb):
+                    if len(ub) != nb_of_steps or len(lb) != nb_of_steps:
+                        raise ValueError(
+                            "The power limits of %s do not cover the period from %s to %s" % ((cc.id,) + window)
+                        )
+                cc_power_ub = np.array(cc_power_ub, dtype=float)
+                cc_power_lb = np.array(cc_power_lb, dtype=float)
+
+                # Step 2.2.2 Execute dynamic pricing algorithm (for all clusters at once)
+                dlp = idp_array(cc_schedule, cc_power_ub, cc_power_lb, tou_tariff, f_discount, f_markup)
+                for n, cc_id in enumerate(unpriced):
+                    offers[cc_id][window] = (
+                        dict(enumerate(cc_power_ub[n].tolist())),
+                        dict(enumerate(cc_schedule[n].tolist())),
+                        dict(enumerate(dlp[n].tolist())),
+                        dict(enumerate((dlp[n] * (1 - arbitrage_coeff)).tolist())),
+                    )
+
             for cu_id in candidate_chargers.index:
 
                 cc_id = candidate_chargers.loc[cu_id, "cluster"]
-                cc = system.clusters[cc_id]
-                cc_power_ub = dict(enumerate(cc.upper_limit[arrtime_min:deptime_max].values))
-                cc_power_lb = dict(enumerate(cc.lower_limit[arrtime_min:deptime_max].values))
-                cc_schedule = dict(enumerate((cc.query_actual_schedule(arrtime_min, deptime_max, tdelta)).values))
-                tou_tariff = dict(enumerate((system.tou_price.loc[arrtime_min:deptime_max]).values))
-                           
+                cc_power_ub, cc_schedule, dlp, v2g_dlp = offers[cc_id][window]
+
                 # Step 2.2.1: Estimate the clusters' margins for additional charging load
                 delta_soc=0.0
                 for t in cc_schedule.keys():
@@ -153,18 +196,8 @@ def reservation_routine(
                 candidate_chargers.loc[cu_id,"tarsoc"]=min(candidate_chargers.loc[cu_id,"tarsoc"],
                                                             candidate_chargers.loc[cu_id,"arrsoc"]+delta_soc)
 
-                
-                #Step 2.2.2 Execute dynamic pricing algorithm
-                dlp = idp(
-                    cc_schedule,
-                    cc_power_ub,
-                    cc_power_lb,
-                    tou_tariff,
-                    f_discount,
-                    f_markup,
-                )
                 g2v_dps[cu_id] = dlp
-                v2g_dps[cu_id] = dict([(k, dlp[k] * (1 - arbitrage_coeff)) for k in sorted(dlp.keys())])
+                v2g_dps[cu_id] = v2g_dlp
                 
              
             ############################################################################
@@ -190,7 +223,11 @@ def reservation_routine(
             pch = candidate_chargers["max p_ch"].to_dict()
             pds = candidate_chargers["max p_ds"].to_dict()
 
-            p, s, selected_charger_id = smart_routing(
+            if candidate_enumeration:
+                routing = routing_enumeration.smart_routing
+            else:
+                routing = smart_routing
+            p, s, selected_charger_id = routing(
                 solver,
                 opt_horizon,
                 opt_step,
@@ -249,6 +286,7 @@ def reservation_routine(
                 
                 
             selected_cluster.reserve(res_at, res_from, res_until, ev, selected_charger, contract)
+            offers.pop(selected_cluster_id, None)
             
             ev.contract = contract
             ev.reserved = True
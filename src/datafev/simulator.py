@@ -0,0 +1,187 @@
+# The datafev framework
+
+# Copyright (C) 2022,
+# Institute for Automation of Complex Power Systems (ACS),
+# E.ON Energy Research Center (E.ON ERC),
+# RWTH Aachen University
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+# documentation files (the "Software"), to deal in the Software without restriction, including without limitation the
+# rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit
+# persons to whom the Software is furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of the
+# Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE
+# WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+# COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+# OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+from bisect import bisect_left
+
+
+class Simulator(object):
+    """
+    Event-driven simulation engine. The routines (e.g., departure,
+    reservation, arrival and charging routines) are executed in the order of
+    their registration at the time steps of the simulation horizon.
+
+    Time steps without any reservation, arrival or departure event and without
+    any EV connected to the chargers of the system are idle: the routines of
+    datafev do not change the simulation state at such steps. The simulator
+    jumps over idle periods to the next event.
+    """
+
+    def __init__(self, sim_horizon, fleet, system):
+        """
+        Simulators are defined by the simulation horizon and the simulated
+        fleet and multi-cluster system.
+
+        Parameters
+        ----------
+        sim_horizon : list or pd.date_range
+            Iterable object that contains time steps in the simulation horizon.
+        fleet : data_handling.fleet
+            EV fleet object.
+        system : data_handling.multi_cluster
+            Multi-cluster system object.
+
+        Returns
+        -------
+        None.
+
+        """
+
+        self.sim_horizon = list(sim_horizon)
+        self.fleet = fleet
+        self.system = system
+        self.routines = []
+
+        self.executed_steps = 0
+        self.skipped_steps = 0
+
+    def add_routine(self, routine, *args, **kwargs):
+        """
+        This method registers a routine to be executed at the simulated time
+        steps. The routine is called as routine(ts, *args, **kwargs).
+
+        Parameters
+        ----------
+        routine : function
+            Routine to execute.
+        *args :
+            Positional arguments passed to the routine after the time step.
+        **kwargs :
+            Keyword arguments passed to the routine.
+
+        Returns
+        -------
+        None.
+
+        """
+        self.routines.append((routine, args, kwargs))
+
+    def event_steps(self):
+        """
+        This method identifies the time steps at which an EV places a
+        reservation, arrives in or departs from a cluster.
+
+        Returns
+        -------
+        list
+            Positions of the event steps in the simulation horizon (sorted).
+
+        """
+
+        calendars = [
+            self.fleet.reserving_at,
+            self.fleet.incoming_at,
+            self.fleet.outgoing_at,
+        ]
+
+        events = []
+        for pos, ts in enumerate(self.sim_horizon):
+            for calendar in calendars:
+                if len(calendar.get(ts, [])) > 0:
+                    events.append(pos)
+                    break
+        return events
+
+    def is_idle(self):
+        """
+        This method checks whether no EV is connected to the chargers of the
+        system.
+
+        Returns
+        -------
+        bool
+            True if all chargers are free.
+
+        """
+        for cluster in self.system.clusters.values():
+            for cu in cluster.chargers.values():
+                if cu.connected_ev is not None:
+                    return False
+        return True
+
+    def step(self, ts):
+        """
+        This method executes the registered routines at a time step.
+
+        Parameters
+        ----------
+        ts : datetime.datetime
+            Current time.
+
+        Returns
+        -------
+        None.
+
+        """
+        for routine, args, kwargs in self.routines:
+            routine(ts, *args, **kwargs)
+
+    def run(self, skip_idle=True, verbose=False):
+        """
+        This method runs the simulation over the simulation horizon.
+
+        Parameters
+        ----------
+        skip_idle : bool, optional
+            If True, idle periods are skipped. Otherwise, the routines are
+            executed at every time step (fixed-step simulation).
+            The default is True.
+        verbose : bool, optional
+            If True, the simulated time steps are printed. The default is False.
+
+        Returns
+        -------
+        None.
+
+        """
+
+        events = self.event_steps()
+        nb_of_steps = len(self.sim_horizon)
+
+        pos = 0
+        while pos < nb_of_steps:
+
+            if skip_idle and self.is_idle():
+                # Nothing happens until the next event: jump to it
+                nb_of_past_events = bisect_left(events, pos)
+                if nb_of_past_events < len(events):
+                    next_event = events[nb_of_past_events]
+                else:
+                    next_event = nb_of_steps
+                self.skipped_steps += next_event - pos
+                pos = next_event
+                if pos == nb_of_steps:
+                    break
+
+            ts = self.sim_horizon[pos]
+            if verbose:
+                print("     Simulating time step:", ts)
+            self.step(ts)
+            self.executed_steps += 1
+            pos += 1
@@ -26,6 +26,7 @@ from pyomo.environ import SolverFactory
 from datafev.data_handling.fleet import EVFleet
 from datafev.data_handling.cluster import ChargerCluster
 from datafev.data_handling.multi_cluster import MultiClusterSystem
+from datafev.simulator import Simulator
 
 from datafev.routines.arrival import *
 from datafev.routines.departure import *
@@ -109,17 +110,19 @@ def main():
 
     print("Simulation started...")
 
-    for ts in sim_horizon:
-        print("     Simulating time step:", ts)
+    simulator = Simulator(sim_horizon, fleet, system)
 
-        # The departure routine for the EVs leaving the charger clusters
-        departure_routine(ts, fleet)
+    # The departure routine for the EVs leaving the charger clusters
+    simulator.add_routine(departure_routine, fleet)
 
-        # The arrival routine for the EVs incoming to the charger clusters
-        arrival_routine(ts, sim_step, fleet, system)
+    # The arrival routine for the EVs incoming to the charger clusters
+    simulator.add_routine(arrival_routine, sim_step, fleet, system)
 
-        # Real-time charging control of the charger clusters
-        charging_routine(ts, sim_step, system)
+    # Real-time charging control of the charger clusters
+    simulator.add_routine(charging_routine, sim_step, system)
+
+    # Time steps without events and connected EVs are skipped
+    simulator.run(verbose=True)
 
     print("Simulation finished...")
     print()
@@ -26,6 +26,7 @@ from pyomo.environ import SolverFactory
 from datafev.data_handling.fleet import EVFleet
 from datafev.data_handling.cluster import ChargerCluster
 from datafev.data_handling.multi_cluster import MultiClusterSystem
+from datafev.simulator import Simulator
 
 from datafev.routines.simple_reservation.reservation import *
 from datafev.routines.simple_reservation.arrival import *
@@ -139,20 +140,24 @@ def main():
 
     print("Simulation started...")
 
-    for ts in sim_horizon:
-        print("Simulating time step:", ts)
+    simulator = Simulator(sim_horizon, fleet, system)
 
-        # The departure routine for the EVs leaving the chargerg clusters
-        departure_routine(ts, fleet)
+    # The departure routine for the EVs leaving the chargerg clusters
+    simulator.add_routine(departure_routine, fleet)
 
-        # The reservation routine (including routing to a cluster in the multicluster system) for the EVs
-        reservation_routine(ts, sim_step, system, fleet, traffic_forecast)
+    # The reservation routine (including routing to a cluster in the multicluster system) for the EVs
+    simulator.add_routine(
+        reservation_routine, sim_step, system, fleet, traffic_forecast
+    )
+
+    # The arrival routine for the EVs incoming to the charger clusters
+    simulator.add_routine(arrival_routine, sim_step, fleet)
 
-        # The arrival routine for the EVs incoming to the charger clusters
-        arrival_routine(ts, sim_step, fleet)
+    # Real-time charging control of the charger clusters is based on the decentralized least laxity first
+    simulator.add_routine(charging_routine, sim_step, system)
 
-        # Real-time charging control of the charger clusters is based on the decentralized least laxity first
-        charging_routine(ts, sim_step, system)
+    # Time steps without events and connected EVs are skipped
+    simulator.run(verbose=True)
 
     print("Simulation finished...")
     print()
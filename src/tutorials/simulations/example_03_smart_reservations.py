@@ -21,11 +21,12 @@
 import os
 from datetime import datetime, timedelta
 import matplotlib.pyplot as plt
-from pyomo.environ import SolverFactory
+from datafev.algorithms.solver import create_solver
 
 from datafev.data_handling.fleet import EVFleet
 from datafev.data_handling.cluster import ChargerCluster
 from datafev.data_handling.multi_cluster import MultiClusterSystem
+from datafev.simulator import Simulator
 
 from datafev.routines.smart_reservation.reservation import *
 from datafev.routines.smart_reservation.arrival import *
@@ -115,14 +116,12 @@ def main():
     print()
 
     # Optimization parameters
-    solver = SolverFactory(
-        "cplex"
-    )  # Users have to declare an optimization solver that exists their file system
+    solver = create_solver()  # In-process HiGHS (e.g., create_solver("gurobi") for Gurobi)
     print(
         "The management strategy tested in this tutorial includes optimization algorithms"
     )
     print(
-        "The solver to solve the optimization problems must be defined by the user. This test uses cplex."
+        "The optimization problems are solved by the open-source solver HiGHS (in-process)."
     )
     print()
     print()
@@ -211,24 +210,37 @@ def main():
 
     print("Simulation started...")
 
-    for ts in sim_horizon:
-        print("Simulating time step:", ts)
-        
-        # The departure routine for the EVs leaving the chargerg clusters
-        departure_routine(ts, fleet)
+    simulator = Simulator(sim_horizon, fleet, system)
 
-        # The reservation routine (including routing to a cluster in the multicluster system) for the EVs
-        reservation_routine(
-            ts, sim_step, system, fleet, solver, traffic_forecast, arbitrage_coeff=0.1
-        )
+    # The departure routine for the EVs leaving the chargerg clusters
+    simulator.add_routine(departure_routine, fleet)
 
-        # The arrival routine for the EVs incoming to the charger clusters
-        arrival_routine(ts, sim_step, fleet)
+    # The reservation routine (including routing to a cluster in the multicluster system) for the EVs
+    simulator.add_routine(
+        reservation_routine,
+        sim_step,
+        system,
+        fleet,
+        solver,
+        traffic_forecast,
+        arbitrage_coeff=0.1,
+    )
+
+    # The arrival routine for the EVs incoming to the charger clusters
+    simulator.add_routine(arrival_routine, sim_step, fleet)
+
+    # Real-time charging control of the charger clusters is based on the decentralized MILP-based protocol
+    simulator.add_routine(
+        charging_routine,
+        sim_step,
+        timedelta(minutes=10),
+        system,
+        solver,
+        penalty_parameters,
+    )
 
-        # Real-time charging control of the charger clusters is based on the decentralized MILP-based protocol
-        charging_routine(
-            ts, sim_step, timedelta(minutes=10), system, solver, penalty_parameters
-        )
+    # Time steps without events and connected EVs are skipped
+    simulator.run(verbose=True)
 
     print("Simulation finished...")
     print()
@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+
+# Default distributions of the EV parameters: lists are sampled, tuples are
+# the bounds of uniform samples and other values are constant
+ev_parameters = {
+    "bcap": [40, 60],  # kWh
+    "inisoc": (0.2, 0.9),
+    "charge": (0.0, 0.5),  # Target SOC above the initial SOC (capped at 1)
+    "minsoc": 0.1,
+    "maxsoc": 1.0,
+    "eff": [0.9, 1.0],  # Charging and discharging efficiency
+    "pmax_pos": [11, 22],
+    "pmax_neg": [0, 11],
+    "deptime": [2, 5.5, 20],
+}
+
+
+def sample(rng, distribution, evs):
+    if isinstance(distribution, list):
+        return {v: float(rng.choice(distribution)) for v in evs}
+    if isinstance(distribution, tuple):
+        return {v: float(rng.uniform(*distribution)) for v in evs}
+    return dict.fromkeys(evs, float(distribution))
+
+
+def sample_evs(rng, evs, **distributions):
+    # Random parameters of the EVs. The items are in the order of the EV
+    # arguments of the cluster algorithms (e.g., rescheduling_milp). A
+    # 'tarsoc' distribution replaces the target SOCs relative to 'charge'.
+    distributions = dict(ev_parameters, **distributions)
+    bcap = sample(rng, distributions["bcap"], evs)
+    inisoc = sample(rng, distributions["inisoc"], evs)
+    if "tarsoc" in distributions:
+        tarsoc = sample(rng, distributions["tarsoc"], evs)
+    else:
+        charge = sample(rng, distributions["charge"], evs)
+        tarsoc = {v: min(1.0, inisoc[v] + charge[v]) for v in evs}
+    minsoc = sample(rng, distributions["minsoc"], evs)
+    maxsoc = sample(rng, distributions["maxsoc"], evs)
+    eff = sample(rng, distributions["eff"], evs)
+    return {
+        "bcap": {v: bcap[v] * 3600 for v in evs},
+        "inisoc": inisoc,
+        "tarsoc": tarsoc,
+        "minsoc": minsoc,
+        "maxsoc": maxsoc,
+        "ch_eff": eff,
+        "ds_eff": eff,
+        "pmax_pos": sample(rng, distributions["pmax_pos"], evs),
+        "pmax_neg": sample(rng, distributions["pmax_neg"], evs),
+        "deptime": sample(rng, distributions["deptime"], evs),
+    }
+
+
+@pytest.fixture
+def random_evs():
+    # Factory of random EV parameters: random_evs(rng, evs, **distributions)
+    return sample_evs
@@ -0,0 +1,108 @@
+from datetime import datetime, timedelta
+import numpy as np
+import pandas as pd
+from datafev.data_handling.charger import ChargingUnit, uncontrolled_supply
+from datafev.data_handling.vehicle import ElectricVehicle
+from datafev.data_handling.timeseries import StepSeries
+
+
+def test_power_records_with_gap():
+    cu = ChargingUnit("cu", 22, 22, 0.9)
+    step = timedelta(minutes=5)
+    t0 = datetime(2022, 1, 8, 8)
+
+    ev = ElectricVehicle("ev", 60)
+    ev.soc[t0] = 0.5
+    cu.connect(t0, ev)
+    cu.supply(t0, step, 11.0)
+    cu.supply(t0 + step, step, -9.0)
+    cu.disconnect(t0 + 2 * step)
+    ev.soc[t0 + 4 * step] = ev.soc[t0 + 2 * step]
+    cu.connect(t0 + 4 * step, ev)
+    cu.supply(t0 + 4 * step, step, 18.0)
+
+    # The steps without supply are NaN rows on the grid of the record
+    index = pd.date_range(t0, periods=5, freq=step)
+    pd.testing.assert_series_equal(
+        cu.supplied_power,
+        pd.Series([11.0, -9.0, np.nan, np.nan, 18.0], index=index),
+        check_freq=False,
+    )
+    pd.testing.assert_series_equal(
+        cu.consumed_power,
+        pd.Series([11.0 / 0.9, -9.0 * 0.9, np.nan, np.nan, 18.0 / 0.9], index=index),
+        check_freq=False,
+    )
+    assert cu.supplied_power.isna().sum() == 2
+
+    # A supply off the grid refines the grid of the record
+    off_grid = t0 + 4 * step + timedelta(minutes=1)
+    ev.soc[off_grid] = 0.5
+    cu.supply(off_grid, step, 4.0)
+    supplied = cu.supplied_power
+    assert len(supplied) == 22 and supplied.notna().sum() == 4
+    assert supplied[off_grid] == 4.0 and supplied[t0 + step] == -9.0
+
+
+def test_record_with_overflow():
+    # Records with a fixed buffer keep the values off the grid separately
+    step = timedelta(minutes=5)
+    t0 = datetime(2022, 1, 8, 8)
+    record = StepSeries(t0, step, buffer=np.full(3, np.nan))
+    record[t0] = 1.0
+    record[t0 + 2 * step] = 3.0
+    record[t0 + timedelta(minutes=7)] = 2.0  # Off the grid
+    record[t0 + 4 * step] = 5.0  # Beyond the buffer
+
+    expected = pd.Series(
+        [1.0, 2.0, 3.0, 5.0],
+        index=pd.DatetimeIndex(
+            [t0, t0 + timedelta(minutes=7), t0 + 2 * step, t0 + 4 * step]
+        ),
+    )
+    pd.testing.assert_series_equal(record.to_series(), expected, check_freq=False)
+    assert len(record) == 4 and record[t0 + timedelta(minutes=7)] == 2.0
+
+
+def test_uncontrolled_supply_matches_chargers():
+    rng = np.random.default_rng(0)
+    step = timedelta(minutes=5)
+    t0 = datetime(2022, 1, 8, 8)
+    table = pd.DataFrame(
+        {
+            "SOC_LB": [0.0, 0.5, 0.8],
+            "SOC_UB": [0.5, 0.8, 1.01],
+            "P_LB": [0.0, 0.0, 0.0],
+            "P_UB": [50.0, 20.0, 7.0],
+        }
+    )
+
+    def chargers(seed):
+        # Chargers with mixed efficiencies connected to EVs with full
+        # batteries and with power-SOC dependency
+        rng = np.random.default_rng(seed)
+        chargers = []
+        for n in range(40):
+            cu = ChargingUnit("cu%d" % n, float(rng.choice([7.0, 11.0, 22.0, 50.0])), 22.0, float(rng.choice([0.9, 0.95, 1.0])))
+            ev = ElectricVehicle("ev%d" % n, float(rng.uniform(20, 100)), pow_soc_table=table if rng.random() < 0.5 else None)
+            ev.soc[t0] = 1.0 if rng.random() < 0.2 else float(rng.uniform(0.0, 1.0))
+            cu.connect(t0, ev)
+            chargers.append(cu)
+        return chargers
+
+    for seed in rng.integers(0, 1000, 5):
+        reference = chargers(seed)
+        vectorized = chargers(seed)
+        for n in range(12):
+            ts = t0 + n * step
+            for cu in reference:
+                cu.uncontrolled_supply(ts, step)
+            uncontrolled_supply(ts, step, vectorized)
+
+        for cu_ref, cu in zip(reference, vectorized):
+            for record in ("supplied_power", "consumed_power"):
+                np.testing.assert_array_equal(getattr(cu, record).values, getattr(cu_ref, record).values)
+            np.testing.assert_array_equal(
+                cu.connected_ev.soc.to_series().values, cu_ref.connected_ev.soc.to_series().values
+            )
+        assert any(cu.connected_ev.soc[t0] == 1.0 for cu in reference)
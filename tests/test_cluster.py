@@ -0,0 +1,72 @@
+from datetime import datetime, timedelta
+import numpy as np
+import pandas as pd
+from datafev.data_handling.cluster import ChargerCluster
+from datafev.data_handling.vehicle import ElectricVehicle
+
+
+def reference_schedule(cluster, start, end, step):
+    # Aggregate schedule computed from the schedules of the chargers
+    time_index = pd.date_range(start=start, end=end, freq=step)
+    cc_sch = pd.Series(0.0, index=time_index)
+    for cu in cluster.chargers.values():
+        if cu.connected_ev is None:
+            continue
+        cu_sch = cu.schedule_pow[cu.active_schedule_instance].reindex(time_index)
+        cu_sch = cu_sch.fillna(method="ffill").fillna(0.0)
+        cu_sch[time_index > cu.connected_ev.t_dep_est] = 0.0
+        cu_sch[cu_sch > 0] = cu_sch[cu_sch > 0] / cu.eff
+        cu_sch[cu_sch < 0] = cu_sch[cu_sch < 0] * cu.eff
+        cc_sch += cu_sch
+    return cc_sch
+
+
+def test_query_actual_schedule():
+    rng = np.random.default_rng(0)
+    step = timedelta(minutes=5)
+    start = datetime(2022, 1, 8, 7)
+    topology = pd.DataFrame(
+        {
+            "cu_id": ["cu%d" % n for n in range(4)],
+            "cu_p_ch_max (kW)": 22.0,
+            "cu_p_ds_max (kW)": 22.0,
+            "cu_eff": [1.0, 0.95, 0.9, 1.0],
+        }
+    )
+
+    def schedule(cu, ts):
+        index = pd.date_range(ts, cu.connected_ev.t_dep_est - step * int(rng.integers(-2, 5)), freq=step)
+        cu.set_schedule(
+            ts,
+            pd.Series(rng.uniform(-11, 22, len(index)), index=index),
+            pd.Series(0.5, index=index),
+        )
+
+    for _ in range(10):
+        cluster = ChargerCluster("cc", topology)
+        for n, cu in enumerate(cluster.chargers.values()):
+            ev = ElectricVehicle("ev%d" % n, 60)
+            ev.t_dep_est = start + step * int(rng.integers(6, 30))
+            arrival = start + step * int(rng.integers(0, 6))
+            cu.connect(arrival, ev)
+            schedule(cu, arrival)
+
+        # Rescheduling and disconnection update the schedule of the cluster
+        chargers = list(cluster.chargers.values())
+        schedule(chargers[0], start + step * 3)
+        chargers[1].disconnect(start + step * 4)
+
+        # Windows on the grid of the schedules (also starting after the ends
+        # of the schedules) and windows off the grid
+        windows = [(start + step * first, start + step * (first + 12), step) for first in (-3, 0, 10, 25)]
+        windows += [
+            (start + timedelta(minutes=2), start + timedelta(hours=1), step),
+            (start, start + timedelta(hours=2), timedelta(minutes=10)),
+        ]
+        for window in windows:
+            pd.testing.assert_series_equal(
+                cluster.query_actual_schedule(*window),
+                reference_schedule(cluster, *window),
+                check_dtype=False,
+                check_freq=False,
+            )
@@ -0,0 +1,165 @@
+import numpy as np
+import pytest
+from datafev.algorithms.solver import create_solver
+from datafev.algorithms.cluster import (
+    rescheduling_milp,
+    potentialEstimationG2V_milp,
+    potentialEstimationV2G_milp,
+)
+from datafev.algorithms.cluster.rescheduling_aggregation import objective
+from datafev.algorithms.multi_cluster import rescheduling_milp as multi_cluster_milp
+from datafev.algorithms.vehicle import (
+    routing_milp,
+    scheduling_lp,
+    scheduling_milp,
+    scheduling_capacity_constrained_milp,
+)
+
+# In-process HiGHS (matrix models) and HiGHS through Pyomo
+solvers = [
+    create_solver("highs", mip_rel_gap=1e-9),
+    create_solver("appsi_highs", mip_rel_gap=1e-9),
+]
+
+
+def test_cluster_models(random_evs):
+    rng = np.random.default_rng(0)
+    opt_horizon = list(range(9))
+    steps = opt_horizon[:-1]
+    for _ in range(10):
+        evs = ["ev%d" % n for n in range(int(rng.integers(2, 7)))]
+        ev_data = tuple(
+            random_evs(rng, evs, inisoc=(0.2, 0.6), deptime=[2, 5.5, len(steps) + 5]).values()
+        )
+        upperlimit = dict(zip(steps, rng.uniform(10, 60, len(steps)).tolist()))
+        lowerlimit = dict.fromkeys(steps, -20.0)
+        tolerance = float(rng.choice([0.0, 5.0]))
+
+        values = []
+        for solver in solvers:
+            p, s = rescheduling_milp.reschedule(
+                solver, 900, opt_horizon, upperlimit, lowerlimit, tolerance, *ev_data, 1, 0.5
+            )
+            rescheduling = objective(
+                opt_horizon, upperlimit, lowerlimit, ev_data[0], ev_data[2], ev_data[5], ev_data[6], 1, 0.5, p, s
+            )
+            g2v = potentialEstimationG2V_milp.calculate_G2V_potential(
+                solver, 900, opt_horizon, *ev_data[:3], *ev_data[3:]
+            )[2]
+            v2g = potentialEstimationV2G_milp.calculate_V2G_potential(
+                solver, 900, opt_horizon, *ev_data[:3], *ev_data[3:]
+            )[2]
+            values.append((rescheduling, sum(g2v.values()), sum(v2g.values())))
+        assert values[0] == pytest.approx(values[1], abs=1e-5)
+
+
+def test_multi_cluster_model(random_evs):
+    rng = np.random.default_rng(1)
+    opt_horizon = list(range(7))
+    steps = opt_horizon[:-1]
+    clusters = ["cc1", "cc2"]
+    for _ in range(5):
+        evs = ["ev%d" % n for n in range(6)]
+        location = {v: (clusters[n % 2], "cu%d" % n) for n, v in enumerate(evs)}
+        ev_data = tuple(
+            random_evs(rng, evs, inisoc=(0.2, 0.6), deptime=[2, 5.5, len(steps) + 5]).values()
+        )
+        upperlimits = {c: dict.fromkeys(steps, float(rng.uniform(10, 40))) for c in clusters}
+        lowerlimits = {c: dict.fromkeys(steps, -20.0) for c in clusters}
+        rho_eps = {c: float(rng.choice([0.1, 1.0])) for c in clusters}
+        system_upperlimit = dict.fromkeys(steps, float(rng.uniform(20, 60)))
+
+        values = []
+        for solver in solvers:
+            p, s = multi_cluster_milp.reschedule(
+                solver,
+                900,
+                opt_horizon,
+                *ev_data,
+                location,
+                system_upperlimit,
+                dict.fromkeys(steps, -100.0),
+                clusters,
+                upperlimits,
+                lowerlimits,
+                dict.fromkeys(clusters, 5.0),
+                dict.fromkeys(clusters, 1.0),
+                rho_eps,
+            )
+            cost = 0.0
+            for c in clusters:
+                members = [v for v in evs if location[v][0] == c]
+                cost += objective(
+                    opt_horizon,
+                    upperlimits[c],
+                    lowerlimits[c],
+                    *[{v: d[v] for v in members} for d in (ev_data[0], ev_data[2], ev_data[5], ev_data[6])],
+                    1,
+                    rho_eps[c],
+                    {v: p[v] for v in members},
+                    {v: s[v] for v in members},
+                )
+            values.append(cost)
+        assert values[0] == pytest.approx(values[1], abs=1e-5)
+
+
+def test_vehicle_models():
+    rng = np.random.default_rng(2)
+    for _ in range(10):
+        nb_of_steps = int(rng.integers(4, 16))
+        opt_horizon = list(range(nb_of_steps + 1))
+        steps = opt_horizon[:-1]
+        inisoc = float(rng.uniform(0.2, 0.5))
+        tarsoc = float(rng.uniform(0.6, 0.9))
+        price = dict(enumerate(rng.uniform(0.2, 0.8, nb_of_steps).tolist()))
+        v2g_price = {t: 0.9 * price[t] for t in steps}
+        clusters = ["C%d" % c for c in range(int(rng.integers(1, 4)))]
+        routing_args = (
+            opt_horizon,
+            900,
+            50 * 3600.0,
+            100 * 3600.0,
+            tarsoc,
+            0.1,
+            1.0,
+            0.2,
+            nb_of_steps,
+            {c: int(rng.integers(0, 2)) for c in clusters},
+            {c: nb_of_steps for c in clusters},
+            {c: float(rng.uniform(0.3, 0.5)) for c in clusters},
+            {c: float(rng.choice([22, 50])) for c in clusters},
+            {c: float(rng.choice([0, 22])) for c in clusters},
+            {c: dict(enumerate(rng.uniform(0.2, 0.8, nb_of_steps).tolist())) for c in clusters},
+            {c: dict(enumerate(rng.uniform(0.2, 0.8, nb_of_steps).tolist())) for c in clusters},
+        )
+        upperlimit = dict(zip(steps, rng.uniform(0, 22, nb_of_steps).tolist()))
+        lowerlimit = dict(zip(steps, rng.uniform(-22, 0, nb_of_steps).tolist()))
+        penalty = dict.fromkeys(steps, 1.0)
+
+        values = []
+        for solver in solvers:
+            p = scheduling_lp.minimize_cost(
+                solver, 900, opt_horizon, 50 * 3600.0, tarsoc, 0.1, 1.0, 0.2, 2, inisoc, 22.0, 11.0, price
+            )[0]
+            lp_cost = sum(p[t] * price[t] for t in steps)
+
+            p = scheduling_milp.minimize_cost(
+                solver, 900, opt_horizon, 50 * 3600.0, 10 * 3600.0, tarsoc, 0.1, 1.0, 0.2, 2, inisoc, 22.0, 11.0,
+                price, v2g_price,
+            )[0]
+            milp_cost = sum(max(p[t], 0) * price[t] + min(p[t], 0) * v2g_price[t] for t in steps)
+
+            p, _, c = routing_milp.smart_routing(solver, *routing_args)
+            g2v, v2g = routing_args[-2][c], routing_args[-1][c]
+            routing_cost = sum(max(p[t], 0) * g2v[t] + min(p[t], 0) * v2g[t] for t in steps)
+
+            p, s = scheduling_capacity_constrained_milp.maximum_final_soc(
+                solver, 900, opt_horizon, 50 * 3600.0, tarsoc, 10 * 3600.0, 0.1, 1.0, inisoc, 22.0, 11.0,
+                upperlimit, lowerlimit, penalty, penalty,
+            )
+            capacity_cost = sum(
+                (max(p[t] - upperlimit[t], 0) + max(lowerlimit[t] - p[t], 0)) * 900 + 0.0001 * (tarsoc - s[t])
+                for t in steps
+            )
+            values.append((lp_cost, milp_cost, routing_cost, capacity_cost))
+        assert values[0] == pytest.approx(values[1], abs=1e-5)
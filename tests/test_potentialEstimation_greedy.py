@@ -0,0 +1,63 @@
+import numpy as np
+import pytest
+from datafev.algorithms.solver import create_solver
+from datafev.algorithms.cluster import potentialEstimation_greedy as greedy
+from datafev.algorithms.cluster.potentialEstimationG2V_milp import calculate_G2V_potential
+from datafev.algorithms.cluster.potentialEstimationV2G_milp import calculate_V2G_potential
+
+
+def random_cluster(rng, random_evs, nb_of_evs=6, nb_of_steps=12):
+    evs = random_evs(rng, ["ev%d" % n for n in range(nb_of_evs)], charge=0.2)
+    return (900, list(range(nb_of_steps + 1))) + tuple(evs.values())
+
+
+def assert_feasible(args, p, s, c):
+    # The trajectories respect the constraints of the MILP estimators at
+    # every step
+    (opt_step, opt_horizon, bcap, inisoc, _, minsoc, maxsoc, ch_eff, ds_eff,
+     pmax_pos, pmax_neg, deptime) = args
+    steps = opt_horizon[:-1]
+    for v in bcap:
+        assert s[v][0] == inisoc[v]
+        assert s[v][opt_horizon[-1]] >= -1e-9
+        for t in steps:
+            assert minsoc[v] - 1e-9 <= s[v][t] <= maxsoc[v] + 1e-9
+            assert -pmax_neg[v] - 1e-9 <= p[v][t] <= pmax_pos[v] + 1e-9
+            if t >= deptime[v]:
+                assert p[v][t] == 0.0
+            assert s[v][t + 1] == pytest.approx(s[v][t] + p[v][t] * opt_step / bcap[v], abs=1e-12)
+    for t in steps:
+        consumption = sum(
+            p[v][t] / ch_eff[v] if p[v][t] > 0 else p[v][t] * ds_eff[v] for v in bcap
+        )
+        assert c[t] == pytest.approx(consumption, abs=1e-9)
+
+
+def test_potentials_match_milp(random_evs):
+    solver = create_solver("highs")
+    rng = np.random.default_rng(0)
+    for _ in range(40):
+        args = random_cluster(rng, random_evs)
+        v2g_milp = sum(calculate_V2G_potential(solver, *args)[2].values())
+        v2g = greedy.calculate_V2G_potential(*args)
+        assert_feasible(args, *v2g)
+        v2g_greedy = sum(v2g[2].values())
+        assert v2g_greedy == pytest.approx(v2g_milp, abs=1e-6)
+
+        g2v_milp = sum(calculate_G2V_potential(solver, *args)[2].values())
+        g2v = greedy.calculate_G2V_potential(*args)
+        assert_feasible(args, *g2v)
+        g2v_greedy = sum(g2v[2].values())
+        if greedy.is_G2V_exact(args[7], args[8], args[10]):
+            assert g2v_greedy == pytest.approx(g2v_milp, abs=1e-6)
+        else:
+            assert g2v_greedy <= g2v_milp + 1e-6
+
+
+def test_infeasible_initial_soc(random_evs):
+    args = list(random_cluster(np.random.default_rng(1), random_evs))
+    args[3] = dict(args[3], ev0=0.05)
+    with pytest.raises(ValueError):
+        greedy.calculate_G2V_potential(*args)
+    with pytest.raises(ValueError):
+        greedy.calculate_V2G_potential(*args)
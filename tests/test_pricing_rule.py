@@ -0,0 +1,55 @@
+import numpy as np
+import pandas as pd
+from datafev.algorithms.cluster.pricing_rule import idp, idp_array
+
+
+def pandas_idp(schedule, upper_bound, lower_bound, tou_tariff, f_discount, f_markup):
+    # Former pandas implementation of idp
+    sc = pd.Series(schedule)
+    ub = pd.Series(upper_bound)
+    lb = pd.Series(lower_bound)
+    kappa = pd.Series(tou_tariff)
+    kappa_L = kappa.min()
+    kappa_U = kappa.max()
+
+    overloadedsteps = sc[sc >= ub].index
+    underloadedsteps = sc[sc < lb].index
+
+    ome = kappa.copy()
+    ome[underloadedsteps] = kappa_L - f_discount * (
+        lb[underloadedsteps] - sc[underloadedsteps]
+    )
+    ome[overloadedsteps] = kappa_U + f_markup * (sc - ub)[overloadedsteps]
+
+    return ome.to_dict()
+
+
+def test_idp_array_matches_pandas():
+    rng = np.random.default_rng(0)
+    for _ in range(50):
+        nb_of_cc = int(rng.integers(1, 6))
+        nb_of_steps = int(rng.integers(1, 30))
+
+        # Rounded values to include schedules at the bounds
+        schedule = rng.integers(-20, 90, (nb_of_cc, nb_of_steps)).astype(float)
+        upper_bound = rng.integers(40, 80, (nb_of_cc, nb_of_steps)).astype(float)
+        lower_bound = rng.integers(-20, 40, (nb_of_cc, nb_of_steps)).astype(float)
+        tou_tariff = rng.uniform(0.2, 0.8, nb_of_steps)
+        f_discount = rng.uniform(0.01, 0.1, nb_of_cc)
+        f_markup = rng.uniform(0.01, 0.1, nb_of_cc)
+
+        ome = idp_array(schedule, upper_bound, lower_bound, tou_tariff, f_discount, f_markup)
+        for n in range(nb_of_cc):
+            inputs = [
+                dict(enumerate(row))
+                for row in (schedule[n], upper_bound[n], lower_bound[n], tou_tariff)
+            ]
+            expected = pandas_idp(*inputs, f_discount[n], f_markup[n])
+            assert ome[n].tolist() == [expected[t] for t in range(nb_of_steps)]
+            assert idp(*inputs, f_discount[n], f_markup[n]) == expected
+
+        # Factors shared by the clusters
+        ome = idp_array(schedule, upper_bound, lower_bound, tou_tariff, 0.05, 0.07)
+        for n in range(nb_of_cc):
+            expected = pandas_idp(schedule[n], upper_bound[n], lower_bound[n], tou_tariff, 0.05, 0.07)
+            assert ome[n].tolist() == list(expected.values())
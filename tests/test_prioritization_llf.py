@@ -0,0 +1,107 @@
+import numpy as np
+import pandas as pd
+import pytest
+from datafev.data_handling.power_soc import PowerSOCCurve
+from datafev.algorithms.cluster.prioritization_llf import (
+    leastlaxityfirst,
+    leastlaxityfirst_array,
+)
+
+tables = [
+    {
+        0: {"SOC_LB": 0.0, "SOC_UB": 0.5, "P_UB": 50},
+        1: {"SOC_LB": 0.5, "SOC_UB": 0.7, "P_UB": 40},
+        2: {"SOC_LB": 0.7, "SOC_UB": 1.0001, "P_UB": 30},
+    },
+    {
+        0: {"SOC_LB": 0.0, "SOC_UB": 0.3, "P_UB": 11},
+        1: {"SOC_LB": 0.3, "SOC_UB": 0.8, "P_UB": 22},
+        2: {"SOC_LB": 0.8, "SOC_UB": 1.0001, "P_UB": 7},
+    },
+]
+curves = [PowerSOCCurve(pd.DataFrame(table).T) for table in tables]
+
+
+def reference(inisoc, tarsoc, bcap, efficiency, p_socdep, p_chmax, p_re, leadtime, upperlimit):
+    # Least-laxity-first allocation computed one EV at a time
+    laxity = {}
+    for v in inisoc:
+        t_min = 0.0
+        curve = p_socdep[v]
+        if inisoc[v] < tarsoc[v] and curve is None:
+            t_min = (tarsoc[v] - inisoc[v]) * bcap[v] / p_chmax[v]
+        elif inisoc[v] < tarsoc[v]:
+            if isinstance(curve, dict):
+                curve = PowerSOCCurve(pd.DataFrame(curve).T)
+            for r in range(curve.locate(inisoc[v]), curve.locate(tarsoc[v]) + 1):
+                soc_range = min(curve.soc_ub[r], tarsoc[v]) - max(curve.soc_lb[r], inisoc[v])
+                t_min += soc_range * bcap[v] / min(curve.p_ub[r], p_chmax[v])
+        laxity[v] = 1 - t_min / leadtime[v]
+
+    p_charge = {}
+    margin = upperlimit
+    for v in sorted(laxity, key=laxity.get):
+        p_charge[v] = min(p_re[v] / efficiency[v], margin) * efficiency[v]
+        margin -= p_charge[v] / efficiency[v]
+    return p_charge
+
+
+def random_cluster(rng, random_evs, nb_of_evs):
+    evs = ["ev%d" % n for n in range(nb_of_evs)]
+    ev_data = random_evs(
+        rng, evs, bcap=(30, 80), inisoc=(0.1, 0.95), tarsoc=[0.8, 0.9, 1.0], pmax_pos=[11, 22, 50]
+    )
+    inisoc = ev_data["inisoc"]
+    tarsoc = ev_data["tarsoc"]
+    p_chmax = ev_data["pmax_pos"]
+    return (
+        inisoc,
+        tarsoc,
+        ev_data["bcap"],
+        ev_data["ch_eff"],
+        {v: [None, curves[0], curves[1], tables[0]][int(rng.integers(0, 4))] for v in evs},
+        p_chmax,
+        {v: 0.0 if inisoc[v] >= tarsoc[v] else float(rng.uniform(0, p_chmax[v])) for v in evs},
+        {v: float(rng.integers(300, 20000)) for v in evs},
+    )
+
+
+def test_leastlaxityfirst_matches_reference(random_evs):
+    rng = np.random.default_rng(0)
+    for n in range(200):
+        nb_of_evs = int(rng.integers(1, 30))
+        args = random_cluster(rng, random_evs, nb_of_evs)
+        upperlimit = float(rng.uniform(-10, 30 * nb_of_evs) if n % 5 else rng.uniform(-10, 0))
+        p_charge = leastlaxityfirst(*args, upperlimit)
+        expected = reference(*args, upperlimit)
+        assert p_charge.keys() == expected.keys()
+        for v in expected:
+            assert p_charge[v] == pytest.approx(expected[v], abs=1e-9)
+
+
+def test_array_matches_per_cluster(random_evs):
+    rng = np.random.default_rng(1)
+    clusters = [random_cluster(rng, random_evs, int(rng.integers(1, 20))) for _ in range(10)]
+    upperlimit = rng.uniform(0, 200, len(clusters))
+    merged = [
+        [value for args in clusters for value in args[k].values()]
+        for k in range(8)
+    ]
+    cluster = np.repeat(np.arange(len(clusters)), [len(args[0]) for args in clusters])
+    p_socdep = [
+        PowerSOCCurve(pd.DataFrame(curve).T) if isinstance(curve, dict) else curve
+        for curve in merged[4]
+    ]
+    p_charge = leastlaxityfirst_array(
+        *[np.array(merged[k]) for k in range(4)],
+        p_socdep,
+        *[np.array(merged[k]) for k in range(5, 8)],
+        upperlimit,
+        cluster,
+    )
+    expected = [
+        reference(*args, float(limit))[v]
+        for args, limit in zip(clusters, upperlimit)
+        for v in args[0]
+    ]
+    assert p_charge == pytest.approx(np.array(expected), abs=1e-9)
@@ -0,0 +1,110 @@
+import numpy as np
+import pytest
+from datafev.algorithms.solver import create_solver
+from datafev.algorithms.matrix_form import NoSolutionError
+from datafev.algorithms.multi_cluster.rescheduling_decomposition import reschedule
+from datafev.algorithms.multi_cluster import rescheduling_milp
+
+opt_horizon = list(range(9))
+steps = opt_horizon[:-1]
+clusters = ["cc1", "cc2", "cc3"]
+evs = ["ev%d" % n for n in range(9)]
+location = {v: (clusters[n % 3], "cu%d" % n) for n, v in enumerate(evs)}
+
+
+def random_problem(rng, random_evs, upperlimit, cluster_lowerlimit=0.0):
+    # Arguments of the rescheduling problem of a system with three clusters
+    ev_data = random_evs(
+        rng,
+        evs,
+        bcap=60,
+        inisoc=(0.2, 0.5),
+        tarsoc=(0.7, 1.0),
+        minsoc=0.0,
+        pmax_pos=22,
+        pmax_neg=0,
+        deptime=[4, 10],
+    )
+    return (900, opt_horizon) + tuple(ev_data.values()) + (
+        location,
+        dict.fromkeys(steps, upperlimit),
+        dict.fromkeys(steps, 0.0),
+        clusters,
+        {c: dict.fromkeys(steps, 60.0) for c in clusters},
+        {c: dict.fromkeys(steps, cluster_lowerlimit) for c in clusters},
+        dict.fromkeys(clusters, 10.0),
+        dict.fromkeys(clusters, 1.0),
+        dict.fromkeys(clusters, 1.0),
+    )
+
+
+def objective(problem, p, s):
+    # Objective of the rescheduling problem (deviations from the target SOCs
+    # and violations of the cluster limits)
+    (_, _, bcap, _, tarsoc, _, _, ch_eff, ds_eff, _, _, _, _, _, _, _,
+     upperlimits, lowerlimits, _, rho_y, rho_eps) = problem
+    cost = 0.0
+    for c in clusters:
+        evs_c = [v for v in evs if location[v][0] == c]
+        consumption = [
+            sum(p[v][t] / ch_eff[v] if p[v][t] > 0 else p[v][t] * ds_eff[v] for v in evs_c)
+            for t in steps
+        ]
+        violation = max(
+            [0.0]
+            + [consumption[t] - upperlimits[c][t] for t in steps]
+            + [lowerlimits[c][t] - consumption[t] for t in steps]
+        )
+        cost += rho_eps[c] * violation
+        cost += sum(rho_y[c] * abs(tarsoc[v] - s[v][opt_horizon[-1]]) * bcap[v] / 3600 for v in evs_c)
+    return cost
+
+
+def test_system_limits_respected_after_first_pass(random_evs):
+    solver = create_solver("highs")
+    rng = np.random.default_rng(0)
+    for max_iterations in (1, 2, 10):
+        for _ in range(5):
+            upperlimit = float(rng.uniform(40, 80))
+            problem = random_problem(rng, random_evs, upperlimit)
+            statistics = {}
+            p, s = reschedule(
+                solver, *problem, max_iterations=max_iterations, statistics=statistics
+            )
+
+            # The clusters with their own limits violate the system limit
+            assert statistics["Primal Residual"][0] > 1e-3
+            assert 2 <= statistics["Iterations"] <= max(max_iterations, 2)
+            eff = problem[7]
+            consumption = [sum(p[v][t] / eff[v] for v in evs) for t in steps]
+            assert max(consumption) <= upperlimit + 1e-6
+
+
+def test_objective_gap_to_milp(random_evs):
+    solver = create_solver("highs", mip_rel_gap=1e-9)
+    rng = np.random.default_rng(1)
+    gaps = []
+    for _ in range(5):
+        problem = random_problem(rng, random_evs, float(rng.uniform(40, 80)))
+        decomposed = objective(problem, *reschedule(solver, *problem))
+        optimal = objective(problem, *rescheduling_milp.reschedule(solver, *problem))
+
+        # The decomposition is a restriction of the problem of the system
+        assert decomposed >= optimal - 1e-6
+        gaps.append((decomposed - optimal) / max(optimal, 1e-6))
+
+    # Relative gap of the decomposition to the optimum of the system problem
+    assert max(gaps) < 0.05
+
+
+def test_violated_system_limits_raise(random_evs):
+    # The EVs can absorb 45 kW per cluster on average: the lower limits of the
+    # clusters are met with their violation tolerance only and their sum
+    # exceeds the system limit
+    solver = create_solver("highs")
+    problem = list(random_problem(np.random.default_rng(2), random_evs, 100.0, cluster_lowerlimit=50.0))
+    problem[3] = dict.fromkeys(evs, 0.5)
+    problem[7] = problem[8] = dict.fromkeys(evs, 1.0)
+    problem[11] = dict.fromkeys(evs, 10.0)
+    with pytest.raises(NoSolutionError):
+        reschedule(solver, *problem)
@@ -0,0 +1,55 @@
+import numpy as np
+from datafev.algorithms.solver import create_solver
+from datafev.algorithms.cluster.rescheduling_milp import reschedule, presolve
+from datafev.algorithms.cluster.rescheduling_aggregation import objective
+
+
+def test_presolve_keeps_optimum(random_evs):
+    # Binding limits with violation tolerance, V2G, departed EVs, lossy chargers
+    solver = create_solver("highs")
+    rng = np.random.default_rng(0)
+    opt_horizon = list(range(13))
+    steps = opt_horizon[:-1]
+    for _ in range(60):
+        evs = ["ev%d" % n for n in range(rng.integers(3, 10))]
+        ev_data = random_evs(
+            rng,
+            evs,
+            bcap=[40, 60, 80],
+            charge=(-0.1, 0.6),
+            eff=[0.85, 0.95, 1.0],
+            pmax_neg=[0, 0, 11],
+            deptime=[-1, 0.5, 3, 6, 20],
+        )
+        upperlimit = dict.fromkeys(steps, float(rng.uniform(10, 150)))
+        lowerlimit = dict.fromkeys(steps, float(rng.choice([-100.0, 5.0])))
+        tolerance = float(rng.choice([0.0, 5.0]))
+        rho_eps = float(rng.choice([0.1, 1.0]))
+
+        try:
+            p, s = reschedule(
+                solver, 900, opt_horizon, upperlimit, lowerlimit, tolerance,
+                *ev_data.values(), 1, rho_eps,
+            )
+        except RuntimeError:
+            # The lower limit cannot be met
+            continue
+
+        p_fixed, s_fixed, upper, lower = presolve(
+            900, opt_horizon, upperlimit, lowerlimit, *ev_data.values()
+        )
+        rest = [v for v in evs if v not in p_fixed]
+        p_rest, s_rest = {}, {}
+        if len(rest) > 0:
+            p_rest, s_rest = reschedule(
+                solver, 900, opt_horizon, upper, lower, tolerance,
+                *[{v: d[v] for v in rest} for d in ev_data.values()], 1, rho_eps,
+            )
+        p_rest.update(p_fixed)
+        s_rest.update(s_fixed)
+
+        args = (
+            opt_horizon, upperlimit, lowerlimit, ev_data["bcap"], ev_data["tarsoc"],
+            ev_data["ch_eff"], ev_data["ds_eff"], 1, rho_eps,
+        )
+        assert abs(objective(*args, p_rest, s_rest) - objective(*args, p, s)) < 1e-6
@@ -0,0 +1,43 @@
+from datetime import datetime, timedelta
+import numpy as np
+from datafev.data_handling.reservation import ReservationIndex
+
+
+def test_reservation_index_matches_steps():
+    rng = np.random.default_rng(0)
+    step = timedelta(minutes=5)
+    t0 = datetime(2022, 1, 8, 7)
+    cu_ids = ["cu%d" % n for n in range(4)]
+
+    index = ReservationIndex()
+    for cu_id in cu_ids:
+        index.add_cu(cu_id)
+    reservations = {}  # Active reservations: id -> (charger, first step, end step)
+
+    def blocked(cu_id, first, last):
+        # A reservation blocks the steps from its start until one step before its end
+        return any(
+            res_cu == cu_id and res_first <= t < res_end
+            for res_cu, res_first, res_end in reservations.values()
+            for t in range(first, last + 1)
+        )
+
+    for reservation_id in range(300):
+        if reservations and rng.random() < 0.4:
+            removed = int(rng.choice(list(reservations)))
+            index.remove(removed)
+            del reservations[removed]
+        else:
+            cu_id = cu_ids[int(rng.integers(len(cu_ids)))]
+            first = int(rng.integers(0, 100))
+            end = first + int(rng.integers(0, 12))  # Also periods without steps
+            index.add(reservation_id, cu_id, t0 + first * step, t0 + end * step)
+            reservations[reservation_id] = (cu_id, first, end)
+
+        for _ in range(5):
+            first = int(rng.integers(-5, 110))
+            last = first + int(rng.integers(-1, 15))  # Also empty queried periods
+            query = (t0 + first * step, t0 + last * step, step)
+            expected = [not blocked(cu_id, first, last) for cu_id in cu_ids]
+            assert index.available(*query).tolist() == expected
+            assert [index.is_available(cu_id, *query) for cu_id in cu_ids] == expected
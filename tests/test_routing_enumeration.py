@@ -0,0 +1,64 @@
+import numpy as np
+import pytest
+from datafev.algorithms.solver import create_solver
+from datafev.algorithms.matrix_form import NoSolutionError
+from datafev.algorithms.vehicle import routing_milp, routing_enumeration
+
+
+def cost(p, cluster, g2v_price, v2g_price, opt_horizon, opt_step):
+    return sum(
+        g2v_price[cluster][t] * max(p[t], 0) + v2g_price[cluster][t] * min(p[t], 0)
+        for t in opt_horizon[:-1]
+    ) * opt_step / 3600
+
+
+def test_smart_routing_matches_milp(random_evs):
+    solver = create_solver("highs")
+    rng = np.random.default_rng(0)
+    for n in range(60):
+        nb_of_steps = int(rng.integers(4, 30))
+        opt_horizon = list(range(nb_of_steps + 1))
+        clusters = ["C%d" % c for c in range(int(rng.integers(1, 6)))]
+        g2v_price = {c: dict(enumerate(rng.uniform(0.2, 0.8, nb_of_steps))) for c in clusters}
+        if n % 3 == 0:
+            v2g_price = g2v_price
+        elif n % 3 == 1:
+            v2g_price = {c: {t: 0.9 * g2v_price[c][t] for t in g2v_price[c]} for c in clusters}
+        else:
+            v2g_price = {c: dict(enumerate(rng.uniform(0.2, 0.8, nb_of_steps))) for c in clusters}
+        ev = random_evs(rng, ["ev"], bcap=50, tarsoc=(0.6, 0.9))
+        tarsoc = ev["tarsoc"]["ev"]
+
+        # Arrival SOCs and power limits of the EV at the clusters
+        arrival = random_evs(rng, clusters, inisoc=(0.3, 0.5), pmax_pos=[11, 22, 50], pmax_neg=[0, 11, 22])
+        args = (
+            opt_horizon,
+            900,
+            ev["bcap"]["ev"],
+            float(rng.choice([0, 2, 100])) * 3600,
+            tarsoc,
+            ev["minsoc"]["ev"],
+            ev["maxsoc"]["ev"],
+            float(rng.uniform(0.2, 0.5)),
+            int(rng.integers(nb_of_steps // 2, nb_of_steps + 1)),
+            {c: int(rng.integers(0, 3)) for c in clusters},
+            {c: int(rng.integers(nb_of_steps - 2, nb_of_steps + 1)) for c in clusters},
+            arrival["inisoc"],
+            arrival["pmax_pos"],
+            arrival["pmax_neg"],
+            g2v_price,
+            v2g_price,
+        )
+
+        try:
+            p_milp, _, c_milp = routing_milp.smart_routing(solver, *args)
+        except NoSolutionError:
+            with pytest.raises(ValueError):
+                routing_enumeration.smart_routing(solver, *args)
+            continue
+
+        p, s, c = routing_enumeration.smart_routing(solver, *args)
+        assert cost(p, c, g2v_price, v2g_price, opt_horizon, 900) == pytest.approx(
+            cost(p_milp, c_milp, g2v_price, v2g_price, opt_horizon, 900), abs=1e-6
+        )
+        assert s[opt_horizon[-1]] == pytest.approx(tarsoc, abs=1e-7)
@@ -0,0 +1,85 @@
+import numpy as np
+import pytest
+from datafev.algorithms.solver import create_solver
+from datafev.algorithms.matrix_form import NoSolutionError
+from datafev.algorithms.vehicle import scheduling_lp, scheduling_greedy
+
+
+def random_ev(rng, random_evs, nb_of_steps):
+    ev = random_evs(
+        rng,
+        ["ev"],
+        bcap=(20, 80),
+        inisoc=(0.1, 0.6),
+        charge=(-0.1, 0.4),
+        minsoc=(0, 0.2),
+        maxsoc=(0.9, 1),
+        pmax_pos=[3.7, 11, 22],
+        pmax_neg=[0, 3.7, 11, 22],
+    )
+    if rng.random() < 0.5:
+        price = rng.uniform(0, 1, nb_of_steps)
+    else:
+        # Ties between the prices of the steps
+        price = rng.integers(0, 5, nb_of_steps).astype(float)
+    return (
+        ev["bcap"]["ev"],
+        ev["tarsoc"]["ev"],
+        ev["minsoc"]["ev"],
+        ev["maxsoc"]["ev"],
+        float(rng.uniform(0, 0.7)),
+        int(rng.integers(0, nb_of_steps + 2)),
+        ev["inisoc"]["ev"],
+        ev["pmax_pos"]["ev"],
+        ev["pmax_neg"]["ev"],
+        dict(enumerate(price.tolist())),
+    )
+
+
+def test_minimize_cost_matches_lp(random_evs):
+    solver = create_solver("highs")
+    rng = np.random.default_rng(0)
+    for _ in range(100):
+        nb_of_steps = int(rng.integers(2, 30))
+        opt_horizon = list(range(nb_of_steps + 1))
+        args = (900, opt_horizon) + random_ev(rng, random_evs, nb_of_steps)
+        try:
+            p_lp, _ = scheduling_lp.minimize_cost(solver, *args)
+        except NoSolutionError:
+            with pytest.raises(ValueError):
+                scheduling_greedy.minimize_cost(*args)
+            continue
+
+        p, s = scheduling_greedy.minimize_cost(*args)
+        price = args[-1]
+        cost = sum(p[t] * price[t] for t in opt_horizon[:-1])
+        cost_lp = sum(p_lp[t] * price[t] for t in opt_horizon[:-1])
+        assert cost == pytest.approx(cost_lp, rel=1e-6, abs=1e-6)
+
+        # The greedy schedule is feasible for the LP
+        ecap, tarsoc, minsoc, maxsoc, crtsoc, crttime, inisoc, p_ch, p_ds = args[2:11]
+        assert s[opt_horizon[-1]] == pytest.approx(tarsoc, abs=1e-7)
+        for t in opt_horizon[:-1]:
+            assert -p_ds - 1e-7 <= p[t] <= p_ch + 1e-7
+            assert s[t + 1] == pytest.approx(s[t] + p[t] * 900 / ecap, abs=1e-9)
+        for t in opt_horizon:
+            lower = max(minsoc, crtsoc) if t >= crttime else minsoc
+            assert lower - 1e-7 <= s[t] <= maxsoc + 1e-7
+
+
+def test_batch_matches_single(random_evs):
+    rng = np.random.default_rng(1)
+    opt_horizon = list(range(21))
+    evs = {"ev%d" % n: random_ev(rng, random_evs, 20) for n in range(40)}
+    feasible = {}
+    for v, ev in evs.items():
+        try:
+            feasible[v] = scheduling_greedy.minimize_cost(900, opt_horizon, *ev)
+        except ValueError:
+            pass
+    p_batch, s_batch = scheduling_greedy.minimize_cost_batch(
+        900, opt_horizon, *[{v: evs[v][k] for v in feasible} for k in range(10)]
+    )
+    for v, (p, s) in feasible.items():
+        assert p_batch[v] == pytest.approx(p, abs=1e-9)
+        assert s_batch[v] == pytest.approx(s, abs=1e-9)
@@ -0,0 +1,67 @@
+import os
+from datetime import datetime, timedelta
+import numpy as np
+import pandas as pd
+import pytest
+from datafev.data_handling.fleet import EVFleet
+from datafev.data_handling.cluster import ChargerCluster
+from datafev.data_handling.multi_cluster import MultiClusterSystem
+from datafev.simulator import Simulator
+from datafev.routines import arrival, departure
+from datafev.routines.simple_reservation import reservation as simple_reservation
+from datafev.routines.simple_reservation import arrival as simple_arrival
+from datafev.routines.charging_control import decentralized_fcfs, decentralized_llf
+
+inputs = os.path.join(
+    os.path.dirname(__file__), "..", "src", "tutorials", "simulations", "inputs"
+)
+
+
+def simulate(example, skip_idle, xlfile):
+    # Runs the tutorial example and returns its exported results
+    np.random.seed(0)
+    input_file = pd.ExcelFile(os.path.join(inputs, "example_%02d.xlsx" % example))
+    sim_start = datetime(2022, 1, 8, 7)
+    sim_end = datetime(2022, 1, 8, 9)
+    sim_step = timedelta(minutes=5)
+    sim_horizon = [sim_start + t * sim_step for t in range(int((sim_end - sim_start) / sim_step))]
+
+    cluster1 = ChargerCluster("cluster1", pd.read_excel(input_file, "Cluster1"))
+    system = MultiClusterSystem("multicluster")
+    system.add_cc(cluster1)
+    fleet = EVFleet("test_fleet", pd.read_excel(input_file, "Fleet"), sim_horizon)
+    cluster1.enter_power_limits(sim_start, sim_end, sim_step, pd.read_excel(input_file, "Capacity1"))
+
+    simulator = Simulator(sim_horizon, fleet, system)
+    simulator.add_routine(departure.departure_routine, fleet)
+    if example == 1:
+        simulator.add_routine(arrival.arrival_routine, sim_step, fleet, system)
+        simulator.add_routine(decentralized_fcfs.charging_routine, sim_step, system)
+    else:
+        traffic_forecast = {
+            "soc_dec": {"cluster1": 0},
+            "arr_del": {"cluster1": timedelta(seconds=0)},
+            "dep_del": {"cluster1": timedelta(seconds=0)},
+        }
+        simulator.add_routine(simple_reservation.reservation_routine, sim_step, system, fleet, traffic_forecast)
+        simulator.add_routine(simple_arrival.arrival_routine, sim_step, fleet)
+        simulator.add_routine(decentralized_llf.charging_routine, sim_step, system)
+    simulator.run(skip_idle=skip_idle)
+
+    system.export_results_to_excel(sim_start, sim_end, sim_step, str(xlfile) + "_clusters.xlsx")
+    fleet.export_results_to_excel(sim_start, sim_end, sim_step, str(xlfile) + "_fleet.xlsx")
+    results = {}
+    for output in ("clusters", "fleet"):
+        sheets = pd.read_excel(str(xlfile) + "_%s.xlsx" % output, sheet_name=None)
+        results.update((output + " " + name, sheet) for name, sheet in sheets.items())
+    return results, simulator.skipped_steps
+
+
+@pytest.mark.parametrize("example", [1, 2])
+def test_skip_idle_results(example, tmp_path):
+    skipped, nb_of_skipped = simulate(example, True, tmp_path / "skipped")
+    fixed, nb_of_fixed = simulate(example, False, tmp_path / "fixed")
+    assert nb_of_skipped > 0 and nb_of_fixed == 0
+    assert skipped.keys() == fixed.keys()
+    for name in skipped:
+        pd.testing.assert_frame_equal(skipped[name], fixed[name], obj=name)
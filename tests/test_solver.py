@@ -0,0 +1,11 @@
+import pytest
+from datafev.algorithms.solver import create_solver, check_warmstart
+
+
+def test_check_warmstart_rejects_highs():
+    with pytest.raises(ValueError, match="start solutions and persistent models"):
+        check_warmstart(create_solver("highs"), True, True)
+    with pytest.raises(ValueError, match="persistent models"):
+        check_warmstart(create_solver("highs"), persistent=True)
+    check_warmstart(create_solver("highs"))
+    check_warmstart(create_solver("appsi_highs"), True, True)